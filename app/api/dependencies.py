@@ -9,6 +9,7 @@ from typing import Annotated
 
 from app.services.time_table import TimeTableService
 from app.services.users import UserService
+from app.services.identity import UserIdentity
 from app.services.subjects import SubjectService
 from app.services.professors import ProfessorService
 from app.services.groups import GroupService
@@ -36,16 +37,16 @@ time_table_session = Annotated[TimeTableService,Depends(get_time_table_session)]
 
 
 async def get_current_user_with_password(session:db_session,telegram_id:str = Query(...)):
-    session =  await UserService(session).get_current_user_with_password(telegram_id)
+    session =  await UserService(session).get_current_identity_with_password(telegram_id)
     return session
 
-current_user_with_password = Annotated[User,Depends(get_current_user_with_password)]
+current_user_with_password = Annotated[UserIdentity,Depends(get_current_user_with_password)]
 
 async def get_current_user(session:db_session,telegram_id:str = Query(...)):
-    session =  await UserService(session).get_current_user(telegram_id)
+    session =  await UserService(session).get_current_identity(telegram_id)
     return session
 
-current_user = Annotated[User,Depends(get_current_user)]
+current_user = Annotated[UserIdentity,Depends(get_current_user)]
 
 
 async def get_subject_session(session:db_session):
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.routers import time_table,user,user_attendance,subjects,professor,groups,classes,scraper,e_class,superuser,styear_subjects,attendance_notifiaction_admin_panel
+from app.api.routers import time_table,user,user_attendance,subjects,professor,groups,classes,scraper,e_class,superuser,styear_subjects,attendance_notifiaction_admin_panel,health
 
 master_router = APIRouter()
 
@@ -16,4 +16,5 @@ master_router.include_router(superuser.router)
 master_router.include_router(styear_subjects.router)
 master_router.include_router(user_attendance.router)
 
-master_router.include_router(attendance_notifiaction_admin_panel.router)
\ No newline at end of file
+master_router.include_router(attendance_notifiaction_admin_panel.router)
+master_router.include_router(health.router)
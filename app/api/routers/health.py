@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+
+from app.api.dependencies import current_super_user
+from app.database.session import pool_stats
+
+router = APIRouter(tags=["health"],
+                   prefix="/health")
+
+
+@router.get("/db-pool")
+async def db_pool(super_user: current_super_user):
+    return pool_stats()
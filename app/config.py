@@ -18,6 +18,17 @@ class DataBaseSettings(BaseSettings):
 
     REDIS_url:str
 
+    # async (API) engine pool
+    DB_POOL_SIZE:int = 10
+    DB_MAX_OVERFLOW:int = 20
+    DB_POOL_TIMEOUT:float = 10.0
+    DB_POOL_RECYCLE:int = 1800
+    DB_POOL_PRE_PING:bool = True
+    # prepared statement caches per connection; set both to 0 behind
+    # pgbouncer in transaction pooling mode
+    DB_STATEMENT_CACHE_SIZE:int = 500
+    DB_PREPARED_STATEMENT_CACHE_SIZE:int = 500
+
     model_config  = _base_config
 
     @property
@@ -53,6 +64,48 @@ class ScraperSettings(BaseSettings):
     base_url: str 
     login_index_url: str 
 
+    # async scraping engine
+    max_concurrency_per_host: int = 4
+
+    # reuse of eClass session cookies between scrapes (seconds)
+    session_cookie_ttl: int = 60 * 60 * 4
+
+    # per-(user, url) page fingerprints for incremental scrapes (seconds)
+    page_fingerprint_ttl: int = 60 * 60 * 24 * 7
+
+    # bulk scrape fan-out: one celery subtask per user (worker concurrency is
+    # set on the bulk worker's command line, see docker-compose.yml)
+    bulk_scrape_max_retries: int = 3
+    bulk_scrape_retry_backoff: int = 30
+
+    # fleet-wide token buckets for eClass requests (requests/second, burst)
+    rate_limit_enabled: bool = True
+    rate_limit_login_rps: float = 1.0
+    rate_limit_login_burst: float = 3.0
+    rate_limit_course_rps: float = 4.0
+    rate_limit_course_burst: float = 8.0
+    rate_limit_subpage_rps: float = 12.0
+    rate_limit_subpage_burst: float = 24.0
+    rate_limit_max_wait: float = 30.0
+
+    # Prometheus: port the Celery worker serves /metrics on (0 = off)
+    worker_metrics_port: int = 0
+
+    # Tracing spans (app/infra/tracing.py): "" = off, "stdout" or a file path
+    # (one OTLP/JSON span per line)
+    trace_export: str = ""
+    # per-user waterfalls printed after a bulk scrape (slowest N users)
+    trace_waterfall_users: int = 5
+
+    # HTML parsers of EclassClient: "lxml" = precompiled XPath on lxml trees
+    # (app/scraper/fastparse.py), "bs4" = the BeautifulSoup selectors
+    parser_backend: str = "lxml"
+    # course pages with the lxml backend: "off" = full parse, "parse" = stop
+    # parsing once the course fields are complete (fastparse.CoursePageFeed),
+    # "download" = also stop reading the body (async engine; the connection
+    # is closed instead of reused)
+    course_page_stream: str = "parse"
+
 
     model_config = _base_config
 
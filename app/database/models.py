@@ -1,12 +1,16 @@
 from sqlmodel import Boolean, ForeignKey, SQLModel, Field, Column, Relationship
 from sqlalchemy.dialects import postgresql
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index, UniqueConstraint, text
 
 from datetime import datetime, time,date
 from uuid import UUID, uuid4
 from enum import Enum
 from typing import List, Optional
 
+# Relationships never load on attribute access (lazy="raise"): every query
+# that needs related rows declares selectinload()/joinedload() itself.
+
+
 class Weeks(str, Enum):
     monday = "monday"
     tuesday = "tuesday"
@@ -29,7 +33,7 @@ class StudentYear(SQLModel,table = True):
     starting_year:int
     graduation_year:int
 
-    subjects:List["Subject"] = Relationship(back_populates="student_year",sa_relationship_kwargs={"lazy": "selectin"},)
+    subjects:List["Subject"] = Relationship(back_populates="student_year",sa_relationship_kwargs={"lazy": "raise"},)
 
 
 class SubjectMajorLink(SQLModel,table= True):
@@ -49,6 +53,7 @@ class SubjectMajorLink(SQLModel,table= True):
         default=None,
         foreign_key="subject.id",
         nullable=True,
+        index=True,
     )
 
 class Major(SQLModel,table=True):
@@ -63,8 +68,8 @@ class Major(SQLModel,table=True):
     major_full_name:str|None = None
     subjects:List['Subject'] = Relationship(back_populates="majors",
                                             link_model=SubjectMajorLink,
-                                            sa_relationship_kwargs={"lazy": "selectin"},)
-    groups:List["Group"] = Relationship(back_populates="major",sa_relationship_kwargs={"lazy":"selectin"})
+                                            sa_relationship_kwargs={"lazy": "raise"},)
+    groups:List["Group"] = Relationship(back_populates="major",sa_relationship_kwargs={"lazy": "raise"})
 
 
 class Subject(SQLModel, table=True):
@@ -82,14 +87,14 @@ class Subject(SQLModel, table=True):
 
 
     classes: List["Class"] = Relationship(back_populates="subject",
-                                            sa_relationship_kwargs={"lazy": "selectin"},)
+                                            sa_relationship_kwargs={"lazy": "raise"},)
 
     majors:List["Major"] = Relationship(back_populates='subjects',
                                         link_model=SubjectMajorLink,
-                                        sa_relationship_kwargs={"lazy": "selectin"},)
+                                        sa_relationship_kwargs={"lazy": "raise"},)
     
     student_year : StudentYear= Relationship(back_populates="subjects",
-                                             sa_relationship_kwargs={"lazy": "selectin"},)
+                                             sa_relationship_kwargs={"lazy": "raise"},)
 
 
 
@@ -103,7 +108,7 @@ class Professor(SQLModel, table=True):
     )
     name: str = Field(unique=True)
     office_hours: str | None = Field(default=None)
-    classes: List["Class"] = Relationship(back_populates="professor")
+    classes: List["Class"] = Relationship(back_populates="professor",sa_relationship_kwargs={"lazy": "raise"})
 
 
 class Group(SQLModel, table=True):
@@ -118,10 +123,10 @@ class Group(SQLModel, table=True):
 
     major_id:UUID = Field(foreign_key="major.id",nullable=True)
 
-    major:Major = Relationship(back_populates="groups",sa_relationship_kwargs={"lazy":"selectin"})
+    major:Major = Relationship(back_populates="groups",sa_relationship_kwargs={"lazy": "raise"})
 
-    classes: List["Class"] = Relationship(back_populates="group")
-    users: List["User"] = Relationship(back_populates="group")
+    classes: List["Class"] = Relationship(back_populates="group",sa_relationship_kwargs={"lazy": "raise"})
+    users: List["User"] = Relationship(back_populates="group",sa_relationship_kwargs={"lazy": "raise"})
 
 
 class Enrollment(SQLModel, table=True):
@@ -159,21 +164,31 @@ class Enrollment(SQLModel, table=True):
     attendance: int | None = Field(default=None)
     late: int | None = Field(default=None)
 
-    assignments: List["Assignment"] = Relationship(back_populates="enrollment")
-    quizzes: List["Quiz"] = Relationship(back_populates="enrollment")
+    assignments: List["Assignment"] = Relationship(back_populates="enrollment",sa_relationship_kwargs={"lazy": "raise"})
+    quizzes: List["Quiz"] = Relationship(back_populates="enrollment",sa_relationship_kwargs={"lazy": "raise"})
 
     user: Optional["User"] = Relationship(
         back_populates="enrollments",
-        sa_relationship_kwargs={"overlaps": "classes,users"},
+        sa_relationship_kwargs={"overlaps": "classes,users","lazy": "raise"},
     )
     klass: Optional["Class"] = Relationship(
         back_populates="enrollments",
-        sa_relationship_kwargs={"overlaps": "classes,users"},
+        sa_relationship_kwargs={"overlaps": "classes,users","lazy": "raise"},
     )
 
-    attendanceinfos:Optional["AttendanceInfo"] = Relationship(back_populates="enrollment",sa_relationship_kwargs={"lazy": "selectin"},)
+    attendanceinfos:Optional["AttendanceInfo"] = Relationship(back_populates="enrollment",sa_relationship_kwargs={"lazy": "raise"},)
 
 class AttendanceInfo(SQLModel,table=True):
+    __table_args__ = (
+        UniqueConstraint("enrollment_id", "date_of_week", "class_name", name="uq_attendanceinfo_enrollment_date_class"),
+        # latest unseen absence/late per enrollment (admin notifications)
+        Index(
+            "ix_attendanceinfo_unseen_absence_late",
+            "enrollment_id", text("date_of_week DESC"),
+            postgresql_where=text("is_seen IS false AND (absence IS true OR late IS true)"),
+        ),
+    )
+
     id: UUID = Field(
         sa_column=Column(
             postgresql.UUID(as_uuid=True),
@@ -189,7 +204,7 @@ class AttendanceInfo(SQLModel,table=True):
     is_seen:bool = False
 
     enrollment_id:UUID = Field(foreign_key="enrollment.id")
-    enrollment:Enrollment = Relationship(back_populates="attendanceinfos",sa_relationship_kwargs={"lazy": "selectin"},)
+    enrollment:Enrollment = Relationship(back_populates="attendanceinfos",sa_relationship_kwargs={"lazy": "raise"},)
 
 class Class(SQLModel, table=True):
     id: UUID = Field(
@@ -212,17 +227,18 @@ class Class(SQLModel, table=True):
         )
     )
     group: Optional[Group] = Relationship(back_populates="classes",
-                                            sa_relationship_kwargs={"lazy": "selectin"},)
+                                            sa_relationship_kwargs={"lazy": "raise"},)
 
     subject_id: UUID = Field(
         sa_column=Column(
             postgresql.UUID(as_uuid=True),
             ForeignKey("subject.id", ondelete="CASCADE"),
             nullable=False,
+            index=True,
         )
     )
     subject: Optional["Subject"] = Relationship(back_populates="classes",
-                                                  sa_relationship_kwargs={"lazy": "selectin"},)
+                                                  sa_relationship_kwargs={"lazy": "raise"},)
 
     professor_id: UUID = Field(
         sa_column=Column(
@@ -232,21 +248,21 @@ class Class(SQLModel, table=True):
         )
     )
     professor: Optional["Professor"] = Relationship(back_populates="classes",
-                                                      sa_relationship_kwargs={"lazy": "selectin"},)
+                                                      sa_relationship_kwargs={"lazy": "raise"},)
 
     enrollments: List["Enrollment"] = Relationship(
         back_populates="klass",
-        sa_relationship_kwargs={"overlaps": "users,classes"},
+        sa_relationship_kwargs={"overlaps": "users,classes","lazy": "raise"},
     )
 
     users: List["User"] = Relationship(
         back_populates="classes",
         link_model=Enrollment,
-        sa_relationship_kwargs={"overlaps": "enrollments,klass,user"},
+        sa_relationship_kwargs={"overlaps": "enrollments,klass,user","lazy": "raise"},
     )
 
     classtimes: List["ClassTime"] = Relationship(back_populates="klass",
-                                                   sa_relationship_kwargs={"lazy": "selectin"},)
+                                                   sa_relationship_kwargs={"lazy": "raise"},)
 
 
 class ClassTime(SQLModel, table=True):
@@ -263,9 +279,10 @@ class ClassTime(SQLModel, table=True):
             postgresql.UUID(as_uuid=True),
             ForeignKey("class.id", ondelete="CASCADE"),
             nullable=False,
+            index=True,
         )
     )
-    klass: Class = Relationship(back_populates="classtimes",sa_relationship_kwargs={"lazy": "selectin"},)
+    klass: Class = Relationship(back_populates="classtimes",sa_relationship_kwargs={"lazy": "raise"},)
 
     room: str | None = None
     week_day: Optional[Weeks | None] = None
@@ -286,7 +303,7 @@ class User(SQLModel, table=True):
 
     phone_number:str|None = None
     telegram_id: str | None = Field(unique=True, index=True, default=None)
-    student_id: str
+    student_id: str = Field(index=True)
     first_name: str | None = Field(max_length=50)
     last_name: str | None = Field(max_length=50)
     password: str | None
@@ -298,15 +315,19 @@ class User(SQLModel, table=True):
     started_date: datetime | None = None
     eclass_registered: datetime |None = None
 
+    @property
+    def has_password(self) -> bool:
+        return bool(self.password)
+
     enrollments: List["Enrollment"] = Relationship(
         back_populates="user",
-        sa_relationship_kwargs={"overlaps": "classes,users","lazy": "selectin"},
+        sa_relationship_kwargs={"overlaps": "classes,users","lazy": "raise"},
     )
 
     classes: List["Class"] = Relationship(
         back_populates="users",
         link_model=Enrollment,
-        sa_relationship_kwargs={"overlaps": "enrollments,klass,user","lazy": "selectin"},
+        sa_relationship_kwargs={"overlaps": "enrollments,klass,user","lazy": "raise"},
     )
 
     group_id: UUID | None = Field(
@@ -315,9 +336,10 @@ class User(SQLModel, table=True):
             ForeignKey("group.id", ondelete="SET NULL"),
             nullable=True,
             default=None,
+            index=True,
         )
     )
-    group: Group = Relationship(back_populates="users",sa_relationship_kwargs={"lazy": "selectin"},)
+    group: Group = Relationship(back_populates="users",sa_relationship_kwargs={"lazy": "raise"},)
 
 
 class Assignment(SQLModel, table=True):
@@ -340,9 +362,10 @@ class Assignment(SQLModel, table=True):
             postgresql.UUID(as_uuid=True),
             ForeignKey("enrollment.id", ondelete="CASCADE"),
             nullable=False,
+            index=True,
         )
     )
-    enrollment: Optional["Enrollment"] = Relationship(back_populates="assignments",sa_relationship_kwargs={"lazy": "selectin"},)
+    enrollment: Optional["Enrollment"] = Relationship(back_populates="assignments",sa_relationship_kwargs={"lazy": "raise"},)
 
 
 class Quiz(SQLModel, table=True):
@@ -365,9 +388,10 @@ class Quiz(SQLModel, table=True):
             postgresql.UUID(as_uuid=True),
             ForeignKey("enrollment.id", ondelete="CASCADE"),
             nullable=False,
+            index=True,
         )
     )
-    enrollment: Optional["Enrollment"] = Relationship(back_populates="quizzes",sa_relationship_kwargs={"lazy": "selectin"},)
+    enrollment: Optional["Enrollment"] = Relationship(back_populates="quizzes",sa_relationship_kwargs={"lazy": "raise"},)
 
 
 class EclassSnapshot(SQLModel, table=True):
@@ -376,6 +400,30 @@ class EclassSnapshot(SQLModel, table=True):
     payload: dict = Field(sa_column=Column(postgresql.JSONB, nullable=False))
 
 
+class NotificationOutbox(SQLModel, table=True):
+    """
+    Telegram messages waiting to be sent. Written in the same transaction as
+    the data they are about, drained by app/services/notifications.py.
+    """
+    __table_args__ = (
+        Index("ix_notificationoutbox_status_available_at", "status", "available_at"),
+    )
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    chat_id: str
+    text: str
+    parse_mode: str | None = Field(default="HTML")
+
+    # pending -> sending -> sent | failed (or back to pending for a retry)
+    status: str = Field(default="pending")
+    attempts: int = Field(default=0)
+    last_error: str | None = None
+
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    available_at: datetime = Field(default_factory=datetime.utcnow)
+    sent_at: datetime | None = None
+
+
 class SuperUser(SQLModel,table = True):
     id:UUID = Field(
         sa_column=Column(
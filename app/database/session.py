@@ -1,13 +1,88 @@
-from sqlalchemy.ext.asyncio import create_async_engine,AsyncSession
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import create_async_engine,AsyncSession,async_sessionmaker
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import SQLModel
 from contextlib import asynccontextmanager
-from sqlalchemy.orm import sessionmaker
 from app.config import db_settings
 
+
+@dataclass
+class PoolWaitStats:
+    """Time spent getting a connection out of the pool (includes opening new ones)."""
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+
+_wait_stats = PoolWaitStats()
+_wait_lock = threading.Lock()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    def _do_get(self):
+        t0 = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - t0
+            with _wait_lock:
+                _wait_stats.checkouts += 1
+                _wait_stats.timeouts += timed_out
+                _wait_stats.wait_total += waited
+                _wait_stats.wait_max = max(_wait_stats.wait_max, waited)
+
+
 engine = create_async_engine(
-    url=db_settings.ASYNC_DB_URL
+    url=db_settings.ASYNC_DB_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=db_settings.DB_POOL_SIZE,
+    max_overflow=db_settings.DB_MAX_OVERFLOW,
+    pool_timeout=db_settings.DB_POOL_TIMEOUT,
+    pool_recycle=db_settings.DB_POOL_RECYCLE,
+    pool_pre_ping=db_settings.DB_POOL_PRE_PING,
+    connect_args={
+        # asyncpg's own per-connection statement cache
+        "statement_cache_size": db_settings.DB_STATEMENT_CACHE_SIZE,
+        # SQLAlchemy's cache of asyncpg prepared statements (per connection)
+        "prepared_statement_cache_size": db_settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    },
 )
 
+async_session_factory = async_sessionmaker(
+    bind=engine,class_=AsyncSession,expire_on_commit=False
+)
+
+
+def pool_stats() -> dict:
+    """Current pool utilisation and checkout wait times (since process start)."""
+    pool = engine.pool
+    checked_out = pool.checkedout()
+    capacity = pool.size() + max(db_settings.DB_MAX_OVERFLOW, 0)
+    with _wait_lock:
+        waits = PoolWaitStats(**vars(_wait_stats))
+    return {
+        "size": pool.size(),
+        "max_overflow": db_settings.DB_MAX_OVERFLOW,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "utilisation": round(checked_out / capacity, 3) if capacity else None,
+        "checkouts": waits.checkouts,
+        "timeouts": waits.timeouts,
+        "wait_avg_ms": round(waits.wait_total / waits.checkouts * 1000, 3) if waits.checkouts else 0.0,
+        "wait_max_ms": round(waits.wait_max * 1000, 3),
+    }
+
+
 async def create_db_tables():
     async with engine.begin() as connection:
         from app.database import models
@@ -15,19 +90,10 @@ async def create_db_tables():
 
 
 async def get_session():
-    async_session =  sessionmaker(
-        bind = engine,class_=AsyncSession,expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_factory() as session:
         yield session
-        
+
 @asynccontextmanager
 async def get_session_ctx():
-    async_session = sessionmaker(
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=False
-    )
-    async with async_session() as session:
+    async with async_session_factory() as session:
         yield session
-
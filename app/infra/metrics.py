@@ -0,0 +1,186 @@
+"""
+Prometheus metrics for the API, the eClass client, the scraper and Celery.
+
+Metrics live in the default registry. Processes that fork (Celery prefork,
+several uvicorn workers) must run with PROMETHEUS_MULTIPROC_DIR set to an
+empty directory: every process then writes its samples there and
+metrics_registry() merges them at scrape time.
+"""
+import os
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+# eClass answers in 0.2-5s, a full user scrape takes seconds to minutes
+_HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_ECLASS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 20, 30)
+_SCRAPE_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+_DB_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+_TASK_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# ---------- API ----------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "API request latency by route template",
+    ["method", "route", "status"],
+    buckets=_HTTP_BUCKETS,
+)
+
+# ---------- eClass client ----------
+ECLASS_REQUEST_SECONDS = Histogram(
+    "eclass_request_duration_seconds",
+    "One eClass HTTP attempt (rate limit waits and backoff sleeps excluded)",
+    ["endpoint", "status"],
+    buckets=_ECLASS_BUCKETS,
+)
+ECLASS_RETRIES = Counter(
+    "eclass_request_retries_total",
+    "eClass attempts that were retried",
+    ["endpoint", "reason"],
+)
+ECLASS_ERROR_RESPONSES = Counter(
+    "eclass_error_responses_total",
+    "eClass 429 / 403 / 5xx answers",
+    ["endpoint", "status"],
+)
+ECLASS_RATE_LIMIT_WAIT_SECONDS = Counter(
+    "eclass_rate_limit_wait_seconds_total",
+    "Time spent waiting for the fleet-wide eClass token buckets",
+    ["endpoint"],
+)
+
+# ---------- scraper ----------
+SCRAPE_USER_SECONDS = Histogram(
+    "scrape_user_duration_seconds",
+    "Scrape + sync of one user",
+    ["result"],
+    buckets=_SCRAPE_BUCKETS,
+)
+SCRAPE_DB_SYNC_SECONDS = Histogram(
+    "scrape_db_sync_duration_seconds",
+    "Writing one scraped user to Postgres and Redis",
+    buckets=_DB_BUCKETS,
+)
+SCRAPE_NOTIFICATIONS = Counter(
+    "scrape_notifications_total",
+    "Telegram messages queued in the outbox by the scraper",
+)
+
+# ---------- Celery ----------
+CELERY_TASK_SECONDS = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time",
+    ["task", "state"],
+    buckets=_TASK_BUCKETS,
+)
+CELERY_TASK_RETRIES = Counter(
+    "celery_task_retries_total",
+    "Celery task retries",
+    ["task"],
+)
+
+
+def status_label(status_code: int) -> str:
+    if status_code in (403, 429):
+        return str(status_code)
+    return f"{status_code // 100}xx"
+
+
+def observe_eclass_response(endpoint: str, status_code: int, seconds: float) -> None:
+    label = status_label(status_code)
+    ECLASS_REQUEST_SECONDS.labels(endpoint, label).observe(seconds)
+    if label in ("403", "429", "5xx"):
+        ECLASS_ERROR_RESPONSES.labels(endpoint, label).inc()
+
+
+def metrics_registry() -> CollectorRegistry:
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> tuple:
+    """(body, content type) for a /metrics response."""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: request latency per route template (/e-class/{...}, not
+    the raw path, so the label set stays small). Unmatched paths are "other".
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "other"
+            if path != "/metrics":
+                HTTP_REQUEST_SECONDS.labels(scope["method"], path, str(status["code"])).observe(
+                    time.perf_counter() - t0
+                )
+
+
+# ---------- Celery wiring ----------
+_task_started: dict = {}
+
+
+def setup_celery_metrics(port: Optional[int] = None) -> None:
+    """
+    Task timings through Celery signals. With a port, the worker's main
+    process serves every child's metrics on it (multiprocess registry).
+    """
+    from celery import signals
+
+    @signals.task_prerun.connect(weak=False)
+    def _prerun(task_id=None, **_):
+        _task_started[task_id] = time.perf_counter()
+
+    @signals.task_postrun.connect(weak=False)
+    def _postrun(task_id=None, task=None, state=None, **_):
+        started = _task_started.pop(task_id, None)
+        if started is not None and task is not None:
+            CELERY_TASK_SECONDS.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+    @signals.task_retry.connect(weak=False)
+    def _retry(sender=None, **_):
+        CELERY_TASK_RETRIES.labels(getattr(sender, "name", "unknown")).inc()
+
+    @signals.worker_process_shutdown.connect(weak=False)
+    def _child_exit(pid=None, **_):
+        if MULTIPROC_DIR:
+            multiprocess.mark_process_dead(pid or os.getpid())
+
+    if port:
+        @signals.worker_init.connect(weak=False)
+        def _serve(**_):
+            start_http_server(port, registry=metrics_registry())
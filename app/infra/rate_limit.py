@@ -0,0 +1,124 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import scraper_settings
+from app.infra.redis_sync import redis_scrape_cache
+
+
+# Token bucket with atomic refill. State lives in one hash per bucket
+# (tokens, ts) and the clock is Redis' own, so every worker/machine shares
+# the same bucket. Returns "0" when the tokens were taken, otherwise the
+# seconds to wait until enough tokens will be there (nothing is taken).
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = burst
+    ts = now
+end
+
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """
+    Fleet-wide request budget for one upstream, one bucket per endpoint class.
+
+    buckets: {"login": (rate_per_sec, burst), ...}. Unknown classes and Redis
+    errors are not limited (fail open: the per-request backoff still applies).
+    A bucket that stays empty for max_wait is never bypassed: acquire()
+    returns None and the caller gives up on the request instead.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        buckets: Dict[str, Tuple[float, float]],
+        prefix: str = "ratelimit:eclass",
+        max_wait: float = 30.0,
+    ) -> None:
+        self.redis = redis_client
+        self.buckets = {name: (float(rate), float(burst)) for name, (rate, burst) in buckets.items() if rate > 0}
+        self.prefix = prefix
+        self.max_wait = max_wait
+        self._script = redis_client.register_script(_TOKEN_BUCKET_LUA)
+
+    def _key(self, bucket: str) -> str:
+        return f"{self.prefix}:{bucket}"
+
+    def try_acquire(self, bucket: str, tokens: float = 1) -> float:
+        """Seconds to wait before retrying; 0.0 means the tokens were taken."""
+        conf = self.buckets.get(bucket)
+        if conf is None:
+            return 0.0
+        rate, burst = conf
+        try:
+            return float(self._script(keys=[self._key(bucket)], args=[rate, burst, tokens]))
+        except Exception:
+            return 0.0
+
+    def acquire(self, bucket: str, tokens: float = 1) -> Optional[float]:
+        """
+        Blocks until the tokens are taken; returns the time spent waiting,
+        or None when they could not be taken within max_wait.
+        """
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(bucket, tokens)
+            if wait <= 0:
+                return waited
+            if waited >= self.max_wait:
+                return None
+            wait = min(wait, self.max_wait - waited)
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, bucket: str, tokens: float = 1) -> Optional[float]:
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self.try_acquire, bucket, tokens)
+            if wait <= 0:
+                return waited
+            if waited >= self.max_wait:
+                return None
+            wait = min(wait, self.max_wait - waited)
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+def _build_eclass_rate_limiter() -> Optional[RedisTokenBucket]:
+    if not scraper_settings.rate_limit_enabled:
+        return None
+    return RedisTokenBucket(
+        redis_scrape_cache,
+        {
+            "login": (scraper_settings.rate_limit_login_rps, scraper_settings.rate_limit_login_burst),
+            "course": (scraper_settings.rate_limit_course_rps, scraper_settings.rate_limit_course_burst),
+            "subpage": (scraper_settings.rate_limit_subpage_rps, scraper_settings.rate_limit_subpage_burst),
+        },
+        max_wait=scraper_settings.rate_limit_max_wait,
+    )
+
+
+eclass_rate_limiter = _build_eclass_rate_limiter()
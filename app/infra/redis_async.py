@@ -10,4 +10,8 @@ redis_user_info_cache_async = Redis.from_url(
 redis_registered_users = Redis.from_url(
     url = db_settings.REDIS_DB(4),
     
-)
\ No newline at end of file
+)
+notification_cache_async = Redis.from_url(
+    url=db_settings.REDIS_DB(9),
+    decode_responses=True
+)
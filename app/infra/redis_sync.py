@@ -19,4 +19,13 @@ notification_cache = Redis.from_url(
 redis_registered_users_sync = Redis.from_url(
     url = db_settings.REDIS_DB(4),
     
-)
\ No newline at end of file
+)
+
+redis_eclass_sessions = Redis.from_url(
+    url=db_settings.REDIS_DB(5),
+    decode_responses=True
+)
+
+# bumped (INCR on notification_cache) whenever class times change;
+# the reminder scheduler (scripts/reminder.py serve) reloads on a new value
+TIMETABLE_VERSION_KEY = "timetable:version"
@@ -0,0 +1,134 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from app.config import bot_settings
+from app.infra.tracing import tracer
+
+
+@dataclass
+class SendResult:
+    ok: bool
+    # True when retrying the same message cannot help (bot blocked, chat not found, bad markup)
+    permanent: bool = False
+    retry_after: Optional[float] = None
+    error: Optional[str] = None
+    # 429 answers seen (and waited out) for this message
+    rate_limited: int = 0
+
+
+class TelegramRateLimiter:
+    """
+    In-process pacing for Bot API sends: at most global_rps messages per
+    second overall and one message per per_chat_interval to the same chat.
+    Slots are reserved under a lock, the wait itself happens outside it.
+    """
+
+    def __init__(self, global_rps: float = 30.0, per_chat_interval: float = 1.0) -> None:
+        self.global_interval = 1.0 / global_rps
+        self.per_chat_interval = per_chat_interval
+        self._next_global = 0.0
+        self._next_chat: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, chat_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            at = max(now, self._next_global, self._next_chat.get(chat_id, 0.0))
+            self._next_global = at + self.global_interval
+            self._next_chat[chat_id] = at + self.per_chat_interval
+        if at > now:
+            await asyncio.sleep(at - now)
+
+    def pause(self, chat_id: str, seconds: float) -> None:
+        """retry_after from a 429: push back this chat and the global pace."""
+        until = asyncio.get_running_loop().time() + seconds
+        self._next_chat[chat_id] = max(self._next_chat.get(chat_id, 0.0), until)
+        self._next_global = max(self._next_global, until)
+
+
+class TelegramSender:
+    """
+    Async Bot API sendMessage over one pooled httpx.AsyncClient.
+
+        async with TelegramSender() as tg:
+            results = await tg.send_many([(chat_id, text), ...])
+    """
+
+    def __init__(
+        self,
+        api_url: str = bot_settings.API_URL,
+        limiter: Optional[TelegramRateLimiter] = None,
+        concurrency: int = 10,
+        max_429_retries: int = 3,
+        timeout: float = 10.0,
+    ) -> None:
+        self.api_url = api_url
+        self.limiter = limiter or TelegramRateLimiter()
+        self.concurrency = concurrency
+        self.max_429_retries = max_429_retries
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def __aenter__(self) -> "TelegramSender":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def send(self, chat_id: str, text: str, parse_mode: Optional[str] = "HTML") -> SendResult:
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+
+        result = SendResult(ok=False)
+        limited = 0
+        for _ in range(self.max_429_retries + 1):
+            await self.limiter.wait(chat_id)
+            try:
+                with tracer.start_as_current_span("telegram.send") as span:
+                    r = await self.client.post(self.api_url, json=payload)
+                    span.set_attribute("status", r.status_code)
+            except httpx.HTTPError as e:
+                return SendResult(ok=False, error=f"network: {e}", rate_limited=limited)
+
+            if r.status_code == 200:
+                return SendResult(ok=True, rate_limited=limited)
+
+            try:
+                body = r.json()
+            except ValueError:
+                body = {}
+            description = body.get("description") or r.text[:200]
+
+            if r.status_code == 429:
+                retry_after = float((body.get("parameters") or {}).get("retry_after") or 1)
+                self.limiter.pause(chat_id, retry_after)
+                limited += 1
+                result = SendResult(ok=False, retry_after=retry_after, error=description, rate_limited=limited)
+                continue
+
+            if r.status_code in (400, 401, 403, 404):
+                return SendResult(ok=False, permanent=True, error=f"{r.status_code}: {description}", rate_limited=limited)
+
+            return SendResult(ok=False, error=f"{r.status_code}: {description}", rate_limited=limited)
+
+        return result
+
+    async def send_many(self, messages: Iterable[Tuple]) -> List[SendResult]:
+        """Sends (chat_id, text[, parse_mode]) tuples concurrently; results in input order."""
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def one(message: Tuple) -> SendResult:
+            async with sem:
+                return await self.send(*message)
+
+        return list(await asyncio.gather(*(one(m) for m in messages)))
@@ -0,0 +1,301 @@
+"""
+Lightweight tracing spans for the scrape -> DB sync -> notify path.
+
+The API mirrors OpenTelemetry's (tracer.start_as_current_span(),
+span.set_attribute(), W3C traceparent) and finished spans are written as
+OTLP/JSON-shaped lines, so they can be replayed into a collector later;
+no collector or SDK is needed to run it.
+
+    with tracer.start_as_current_span("db.sync", {"user_id": uid}):
+        ...
+
+Spans are only built when an exporter is configured (TRACE_EXPORT=stdout
+or a file path) or inside tracing.record(); otherwise a shared no-op span
+is handed out. record() collects the finished spans of its block (asyncio
+tasks started inside it included) for waterfall() / top_phases() reports.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.config import scraper_settings
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Optional[dict]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.error = f"{type(exc).__name__}: {exc}"[:300]
+
+    @property
+    def duration(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e9
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otel(self) -> dict:
+        out = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": k, "value": _otel_value(v)} for k, v in self.attributes.items()],
+            # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        return out
+
+
+class _NoopSpan:
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otel_value(v: Any) -> dict:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+class FileSpanExporter:
+    """One JSON span per line to stdout or an append-only file (one handle per process)."""
+
+    def __init__(self, target: str) -> None:
+        self.target = target
+        self._lock = threading.Lock()
+        self._fh = None
+        self._pid = None
+
+    def _handle(self):
+        if self.target == "stdout":
+            return sys.stdout
+        if self._fh is None or self._pid != os.getpid():
+            self._fh = open(self.target, "a", buffering=1, encoding="utf-8")
+            self._pid = os.getpid()
+        return self._fh
+
+    def export(self, spans: Iterable[Span]) -> None:
+        lines = "".join(json.dumps(s.to_otel(), ensure_ascii=False) + "\n" for s in spans)
+        with self._lock:
+            self._handle().write(lines)
+
+    def write_text(self, text: str) -> None:
+        with self._lock:
+            self._handle().write(text.rstrip("\n") + "\n")
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("trace_current_span", default=None)
+_recording: ContextVar[Optional[List[Span]]] = ContextVar("trace_recording", default=None)
+
+
+def _parse_traceparent(value: Optional[str]):
+    parts = (value or "").split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+
+class Tracer:
+    def __init__(self, exporter: Optional[FileSpanExporter] = None) -> None:
+        self.exporter = exporter
+
+    @contextmanager
+    def start_as_current_span(self, name: str, attributes: Optional[dict] = None,
+                              traceparent: Optional[str] = None) -> Iterator[Any]:
+        recording = _recording.get()
+        if self.exporter is None and recording is None:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current.get()
+        trace_id, parent_id = _parse_traceparent(traceparent)
+        if trace_id is None:
+            trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+            parent_id = parent.span_id if parent else None
+
+        span = Span(name, trace_id, parent_id, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current.reset(token)
+            if recording is not None:
+                recording.append(span)
+            if self.exporter is not None:
+                self.exporter.export([span])
+
+    def emit_report(self, text: str) -> None:
+        """Human-readable report next to the spans (stdout when no exporter)."""
+        if self.exporter is not None:
+            self.exporter.write_text(text)
+        else:
+            print(text)
+
+
+def current_span():
+    return _current.get() or _NOOP_SPAN
+
+
+@contextmanager
+def record() -> Iterator[List[Span]]:
+    """Collects every span finished inside the block."""
+    spans: List[Span] = []
+    token = _recording.set(spans)
+    try:
+        yield spans
+    finally:
+        _recording.reset(token)
+
+
+# ---------- reports ----------
+def _children(spans: List[Span]) -> Dict[Optional[str], List[Span]]:
+    by_parent: Dict[Optional[str], List[Span]] = {}
+    for s in spans:
+        by_parent.setdefault(s.parent_id, []).append(s)
+    for kids in by_parent.values():
+        kids.sort(key=lambda s: s.start_ns)
+    return by_parent
+
+
+def waterfall(spans: List[Span], root: Span, width: int = 40) -> str:
+    """Text waterfall of root and its descendants: offset, duration, bar, name."""
+    by_parent = _children(spans)
+    total = max(root.duration, 1e-9)
+    lines = [f"{root.name} {' '.join(f'{k}={v}' for k, v in root.attributes.items())} ({root.duration * 1000:.0f} ms)"]
+
+    def walk(span: Span, depth: int) -> None:
+        offset = (span.start_ns - root.start_ns) / 1e9
+        start = int(offset / total * width)
+        length = max(1, int(span.duration / total * width))
+        bar = " " * start + "#" * min(length, width - start)
+        mark = " !" if span.error else ""
+        lines.append(f"{offset * 1000:>8.0f} {span.duration * 1000:>8.0f}  |{bar:<{width}}| {'  ' * depth}{span.name}{mark}")
+        for kid in by_parent.get(span.span_id, []):
+            walk(kid, depth + 1)
+
+    for kid in by_parent.get(root.span_id, []):
+        walk(kid, 0)
+    return "\n".join(lines)
+
+
+def top_phases(spans: List[Span], limit: Optional[int] = 10) -> List[dict]:
+    """
+    Time per span name. self_s excludes time covered by child spans, so
+    phases that only wait on their children (scrape.user) do not dominate;
+    concurrent children can make it 0.
+    """
+    by_parent = _children(spans)
+    rows: Dict[str, dict] = {}
+    for s in spans:
+        child_time = sum(k.duration for k in by_parent.get(s.span_id, []))
+        row = rows.setdefault(s.name, {"phase": s.name, "count": 0, "total_s": 0.0, "self_s": 0.0, "max_s": 0.0, "errors": 0})
+        row["count"] += 1
+        row["total_s"] += s.duration
+        row["self_s"] += max(0.0, s.duration - child_time)
+        row["max_s"] = max(row["max_s"], s.duration)
+        row["errors"] += bool(s.error)
+    return _rank(rows.values(), limit)
+
+
+def merge_phases(reports: Iterable[List[dict]], limit: Optional[int] = 10) -> List[dict]:
+    """Adds up top_phases() rows of several runs (e.g. one per Celery subtask)."""
+    rows: Dict[str, dict] = {}
+    for report in reports:
+        for r in report or []:
+            row = rows.setdefault(r["phase"], {"phase": r["phase"], "count": 0, "total_s": 0.0, "self_s": 0.0, "max_s": 0.0, "errors": 0})
+            row["count"] += r["count"]
+            row["total_s"] += r["total_s"]
+            row["self_s"] += r["self_s"]
+            row["max_s"] = max(row["max_s"], r["max_s"])
+            row["errors"] += r.get("errors", 0)
+    return _rank(rows.values(), limit)
+
+
+def _rank(rows: Iterable[dict], limit: Optional[int]) -> List[dict]:
+    out = sorted(rows, key=lambda r: r["self_s"], reverse=True)
+    for r in out:
+        r["total_s"] = round(r["total_s"], 4)
+        r["self_s"] = round(r["self_s"], 4)
+        r["max_s"] = round(r["max_s"], 4)
+    return out[:limit] if limit else out
+
+
+def format_phases(rows: List[dict]) -> str:
+    lines = [f"{'phase':<28} {'count':>7} {'self s':>10} {'total s':>10} {'max s':>8} {'errors':>6}"]
+    for r in rows:
+        lines.append(f"{r['phase']:<28} {r['count']:>7} {r['self_s']:>10.3f} {r['total_s']:>10.3f} {r['max_s']:>8.3f} {r['errors']:>6}")
+    return "\n".join(lines)
+
+
+# ---------- Celery ----------
+def setup_celery_tracing() -> None:
+    """One span per task run; a 'traceparent' header links it to the dispatcher's trace."""
+    from celery import signals
+
+    stacks: Dict[str, ExitStack] = {}
+
+    @signals.task_prerun.connect(weak=False)
+    def _prerun(task_id=None, task=None, **_):
+        if task is None:
+            return
+        request = task.request
+        parent = getattr(request, "traceparent", None) or (getattr(request, "headers", None) or {}).get("traceparent")
+        stack = ExitStack()
+        stack.enter_context(tracer.start_as_current_span("celery.task", {"task": task.name}, traceparent=parent))
+        stacks[task_id] = stack
+
+    @signals.task_postrun.connect(weak=False)
+    def _postrun(task_id=None, state=None, **_):
+        stack = stacks.pop(task_id, None)
+        if stack is not None:
+            current_span().set_attribute("state", state or "UNKNOWN")
+            stack.close()
+
+
+def _build_exporter() -> Optional[FileSpanExporter]:
+    target = (scraper_settings.trace_export or "").strip()
+    return FileSpanExporter(target) if target else None
+
+
+tracer = Tracer(_build_exporter())
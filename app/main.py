@@ -1,9 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from rich import panel,print
 from .database.session import create_db_tables
 from app.api.router import master_router
+from app.infra.metrics import MetricsMiddleware, render_metrics
 
 
 async def life_cycle(app:FastAPI):
@@ -43,3 +44,12 @@ app.add_middleware(
 
 app.include_router(master_router)
 
+
+# outermost, so the latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
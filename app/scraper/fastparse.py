@@ -0,0 +1,530 @@
+"""
+lxml fast path for the EclassClient parsers.
+
+Same results as the BeautifulSoup code in script.py (see
+scripts/diff_parsers.py), computed with precompiled XPath on the
+lxml.html tree of a page instead of a soup:
+
+- text() reproduces Tag.get_text(sep, strip=True): comment, script,
+  style and template text is left out, every string is stripped and
+  empty ones dropped;
+- class tests match one token of @class, like CSS ".name";
+- "first match" follows document order, like select_one().
+
+menu_links() finds every sub-page link of a course page (offline /
+online attendance, assignment index, quiz index, plus their menu-text
+fallbacks) in one pass over the page's anchors.
+
+CoursePageFeed parses a course page incrementally and stops once
+everything course_page() and the auth check read is complete.
+"""
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+_NO_TEXT = frozenset(("script", "style", "template"))
+_EMPTY_DOC = "<html><body></body></html>"
+
+
+def parse_html(html: str):
+    try:
+        return lxml.html.document_fromstring(html or _EMPTY_DOC)
+    except ValueError:
+        # str with an XML encoding declaration
+        return lxml.html.document_fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    except etree.ParserError:
+        # whitespace / comments only
+        return lxml.html.document_fromstring(_EMPTY_DOC)
+
+
+def _has_class(el, name: str) -> bool:
+    return name in (el.get("class") or "").split()
+
+
+def _strings(el) -> Iterator[str]:
+    if el.text:
+        yield el.text
+    for child in el:
+        tag = child.tag
+        # comments / PIs have a non-str tag: skip their text, keep the tail
+        if isinstance(tag, str) and tag not in _NO_TEXT:
+            yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def text(el, sep: str = "") -> str:
+    """Tag.get_text(sep, strip=True)."""
+    return sep.join(s for s in (x.strip() for x in _strings(el)) if s)
+
+
+def _cls(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _first(xpath: etree.XPath, el):
+    found = xpath(el)
+    return found[0] if found else None
+
+
+# ---------- precompiled expressions ----------
+_LOGOUT_LINK = etree.XPath('boolean(//a[contains(@href, "/login/logout.php")])')
+_USER_PICTURE = etree.XPath(f"boolean(//*[{_cls('userpicture')}])")
+_USER_MENU = etree.XPath(f"boolean(//*[{_cls('usermenu')}])")
+
+_COURSE_LINKS = etree.XPath(f"//ul[{_cls('my-course-lists')}]//a[{_cls('course_link')}]")
+_H3 = etree.XPath(".//h3")
+
+_ANCHORS = etree.XPath("//a[@href]")
+_PROFESSOR_H4 = etree.XPath(f"//h4[{_cls('media-heading')}]")
+_COURSENAME_A = etree.XPath(f"//*[{_cls('coursename')}]//h1//a")
+
+_ATTENDANCE_TABLE = etree.XPath(f"//table[{_cls('attendance_my')}]")
+_GENERAL_TABLE = etree.XPath(f"//table[{_cls('generaltable')}]")
+_TBODY = etree.XPath(".//tbody")
+_TBODY_TR = etree.XPath(".//tbody//tr")
+_TR = etree.XPath(".//tr")
+_TD = etree.XPath(".//td")
+_TFOOT = etree.XPath(".//tfoot")
+_A_HREF = etree.XPath(".//a[@href]")
+_P = etree.XPath(".//p")
+_SPAN = etree.XPath(".//span")
+
+_USER_ATT_COUNT = etree.XPath(f"//div[{_cls('user_attendance')}]//div[{_cls('att_count')}]")
+_ATT_COUNT = etree.XPath(f"//div[{_cls('att_count')}]")
+_ONLINE_PAGE_BOX = etree.XPath(
+    f"(//div[{_cls('user_attendance_table')}]//div[{_cls('att_count')}]"
+    f" | //div[{_cls('user_attendance')}]//div[{_cls('att_count')}]"
+    f" | //div[{_cls('att_count')}])[1]"
+)
+_DANGER = etree.XPath(
+    f"(//*[{_cls('alert')} and {_cls('alert-danger')}] | //*[{_cls('alert-danger')}] | //*[{_cls('error_message')}])[1]"
+)
+_QUIZ_SUMMARY = etree.XPath(f"boolean(//table[{_cls('generaltable')}] | //*[{_cls('quizattemptsummary')}])")
+
+_MARKS = {"○", "O", "o", "◯"}
+
+
+# ---------- auth / course list ----------
+def is_logged_in(tree) -> bool:
+    return bool(_LOGOUT_LINK(tree) or (_USER_PICTURE(tree) and _USER_MENU(tree)))
+
+
+def course_list(tree, base_url: str) -> List[Tuple[str, str]]:
+    courses: List[Tuple[str, str]] = []
+    for a in _COURSE_LINKS(tree):
+        href = a.get("href")
+        title_el = _first(_H3, a)
+        title = text(title_el, " ") if title_el is not None else text(a, " ")
+        if href and title:
+            courses.append((title, urljoin(base_url, href)))
+    return courses
+
+
+# ---------- course page ----------
+@dataclass
+class MenuLinks:
+    """First matching href per sub-page, in document order (raw, not joined)."""
+    offline: Optional[str] = None
+    offline_by_text: Optional[str] = None
+    online: Optional[str] = None
+    online_by_text: Optional[str] = None
+    assign: Optional[str] = None
+    assign_by_text: Optional[str] = None
+    quiz: Optional[str] = None
+    quiz_by_text: Optional[str] = None
+
+
+def menu_links(tree) -> MenuLinks:
+    m = MenuLinks()
+    for a in _ANCHORS(tree):
+        href = a.get("href")
+        if not href:
+            continue
+        # link text is only computed for anchors that point at a sub-page
+        if "/local/ubattendance/my_status.php" in href:
+            if m.offline is None and "/local/ubattendance/my_status.php?id=" in href:
+                m.offline = href
+            if m.offline_by_text is None:
+                t = text(a, " ").lower()
+                if "offline-attendance" in t or "offline attendance" in t:
+                    m.offline_by_text = href
+        if "/report/ubcompletion/progress.php" in href:
+            if m.online is None and "/report/ubcompletion/progress.php?id=" in href:
+                m.online = href
+            if m.online_by_text is None:
+                t = text(a, " ").lower()
+                if "online-attendance" in t or "online attendance" in t:
+                    m.online_by_text = href
+        if "/mod/assign/index.php" in href:
+            if m.assign is None and "/mod/assign/index.php?id=" in href:
+                m.assign = href
+            if m.assign_by_text is None and text(a).lower() == "assignment":
+                m.assign_by_text = href
+        if "/mod/quiz/index.php" in href:
+            if m.quiz is None and "/mod/quiz/index.php?id=" in href:
+                m.quiz = href
+            if m.quiz_by_text is None and text(a).lower() == "quiz":
+                m.quiz_by_text = href
+    return m
+
+
+def quiz_url(links: MenuLinks, base_url: str) -> Optional[str]:
+    href = links.quiz or links.quiz_by_text
+    return urljoin(base_url, href) if href else None
+
+
+def _professor(h4) -> Optional[str]:
+    name = re.sub(r"\s+", " ", text(h4, " ").strip())
+    return name if 2 <= len(name.split()) <= 4 and len(name) <= 80 else None
+
+
+def professor_name(tree) -> Optional[str]:
+    for h4 in _PROFESSOR_H4(tree):
+        name = _professor(h4)
+        if name:
+            return name
+    return None
+
+
+def course_page(tree, links: MenuLinks, subject_title: str, course_url: str) -> Dict[str, Any]:
+    h1_a = _first(_COURSENAME_A, tree)
+    subject_name_full = text(h1_a, " ") if h1_a is not None else subject_title
+    subject_name_clean = subject_name_full.split("[", 1)[0].strip()
+
+    words = [w for w in subject_name_clean.replace("-", " ").split() if w.strip()]
+    subject_key = "".join([w[0].upper() for w in words]) if words else subject_title
+
+    attendance_url = None
+    attendance_kind = None
+    off = links.offline or links.offline_by_text
+    on = links.online or links.online_by_text
+    if off:
+        attendance_url, attendance_kind = urljoin(course_url, off), "offline"
+    elif on:
+        attendance_url, attendance_kind = urljoin(course_url, on), "online"
+
+    assign = links.assign or links.assign_by_text
+    return {
+        "subjectKey": subject_key,
+        "subjectNameFull": subject_name_full,
+        "subjectName": subject_name_clean,
+        "courseUrl": course_url,
+        "professorName": professor_name(tree),
+        "attendanceUrl": attendance_url,
+        "attendanceKind": attendance_kind,
+        "assignIndexUrl": urljoin(course_url, assign) if assign else None,
+    }
+
+
+# ---------- streamed course page ----------
+STREAM_BLOCK = 16 * 1024
+
+
+class CoursePageFeed:
+    """
+    Course page fed block by block into an lxml HTMLPullParser.
+
+    feed() returns True once the tree holds, complete, everything
+    course_page() and is_logged_in() use: a logout link, the first
+    ".coursename h1 a", the professor heading and the primary offline
+    attendance and assignment links (a primary offline link makes the
+    online link and all menu-text fallbacks irrelevant). The rest of the
+    page does not have to be read or parsed. When one of them is missing
+    (online attendance, no professor, login page ...) the whole page is
+    fed, i.e. the fallback is a normal full parse.
+
+    Quiz links and the online attendance box are not waited for: an
+    early-stopped tree is only good for the course page fields. Only
+    <a> / <h4> end events are looked at (a page logged in without a
+    logout link is simply read in full).
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._parser = etree.HTMLPullParser(events=("end",), tag=("a", "h4"))
+        self._chunks: List[str] = []
+        self._missing = {"auth", "name", "professor", "offline", "assign"}
+        self.done = False
+        self.seconds = 0.0
+
+    @property
+    def text(self) -> str:
+        """What was fed so far (the whole page unless done)."""
+        return "".join(self._chunks)
+
+    def feed(self, data: str) -> bool:
+        if self.done:
+            return True
+        t0 = time.perf_counter()
+        self._chunks.append(data)
+        self._parser.feed(data)
+        for _, el in self._parser.read_events():
+            if el.tag == "a":
+                self._anchor(el)
+            elif el.tag == "h4" and "professor" in self._missing and _has_class(el, "media-heading") and _professor(el):
+                self._missing.discard("professor")
+            if not self._missing:
+                self.done = True
+                break
+        self.seconds += time.perf_counter() - t0
+        return self.done
+
+    def close(self):
+        """The parsed tree: the whole page, or the part read when done early."""
+        t0 = time.perf_counter()
+        try:
+            tree = self._parser.close()
+        except etree.XMLSyntaxError:
+            tree = None
+        if tree is None:
+            # nothing but whitespace / comments
+            tree = parse_html(self.text)
+        self.seconds += time.perf_counter() - t0
+        return tree
+
+    def _anchor(self, a) -> None:
+        href = a.get("href") or ""
+        if "/login/logout.php" in href:
+            self._missing.discard("auth")
+        if "/local/ubattendance/my_status.php?id=" in href:
+            self._missing.discard("offline")
+        if "/mod/assign/index.php?id=" in href:
+            self._missing.discard("assign")
+        if "name" in self._missing:
+            in_h1 = False
+            for parent in a.iterancestors():
+                if parent.tag == "h1":
+                    in_h1 = True
+                elif in_h1 and _has_class(parent, "coursename"):
+                    self._missing.discard("name")
+                    break
+
+
+def parse_course_page(html: str):
+    """Tree of a course page, parsed only as far as CoursePageFeed needs."""
+    if len(html) <= 2 * STREAM_BLOCK:
+        # too little left to skip to pay for the event handling
+        return parse_html(html)
+    feed = CoursePageFeed()
+    for i in range(0, len(html), STREAM_BLOCK):
+        if feed.feed(html[i:i + STREAM_BLOCK]):
+            break
+    return feed.close()
+
+
+# ---------- attendance ----------
+def _date_or_raw(s: str) -> str:
+    try:
+        return datetime.strptime(s, "%Y-%m-%d").date().isoformat()
+    except Exception:
+        return s
+
+
+def _offline_rows(table) -> List[Dict[str, Any]]:
+    records = []
+    for tr in _TBODY_TR(table):
+        tds = _TD(tr)
+        if len(tds) < 5:
+            continue
+        records.append({
+            "date_of_week": _date_or_raw(text(tds[0])),
+            "class_name": text(tds[1], " ") or None,
+            "attendance": text(tds[2]).strip() in _MARKS,
+            "absence": text(tds[3]).strip() in _MARKS,
+            "late": text(tds[4]).strip() in _MARKS,
+        })
+    return records
+
+
+def _offline_totals(table) -> Optional[Dict[str, int]]:
+    tfoot = _first(_TFOOT, table)
+    if tfoot is None:
+        return None
+    txt = text(tfoot, " ")
+
+    def grab(label: str) -> int:
+        m = re.search(rf"{label}\s*:\s*(\d+)", txt, flags=re.I)
+        return int(m.group(1)) if m else 0
+
+    return {"attendance": grab("Attendance"), "absence": grab("Absence"), "late": grab("Late")}
+
+
+def course_attendance(course_tree, att_tree, attendance_kind: Optional[str]):
+    """(totals, offline rows), see EclassClient._parse_course_attendance."""
+    if attendance_kind == "offline":
+        table = _first(_ATTENDANCE_TABLE, att_tree)
+        if table is None:
+            return None, None
+        return _offline_totals(table), _offline_rows(table)
+
+    if attendance_kind == "online":
+        box = None
+        if course_tree is not None:
+            box = _first(_USER_ATT_COUNT, course_tree)
+            if box is None:
+                box = _first(_ATT_COUNT, course_tree)
+        if box is None:
+            box = _first(_USER_ATT_COUNT, att_tree)
+        if box is None:
+            box = _first(_ATT_COUNT, att_tree)
+        if box is None:
+            return None, None
+
+        counts = {"attendance": 0, "absence": 0, "late": 0}
+        for p in _P(box):
+            label = text(p, " ").lower()
+            span = _first(_SPAN, p)
+            if span is None:
+                continue
+            m = re.search(r"\d+", text(span))
+            val = int(m.group(0)) if m else 0
+            if any(k in label for k in ["attendance", "출석", "present"]):
+                counts["attendance"] = val
+            elif any(k in label for k in ["absence", "결석"]):
+                counts["absence"] = val
+            elif any(k in label for k in ["late", "지각"]):
+                counts["late"] = val
+        return counts, None
+
+    return None, None
+
+
+def offline_attendance_rows(tree) -> dict:
+    table = _first(_ATTENDANCE_TABLE, tree)
+    if table is None:
+        return {"records": [], "totals": {"attendance": 0, "absence": 0, "late": 0}}
+    return {
+        "records": _offline_rows(table),
+        "totals": _offline_totals(table) or {"attendance": 0, "absence": 0, "late": 0},
+    }
+
+
+def online_attendance_page(tree) -> Dict[str, Any]:
+    danger = _first(_DANGER, tree)
+    if danger is not None:
+        msg = text(danger, " ")
+        if "not been set" in msg.lower() or "not set" in msg.lower():
+            return {"status": "attendance_not_set", "message": msg, "counts": {}}
+
+    box = _first(_ONLINE_PAGE_BOX, tree)
+    if box is None:
+        return {"status": "attendance_unknown_format", "message": "Online attendance block not found.", "counts": {}}
+
+    counts: Dict[str, int] = {"attendance": 0, "absence": 0, "late": 0}
+    for p in _P(box):
+        span = _first(_SPAN, p)
+        if span is None:
+            continue
+        p_text = text(p, " ")
+        span_text = text(span, " ")
+        label = p_text.replace(span_text, "").strip().strip(":").lower()
+
+        m = re.search(r"\d+", span_text) or re.search(r"\d+", p_text)
+        if not m:
+            continue
+        num = int(m.group(0))
+        if "attendance" in label:
+            counts["attendance"] = num
+        elif "absence" in label:
+            counts["absence"] = num
+        elif "late" in label:
+            counts["late"] = num
+
+    if counts == {"attendance": 0, "absence": 0, "late": 0} and not re.search(r"\d+", text(box, " ")):
+        return {"status": "attendance_unknown_format", "message": "Online attendance counts not found.", "counts": {}}
+    return {"status": "ok", "message": "", "counts": counts}
+
+
+# ---------- assignments / quizzes ----------
+def course_assignments(tree, assign_index_url: str) -> List[Dict[str, Any]]:
+    table = _first(_GENERAL_TABLE, tree)
+    assignments: List[Dict[str, Any]] = []
+    if table is None:
+        return assignments
+    for tr in _TBODY_TR(table):
+        tds = _TD(tr)
+        if len(tds) < 5:
+            continue
+        a = _first(_A_HREF, tds[1])
+        if a is None:
+            continue
+        assignments.append({
+            "week": text(tds[0], " ") or None,
+            "name": text(a, " "),
+            "due_date": text(tds[2], " ") or None,
+            "submission": text(tds[3], " ") or None,
+            "grade": text(tds[4], " ") or None,
+            "url": urljoin(assign_index_url, a.get("href")),
+        })
+    return assignments
+
+
+def assignments_index_page(tree, base_url: str) -> Dict[str, Any]:
+    table = _first(_GENERAL_TABLE, tree)
+    if table is None:
+        return {"status": "assignments_unknown_format", "message": "Assignments table not found.", "items": []}
+    tbody = _first(_TBODY, table)
+    if tbody is None:
+        return {"status": "assignments_unknown_format", "message": "Assignments table body not found.", "items": []}
+
+    items: List[Dict[str, Any]] = []
+    for tr in _TR(tbody):
+        tds = _TD(tr)
+        if len(tds) < 5:
+            continue
+        week = text(tds[0], " ")
+        a = _first(_A_HREF, tds[1])
+        title = text(a, " ") if a is not None else text(tds[1], " ")
+        asg_url = urljoin(base_url, a.get("href")) if a is not None and a.get("href") else None
+        due_date = text(tds[2], " ")
+        submission = text(tds[3], " ")
+        grade = text(tds[4], " ")
+        if not (week or title or due_date or submission or grade):
+            continue
+        items.append({
+            "week": week,
+            "title": title,
+            "due_date": due_date,
+            "submission": submission,
+            "grade": grade,
+            "url": asg_url,
+        })
+    return {"status": "ok", "message": "", "items": items}
+
+
+def quiz_index_rows(tree, quiz_index_url: str, status_from_grade: Callable[[Optional[str]], Optional[str]]) -> List[Dict[str, Any]]:
+    table = _first(_GENERAL_TABLE, tree)
+    if table is None:
+        return []
+    quizzes: List[Dict[str, Any]] = []
+    for tr in _TBODY_TR(table):
+        tds = _TD(tr)
+        if len(tds) < 4:
+            continue
+        name_a = _first(_A_HREF, tds[1])
+        if name_a is None:
+            continue
+        grade = text(tds[3], " ") or None
+        quizzes.append({
+            "week": text(tds[0], " ") or None,
+            "name": text(name_a, " "),
+            "quiz_closes": text(tds[2], " ") or None,
+            "grade": grade,
+            "url": urljoin(quiz_index_url, name_a.get("href")),
+            "status": status_from_grade(grade),
+        })
+    return quizzes
+
+
+def quiz_status(tree) -> str:
+    # every other outcome of the soup version is "Not submitted" as well
+    return "Submitted" if _QUIZ_SUMMARY(tree) else "Not submitted"
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional, Set
+
+# Parts of a Moodle page that change on every request without the content
+# changing: session keys, generated YUI ids and inline scripts.
+_VOLATILE = [
+    re.compile(r"<script\b[^>]*>.*?</script>", re.S | re.I),
+    re.compile(r"sesskey[\"'=:\s]+[\w-]+", re.I),
+    re.compile(r"yui_[\w]+"),
+]
+
+
+def content_hash(html: str) -> str:
+    text = html or ""
+    for rx in _VOLATILE:
+        text = rx.sub("", text)
+    return hashlib.sha1(text.encode("utf-8", "ignore")).hexdigest()
+
+
+class PageFingerprintStore:
+    """
+    Per-(user, URL) page fingerprints in one Redis hash per user:
+    ETag / Last-Modified when eClass sends them, a content hash otherwise.
+    """
+
+    def __init__(self, redis_client, ttl_seconds: int) -> None:
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(user_id: Any) -> str:
+        return f"eclass:fp:{user_id}"
+
+    def load(self, user_id: Any) -> Dict[str, Dict[str, Any]]:
+        try:
+            raw = self.redis.hgetall(self._key(user_id)) or {}
+        except Exception:
+            return {}
+        out: Dict[str, Dict[str, Any]] = {}
+        for url, value in raw.items():
+            try:
+                out[url] = json.loads(value)
+            except ValueError:
+                continue
+        return out
+
+    def save(self, user_id: Any, records: Dict[str, Dict[str, Any]]) -> None:
+        if not records:
+            return
+        key = self._key(user_id)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hset(key, mapping={url: json.dumps(rec, ensure_ascii=False) for url, rec in records.items()})
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+        except Exception:
+            pass
+
+    def delete(self, user_id: Any) -> None:
+        try:
+            self.redis.delete(self._key(user_id))
+        except Exception:
+            pass
+
+
+class PageChangeTracker:
+    """
+    One user's scrape run: which fetched pages are unchanged since the last
+    successful run, plus the previous subjects (from EclassSnapshot) that
+    can be reused for them.
+
+    New fingerprints stay pending per course and are only written by
+    commit(), i.e. after the DB sync for the user went through.
+    """
+
+    def __init__(
+        self,
+        store: PageFingerprintStore,
+        user_id: Any,
+        previous_subjects: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        self.store = store
+        self.user_id = user_id
+        self.known = store.load(user_id)
+        # only subjects that were scraped fine can be reused
+        self.previous_subjects = {
+            url: subj for url, subj in (previous_subjects or {}).items() if not subj.get("status")
+        }
+        self.pending: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.unchanged_courses: Set[str] = set()
+        self.stats = {"pages": 0, "not_modified": 0, "hash_hits": 0, "changed": 0, "reused_courses": 0}
+
+    # ---------- request side ----------
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        rec = self.known.get(url) or {}
+        headers: Dict[str, str] = {}
+        if rec.get("etag"):
+            headers["If-None-Match"] = rec["etag"]
+        if rec.get("last_modified"):
+            headers["If-Modified-Since"] = rec["last_modified"]
+        return headers
+
+    def not_modified(self, course_url: str, url: str) -> None:
+        """304 answer: the stored record stays valid."""
+        self.stats["pages"] += 1
+        self.stats["not_modified"] += 1
+        self.pending.setdefault(course_url, {})[url] = dict(self.known.get(url) or {})
+
+    def observe(self, course_url: str, url: str, html: str, headers: Any) -> bool:
+        """Records the new fingerprint; True when the page content is unchanged."""
+        self.stats["pages"] += 1
+        rec: Dict[str, Any] = {"hash": content_hash(html)}
+        if headers.get("ETag"):
+            rec["etag"] = headers.get("ETag")
+        if headers.get("Last-Modified"):
+            rec["last_modified"] = headers.get("Last-Modified")
+
+        old = self.known.get(url) or {}
+        unchanged = bool(old.get("hash")) and old["hash"] == rec["hash"]
+        if unchanged and "course" in old:
+            rec["course"] = old["course"]
+        self.pending.setdefault(course_url, {})[url] = rec
+
+        self.stats["hash_hits" if unchanged else "changed"] += 1
+        return unchanged
+
+    # ---------- parsed data ----------
+    def course_info(self, course_url: str) -> Optional[Dict[str, Any]]:
+        """Parsed course page info stored with the course page fingerprint."""
+        rec = self.pending.get(course_url, {}).get(course_url) or {}
+        return rec.get("course")
+
+    def remember_course_info(self, course_url: str, info: Dict[str, Any]) -> None:
+        rec = self.pending.setdefault(course_url, {}).setdefault(course_url, {})
+        rec["course"] = info
+
+    def previous_subject(self, course_url: str) -> Optional[Dict[str, Any]]:
+        return self.previous_subjects.get(course_url)
+
+    def mark_unchanged(self, course_url: str) -> None:
+        self.unchanged_courses.add(course_url)
+        self.stats["reused_courses"] += 1
+
+    def drop_course(self, course_url: str) -> None:
+        """Course failed: keep old fingerprints so it is fully re-fetched next run."""
+        self.pending.pop(course_url, None)
+        self.unchanged_courses.discard(course_url)
+
+    def commit(self) -> None:
+        records: Dict[str, Dict[str, Any]] = {}
+        for per_course in self.pending.values():
+            records.update(per_course)
+        self.store.save(self.user_id, records)
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
+import hashlib
 import random
 import re
 import time
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 from urllib.parse import urljoin, urlparse, parse_qs
+from zoneinfo import ZoneInfo
 
 import httpx
 import requests
 from bs4 import BeautifulSoup
 from app.config import scraper_settings
+from app.infra import metrics
+from app.infra.tracing import tracer
+from app.scraper import fastparse
+
+TZ = ZoneInfo("Asia/Tashkent")
 
 # =========================
 # Exceptions
@@ -40,6 +48,87 @@ class TemporaryServerError(EclassError):
     """5xx errors that are likely temporary."""
 
 
+# =========================
+# Parsed page (parse once, share everywhere)
+# =========================
+class ParsedPage:
+    """
+    One response body, parsed with BeautifulSoup/lxml at most once.
+    The auth check, URL finders and table parsers all take the same
+    instance, so a page is never re-soupified. With the lxml backend the
+    parsers use .tree (a plain lxml.html document) instead of .soup.
+    course=True: .tree stops where the course page fields are complete
+    (fastparse.CoursePageFeed), for _parse_course_page and the auth check.
+    """
+
+    # process-wide parse stats (see scripts/bench_parse.py)
+    parse_count: int = 0
+    parse_seconds: float = 0.0
+    # False = re-parse on every .soup / .tree access (legacy behaviour, benchmarks only)
+    reuse: bool = True
+    # "lxml" = fastparse on .tree, "bs4" = BeautifulSoup selectors on .soup
+    backend: str = scraper_settings.parser_backend
+
+    __slots__ = ("html", "url", "course", "_soup", "_tree", "_links")
+
+    def __init__(self, html: str, url: Optional[str] = None, course: bool = False) -> None:
+        self.html = html or ""
+        self.url = url
+        self.course = course
+        self._soup: Optional[BeautifulSoup] = None
+        self._tree = None
+        self._links: Optional[fastparse.MenuLinks] = None
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None or not ParsedPage.reuse:
+            t0 = time.perf_counter()
+            with tracer.start_as_current_span("html.parse", {"bytes": len(self.html)}):
+                self._soup = BeautifulSoup(self.html, "lxml")
+            ParsedPage.parse_seconds += time.perf_counter() - t0
+            ParsedPage.parse_count += 1
+        return self._soup
+
+    @property
+    def tree(self):
+        if self._tree is None or not ParsedPage.reuse:
+            t0 = time.perf_counter()
+            with tracer.start_as_current_span(
+                "html.parse", {"bytes": len(self.html), "backend": "lxml", "course": self.course}
+            ):
+                if self.course:
+                    self._tree = fastparse.parse_course_page(self.html)
+                else:
+                    self._tree = fastparse.parse_html(self.html)
+            ParsedPage.parse_seconds += time.perf_counter() - t0
+            ParsedPage.parse_count += 1
+        return self._tree
+
+    @property
+    def links(self) -> fastparse.MenuLinks:
+        """Sub-page links of a course page, one pass over its anchors."""
+        if self._links is None or not ParsedPage.reuse:
+            self._links = fastparse.menu_links(self.tree)
+        return self._links
+
+    @classmethod
+    def from_feed(cls, feed: fastparse.CoursePageFeed, url: Optional[str] = None) -> "ParsedPage":
+        """Course page streamed into feed (see EclassClient._arequest); html is what was read."""
+        page = cls(feed.text, url, course=True)
+        page._tree = feed.close()
+        ParsedPage.parse_seconds += feed.seconds
+        ParsedPage.parse_count += 1
+        return page
+
+    @classmethod
+    def reset_stats(cls) -> None:
+        cls.parse_count = 0
+        cls.parse_seconds = 0.0
+
+
+PageLike = Union[str, ParsedPage]
+
+
 # =========================
 # Config
 # =========================
@@ -56,13 +145,32 @@ class EclassClientConfig:
 
     user_agent: str = "EclassLightClient/1.2"
 
+    # Async engine: max in-flight requests per host (per client)
+    max_concurrency_per_host: int = scraper_settings.max_concurrency_per_host
+
+    # Course pages: "off" | "parse" | "download" (see ScraperSettings.course_page_stream)
+    course_page_stream: str = scraper_settings.course_page_stream
+
+    # Cache TTL for final quiz statuses
+    quiz_status_cache_ttl: int = 60 * 60 * 24 * 180
+
 
 # =========================
 # Client
 # =========================
 class EclassClient:
-    def __init__(self, cfg: EclassClientConfig = EclassClientConfig()) -> None:
+    def __init__(
+        self,
+        cfg: EclassClientConfig = EclassClientConfig(),
+        quiz_status_cache: Any = None,
+        rate_limiter: Any = None,
+    ) -> None:
         self.cfg = cfg
+        # optional Redis client for final quiz statuses (see _resolve_quiz_statuses)
+        self.quiz_status_cache = quiz_status_cache
+        # optional shared token bucket (app/infra/rate_limit.py), see _endpoint_class
+        self.rate_limiter = rate_limiter
+        self.username: Optional[str] = None
         self.s = requests.Session()
         self.s.headers.update({
             "User-Agent": cfg.user_agent,
@@ -82,17 +190,47 @@ class EclassClient:
             timeout=self.timeout,
             headers={"User-Agent": "Mozilla/5.0"},
         )
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        # optional PageChangeTracker (app/scraper/fingerprints.py), async path only
+        self.tracker: Any = None
 
     async def aclose(self):
         await self.client.aclose()
+
+    # ---------- session cookies (see app/scraper/session_store.py) ----------
+    def export_cookies(self) -> List[Dict[str, str]]:
+        """Cookies of both HTTP clients, de-duplicated by (domain, path, name)."""
+        out: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+        for jar in (self.s.cookies, self.client.cookies.jar):
+            for c in jar:
+                out[(c.domain, c.path, c.name)] = {
+                    "name": c.name,
+                    "value": c.value,
+                    "domain": c.domain,
+                    "path": c.path,
+                }
+        return list(out.values())
+
+    def load_cookies(self, cookies: List[Dict[str, str]]) -> None:
+        for c in cookies:
+            domain = c.get("domain") or ""
+            path = c.get("path") or "/"
+            self.s.cookies.set(c["name"], c["value"], domain=domain, path=path)
+            self.client.cookies.set(c["name"], c["value"], domain=domain, path=path)
+
+    def clear_cookies(self) -> None:
+        self.s.cookies.clear()
+        self.client.cookies.clear()
     
-    def _find_quiz_url(self, course_page_html: str) -> Optional[str]:
+    def _find_quiz_url(self, course_page_html: PageLike) -> Optional[str]:
         """
         Finds the Quiz index URL on the course page.
         Example:
         https://eclass.inha.ac.kr/mod/quiz/index.php?id=2377
         Returns None if hidden/not present.
         """
+        if (page := self._fast(course_page_html)) is not None:
+            return fastparse.quiz_url(page.links, self.cfg.base_url)
         soup = self._soup(course_page_html)
 
         # Most reliable: href contains /mod/quiz/index.php?id=
@@ -109,32 +247,135 @@ class EclassClient:
 
         return None
 
+    # =========================
+    # Quiz status
+    # =========================
+    # Resolution order per quiz:
+    #   1) index page: a grade in the Grade column means an attempt exists
+    #   2) quiz_status_cache: (user, quiz url, close date) -> final status
+    #   3) fetch of the remaining view.php pages
+    # Only final answers are cached: "Submitted", or any status once the
+    # quiz has closed. Open + not submitted quizzes are re-checked next run.
+    # Note: get_all_attendance / aget_all_attendance do not fetch quizzes
+    # (subjects[].quizzes stays None); this path is only used by direct
+    # get_quizzes_for_course / aget_quizzes_for_course calls.
+    @staticmethod
+    def _quiz_status_from_index(grade: Optional[str]) -> Optional[str]:
+        g = (grade or "").strip()
+        if g and g not in {"-", "None"}:
+            return "Submitted"
+        return None
+
+    @classmethod
+    def _quiz_status_from_page(cls, page: PageLike) -> str:
+        if (fast := cls._fast(page)) is not None:
+            return fastparse.quiz_status(fast.tree)
+        soup = cls._soup(page)
+
+        # If the "Summary of your previous attempts" table exists, it's submitted
+        if soup.select_one("table.generaltable") or soup.select_one(".quizattemptsummary"):
+            return "Submitted"
+
+        # If specific 'No attempts' text is found, it's not submitted
+        page_text = soup.get_text().lower()
+        if "no attempts have been made yet" in page_text:
+            return "Not submitted"
+
+        # If an "Attempt quiz now" button exists without a summary table
+        if soup.find("input", value=re.compile(r"Attempt", re.I)):
+            return "Not submitted"
+        return "Not submitted"
+
     def _get_quiz_status(self, quiz_url: str) -> str:
         """Checks if a quiz has been submitted by looking for the attempt summary."""
         try:
             r = self._request("GET", quiz_url)
-            soup = self._soup(r.text)
-            
-            # If the "Summary of your previous attempts" table exists, it's submitted
-            if soup.select_one("table.generaltable") or soup.select_one(".quizattemptsummary"):
-                return "Submitted"
-            
-            # If specific 'No attempts' text is found, it's not submitted
-            page_text = soup.get_text().lower()
-            if "no attempts have been made yet" in page_text:
-                return "Not submitted"
-                
-            # If an "Attempt quiz now" button exists without a summary table
-            if soup.find("input", value=re.compile(r"Attempt", re.I)):
-                return "Not submitted"
-        except:
+            return self._quiz_status_from_page(r.text)
+        except Exception:
+            return "Not submitted"
+
+    async def _aget_quiz_status(self, quiz_url: str) -> str:
+        try:
+            r = await self._arequest("GET", quiz_url)
+            return self._quiz_status_from_page(r.text)
+        except Exception:
+            return "Not submitted"
+
+    def _quiz_cache_key(self, quiz: Dict[str, Any]) -> Optional[str]:
+        if self.quiz_status_cache is None or not self.username:
+            return None
+        url_hash = hashlib.sha1(quiz["url"].encode("utf-8")).hexdigest()
+        closes = (quiz.get("quiz_closes") or "-").replace(" ", "T")
+        return f"quiz_status:{self.username}:{url_hash}:{closes}"
+
+    @staticmethod
+    def _quiz_is_closed(quiz: Dict[str, Any]) -> bool:
+        try:
+            closes = datetime.strptime(str(quiz.get("quiz_closes") or "").strip(), "%Y-%m-%d %H:%M")
+        except ValueError:
+            return False
+        return closes.replace(tzinfo=TZ) < datetime.now(TZ)
+
+    def _quiz_statuses_from_cache(self, quizzes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Fills status from the cache (one MGET); returns quizzes still unknown."""
+        pending = [q for q in quizzes if q.get("status") is None]
+        keys = [self._quiz_cache_key(q) for q in pending]
+        if not pending or keys[0] is None:
+            return pending
+
+        try:
+            cached = self.quiz_status_cache.mget(keys)
+        except Exception:
+            return pending
+
+        unknown = []
+        for q, value in zip(pending, cached):
+            if isinstance(value, bytes):
+                value = value.decode()
+            if value:
+                q["status"] = value
+            else:
+                unknown.append(q)
+        return unknown
+
+    def _store_quiz_statuses(self, fetched: List[Dict[str, Any]]) -> None:
+        if self.quiz_status_cache is None or not self.username:
+            return
+        try:
+            pipe = self.quiz_status_cache.pipeline(transaction=False)
+            for q in fetched:
+                if q["status"] == "Submitted" or self._quiz_is_closed(q):
+                    pipe.set(self._quiz_cache_key(q), q["status"], ex=self.cfg.quiz_status_cache_ttl)
+            pipe.execute()
+        except Exception:
             pass
-        return "Not submitted"
-    def _parse_quiz_index_page(self, quiz_index_html: str, quiz_index_url: str) -> List[Dict[str, Any]]:
+
+    def _resolve_quiz_statuses(self, quizzes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        unknown = self._quiz_statuses_from_cache(quizzes)
+        if unknown:
+            for q in unknown:
+                q["status"] = self._get_quiz_status(q["url"])
+            self._store_quiz_statuses(unknown)
+        return quizzes
+
+    async def _aresolve_quiz_statuses(self, quizzes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        unknown = self._quiz_statuses_from_cache(quizzes)
+        if unknown:
+            # bounded by the per-host slots in _arequest
+            statuses = await asyncio.gather(*(self._aget_quiz_status(q["url"]) for q in unknown))
+            for q, status in zip(unknown, statuses):
+                q["status"] = status
+            self._store_quiz_statuses(unknown)
+        return quizzes
+
+    def _parse_quiz_index_rows(self, quiz_index_html: PageLike, quiz_index_url: str) -> List[Dict[str, Any]]:
         """
         Parses /mod/quiz/index.php?id=COURSE_ID
         Extracts: Week, Name (+url), Quiz closes, Grade.
+        status is only set when the index page already tells (graded), else None.
         """
+        if (page := self._fast(quiz_index_html)) is not None:
+            return fastparse.quiz_index_rows(page.tree, quiz_index_url, self._quiz_status_from_index)
         soup = self._soup(quiz_index_html)
         table = soup.select_one("table.generaltable")
         if not table:
@@ -159,23 +400,29 @@ class EclassClient:
 
             closes = tds[2].get_text(" ", strip=True) or None
             grade = tds[3].get_text(" ", strip=True) or None
-            quiz_url = urljoin(quiz_index_url, name_a["href"])
-            status = self._get_quiz_status(quiz_url)
             quizzes.append({
                 "week": week,
                 "name": name,
                 "quiz_closes": closes,
                 "grade": grade,
                 "url": quiz_url,
-                "status":status
+                "status": self._quiz_status_from_index(grade),
             })
 
         return quizzes
 
+    def _parse_quiz_index_page(self, quiz_index_html: PageLike, quiz_index_url: str) -> List[Dict[str, Any]]:
+        """
+        Parses /mod/quiz/index.php?id=COURSE_ID
+        Extracts: Week, Name (+url), Quiz closes, Grade, status.
+        """
+        quizzes = self._parse_quiz_index_rows(quiz_index_html, quiz_index_url)
+        return self._resolve_quiz_statuses(quizzes)
+
 
-    def get_quizzes_for_course(self, course_page_html: str) -> Optional[List[Dict[str, Any]]]:
+    def get_quizzes_for_course(self, course_page_html: PageLike) -> Optional[List[Dict[str, Any]]]:
         """
-        From a course page HTML:
+        From a course page HTML (or its ParsedPage):
         - If Quiz link exists -> returns list of quizzes (maybe empty).
         - If hidden/missing -> returns None.
         """
@@ -184,29 +431,68 @@ class EclassClient:
             return None
 
         r = self._request("GET", quiz_index_url)
-        if not self._is_logged_in_html(r.text):
+        page = ParsedPage(r.text, quiz_index_url)
+        if not self._is_logged_in_html(page):
             raise AuthExpired("Not logged in while opening quiz page.")
 
-        return self._parse_quiz_index_page(r.text, quiz_index_url)
+        return self._parse_quiz_index_page(page, quiz_index_url)
+
+    async def aget_quizzes_for_course(self, course_page_html: PageLike) -> Optional[List[Dict[str, Any]]]:
+        """Async get_quizzes_for_course."""
+        quiz_index_url = self._find_quiz_url(course_page_html)
+        if not quiz_index_url:
+            return None
+
+        page = await self._afetch_logged_in(quiz_index_url, "quiz")
+        quizzes = self._parse_quiz_index_rows(page, quiz_index_url)
+        return await self._aresolve_quiz_statuses(quizzes)
 
     # ---------- request + retry ----------
+    def _endpoint_class(self, url: str) -> str:
+        """Rate limit bucket of a URL: login, course (home/course page) or subpage."""
+        path = urlparse(url).path.rstrip("/")
+        if "/login/" in path or url.startswith(self.cfg.login_index_url):
+            return "login"
+        if path in ("", "/index.php", "/my") or path.endswith("/course/view.php"):
+            return "course"
+        return "subpage"
+
     def _sleep_backoff(self, attempt: int) -> None:
         base = self.cfg.backoff_base * (2 ** attempt)
         jitter = random.uniform(0, self.cfg.backoff_jitter)
-        time.sleep(base + jitter)
+        with tracer.start_as_current_span("eclass.backoff", {"attempt": attempt}):
+            time.sleep(base + jitter)
 
     def _request(self, method: str, url: str, *, allow_redirects: bool = True, **kwargs) -> requests.Response:
         last_exc: Optional[Exception] = None
+        endpoint = self._endpoint_class(url)
 
         for attempt in range(self.cfg.max_retries):
+            if attempt:
+                metrics.ECLASS_RETRIES.labels(endpoint, type(last_exc).__name__).inc()
+            if self.rate_limiter is not None:
+                with tracer.start_as_current_span("eclass.rate_limit", {"endpoint": endpoint}):
+                    waited = self.rate_limiter.acquire(endpoint)
+                if waited is None:
+                    # fleet budget stayed empty for max_wait: never go over it
+                    metrics.ECLASS_RATE_LIMIT_WAIT_SECONDS.labels(endpoint).inc(self.rate_limiter.max_wait)
+                    raise RateLimited(f"Rate limit budget for {endpoint} exhausted: {method} {url}")
+                if waited:
+                    metrics.ECLASS_RATE_LIMIT_WAIT_SECONDS.labels(endpoint).inc(waited)
+            t0 = time.perf_counter()
             try:
-                r = self.s.request(
-                    method,
-                    url,
-                    timeout=self.cfg.timeout,
-                    allow_redirects=allow_redirects,
-                    **kwargs,
-                )
+                with tracer.start_as_current_span(
+                    "eclass.http", {"endpoint": endpoint, "method": method, "attempt": attempt}
+                ) as span:
+                    r = self.s.request(
+                        method,
+                        url,
+                        timeout=self.cfg.timeout,
+                        allow_redirects=allow_redirects,
+                        **kwargs,
+                    )
+                    span.set_attribute("status", r.status_code)
+                metrics.observe_eclass_response(endpoint, r.status_code, time.perf_counter() - t0)
 
                 if r.status_code == 429:
                     ra = r.headers.get("Retry-After")
@@ -235,6 +521,7 @@ class EclassClient:
                 return r
 
             except (requests.Timeout, requests.ConnectionError) as e:
+                metrics.ECLASS_REQUEST_SECONDS.labels(endpoint, "network").observe(time.perf_counter() - t0)
                 last_exc = e
                 if attempt < self.cfg.max_retries - 1:
                     self._sleep_backoff(attempt)
@@ -248,11 +535,24 @@ class EclassClient:
 
     # ---------- html helpers ----------
     @staticmethod
-    def _soup(html: str) -> BeautifulSoup:
-        return BeautifulSoup(html, "lxml")
+    def _page(html: PageLike) -> ParsedPage:
+        return html if isinstance(html, ParsedPage) else ParsedPage(html)
 
     @classmethod
-    def _is_logged_in_html(cls, html: str) -> bool:
+    def _soup(cls, html: PageLike) -> BeautifulSoup:
+        return cls._page(html).soup
+
+    @classmethod
+    def _fast(cls, html: Optional[PageLike]) -> Optional[ParsedPage]:
+        """The page, when the lxml backend parses it (app/scraper/fastparse.py); else None."""
+        if html is None or ParsedPage.backend != "lxml":
+            return None
+        return cls._page(html)
+
+    @classmethod
+    def _is_logged_in_html(cls, html: PageLike) -> bool:
+        if (page := cls._fast(html)) is not None:
+            return fastparse.is_logged_in(page.tree)
         soup = cls._soup(html)
         if soup.select_one('a[href*="/login/logout.php"]'):
             return True
@@ -261,7 +561,7 @@ class EclassClient:
         return False
 
     @classmethod
-    def _looks_like_login_page(cls, html: str) -> bool:
+    def _looks_like_login_page(cls, html: PageLike) -> bool:
         soup = cls._soup(html)
         return (
             soup.select_one("form.form-login") is not None
@@ -269,7 +569,7 @@ class EclassClient:
         )
 
     @classmethod
-    def _extract_login_error(cls, html: str) -> Optional[str]:
+    def _extract_login_error(cls, html: PageLike) -> Optional[str]:
         soup = cls._soup(html)
         err = soup.select_one(".loginerrors, .error, .alert, .alert-danger")
         if err:
@@ -281,6 +581,7 @@ class EclassClient:
     # Login
     # =========================
     def login(self, username: str, password: str) -> None:
+        self.username = username
         r1 = self._request("GET", self.cfg.login_index_url)
         soup = self._soup(r1.text)
 
@@ -318,34 +619,31 @@ class EclassClient:
             },
         )
 
-        if self._is_logged_in_html(r2.text):
+        r2_page = ParsedPage(r2.text, r2.url)
+        if self._is_logged_in_html(r2_page):
             return
 
         home = self._request("GET", self.cfg.base_url)
-        if self._is_logged_in_html(home.text):
+        home_page = ParsedPage(home.text, home.url)
+        if self._is_logged_in_html(home_page):
             return
 
-        err = self._extract_login_error(r2.text) or self._extract_login_error(home.text)
+        err = self._extract_login_error(r2_page) or self._extract_login_error(home_page)
         if err:
             raise LoginFailed(f"Login failed: {err}")
 
-        if self._looks_like_login_page(home.text) or "login" in (home.url or ""):
+        if self._looks_like_login_page(home_page) or "login" in (home.url or ""):
             raise LoginFailed(f"Login failed: ended at {home.url}")
 
         raise LoginFailed("Login failed for unknown reason (no error message found).")
 
-    def _ensure_logged_in(self) -> None:
-        home = self._request("GET", self.cfg.base_url)
-        if not self._is_logged_in_html(home.text):
-            raise AuthExpired("Not logged in (session expired or login failed).")
-
 
 
 
     async def check_credentials(self, username: str, password: str) -> Tuple[bool, Optional[str]]:
         try:
             # 1) GET login page (to get hidden tokens)
-            r1 = await self.client.get(self.cfg.login_index_url)
+            r1 = await self._arequest("GET", self.cfg.login_index_url)
             soup = self._soup(r1.text)
 
             form = soup.select_one("form.mform.form-login")
@@ -371,7 +669,8 @@ class EclassClient:
                 payload[submit["name"]] = submit.get("value", "Log in")
 
             # 2) POST login
-            r2 = await self.client.post(
+            r2 = await self._arequest(
+                "POST",
                 post_url,
                 data=payload,
                 headers={
@@ -382,26 +681,32 @@ class EclassClient:
             )
 
             # Decide quickly
-            if self._is_logged_in_html(r2.text):
+            r2_page = ParsedPage(r2.text, str(r2.url))
+            if self._is_logged_in_html(r2_page):
                 return True, None
 
-            err = self._extract_login_error(r2.text)
+            err = self._extract_login_error(r2_page)
             if err:
                 return False, err
 
             # Optional: one more check (sometimes login redirects)
-            home = await self.client.get(self.cfg.base_url)
-            if self._is_logged_in_html(home.text):
+            home = await self._arequest("GET", self.cfg.base_url)
+            home_page = ParsedPage(home.text, str(home.url))
+            if self._is_logged_in_html(home_page):
                 return True, None
 
-            if self._looks_like_login_page(home.text):
+            if self._looks_like_login_page(home_page):
                 return False, "Invalid username or password."
 
             return False, "Login failed (unknown)."
 
-        except httpx.TimeoutException:
-            return False, "Timeout connecting to eClass."
-        except httpx.HTTPError:
+        except RateLimited:
+            return False, "eClass is busy, please try again in a minute."
+        except BlockedOrForbidden:
+            return False, "eClass refused the request (403)."
+        except EclassError as e:
+            if isinstance(e.__cause__, httpx.TimeoutException):
+                return False, "Timeout connecting to eClass."
             return False, "Network error connecting to eClass."
         
 
@@ -411,10 +716,16 @@ class EclassClient:
     # =========================
     def get_courses(self) -> List[Tuple[str, str]]:
         r = self._request("GET", self.cfg.base_url)
-        if not self._is_logged_in_html(r.text):
+        page = ParsedPage(r.text, r.url)
+        if not self._is_logged_in_html(page):
             raise AuthExpired("Not logged in (cannot fetch courses).")
 
-        soup = self._soup(r.text)
+        return self._parse_course_list(page)
+
+    def _parse_course_list(self, page: PageLike) -> List[Tuple[str, str]]:
+        if (fast := self._fast(page)) is not None:
+            return fastparse.course_list(fast.tree, self.cfg.base_url)
+        soup = self._soup(page)
         courses: List[Tuple[str, str]] = []
         for a in soup.select("ul.my-course-lists a.course_link"):
             href = a.get("href")
@@ -541,7 +852,9 @@ class EclassClient:
             return msg
         return None
 
-    def _parse_online_attendance_page(self, html: str) -> Dict[str, Any]:
+    def _parse_online_attendance_page(self, html: PageLike) -> Dict[str, Any]:
+        if (page := self._fast(html)) is not None:
+            return fastparse.online_attendance_page(page.tree)
         soup = self._soup(html)
 
         # If attendance not configured / page error
@@ -603,7 +916,9 @@ class EclassClient:
 
     
 
-    def _parse_offline_attendance_rows(self, html: str) -> dict:
+    def _parse_offline_attendance_rows(self, html: PageLike) -> dict:
+        if (page := self._fast(html)) is not None:
+            return fastparse.offline_attendance_rows(page.tree)
         soup = self._soup(html)
 
         table = soup.select_one("table.attendance_my")
@@ -656,7 +971,7 @@ class EclassClient:
 
         return {"records": records, "totals": totals}
 
-    def _parse_offline_attendance_page(self, html: str) -> Dict[str, Any]:
+    def _parse_offline_attendance_page(self, html: PageLike) -> Dict[str, Any]:
         soup = self._soup(html)
 
         danger = soup.select_one(".alert.alert-danger, .alert-danger, .error_message")
@@ -738,8 +1053,9 @@ class EclassClient:
     # =========================
     # NEW: Assignments parser
     # =========================
-    def _parse_assignments_index_page(self, html: str) -> Dict[str, Any]:
-  
+    def _parse_assignments_index_page(self, html: PageLike) -> Dict[str, Any]:
+        if (page := self._fast(html)) is not None:
+            return fastparse.assignments_index_page(page.tree, self.cfg.base_url)
         soup = self._soup(html)
 
         table = soup.select_one("table.generaltable")
@@ -814,38 +1130,30 @@ class EclassClient:
             return "Unknown"
         except Exception:
             return "Error checking status"
-    def get_attendance_for_course(self, subject_title: str, course_url: str):
+    # =========================
+    # Per-course parsing (shared by sync + async fetchers)
+    # =========================
+    def _parse_course_page(self, course_page: PageLike, subject_title: str, course_url: str) -> Dict[str, Any]:
         """
-        Returns ONE course object with:
-        - attendance totals: {"attendance": int, "absence": int, "late": int} or None
-        - attendance_records (offline rows): [
-                {"date_of_week": "YYYY-MM-DD", "class_name": str|None,
-                "attendance": bool, "absence": bool, "late": bool}
-            ] or None
-        - attendanceUrl, attendanceKind
-        - assignments, quizzes
-        - courseUrl, subjectNameFull, subjectKey, subjectName
+        Parses the course page itself (no extra requests):
+        subject name/key, professor and the sub-page URLs
+        (attendance offline/online, assignment index).
         """
-
-        # 1) Open course page
-        r = self._request("GET", course_url)
-        course_html = r.text
-        if not self._is_logged_in_html(course_html):
-            raise AuthExpired("Session expired while opening course page.")
-
-        soup = self._soup(course_html)
+        if (page := self._fast(course_page)) is not None:
+            return fastparse.course_page(page.tree, page.links, subject_title, course_url)
+        soup = self._soup(course_page)
         professor_name = self._find_professor_name(soup)
 
-        # 2) Subject name (full) + clean
+        # Subject name (full) + clean
         h1_a = soup.select_one(".coursename h1 a")
         subject_name_full = h1_a.get_text(" ", strip=True) if h1_a else subject_title
         subject_name_clean = subject_name_full.split("[", 1)[0].strip()
 
-        # 3) subjectKey from initials (your current logic)
+        # subjectKey from initials
         words = [w for w in subject_name_clean.replace("-", " ").split() if w.strip()]
         subject_key = "".join([w[0].upper() for w in words]) if words else subject_title
 
-        # 4) Detect attendance link (offline or online)
+        # Detect attendance link (offline or online)
         attendance_url = None
         attendance_kind = None
 
@@ -876,101 +1184,8 @@ class EclassClient:
             attendance_url = urljoin(course_url, a_on["href"])
             attendance_kind = "online"
 
-        # 5) Parse attendance totals + rows (rows only for offline)
-        attendance_counts = None
-        attendance_records = None
-
-        if attendance_url:
-            rr = self._request("GET", attendance_url)
-            att_html = rr.text
-
-            if not self._is_logged_in_html(att_html):
-                raise AuthExpired("Session expired while opening attendance page.")
-
-            att_soup = self._soup(att_html)
-
-            if attendance_kind == "offline":
-                # ---- parse rows ----
-                table = att_soup.select_one("table.attendance_my")
-                if table:
-                    def is_marked(x: str) -> bool:
-                        return (x or "").strip() in {"○", "O", "o", "◯"}
-
-                    attendance_records = []
-                    for tr in table.select("tbody tr"):
-                        tds = tr.find_all("td")
-                        if len(tds) < 5:
-                            continue
-
-                        week_str = tds[0].get_text(strip=True)  # "2026-02-16"
-                        class_name = tds[1].get_text(" ", strip=True) or None
-
-                        att_mark = tds[2].get_text(strip=True)
-                        abs_mark = tds[3].get_text(strip=True)
-                        late_mark = tds[4].get_text(strip=True)
-
-                        # date normalize
-                        date_of_week = week_str
-                        try:
-                            date_of_week = datetime.strptime(week_str, "%Y-%m-%d").date().isoformat()
-                        except Exception:
-                            pass
-
-                        attendance_records.append({
-                            "date_of_week": date_of_week,
-                            "class_name": class_name,
-                            "attendance": is_marked(att_mark),
-                            "absence": is_marked(abs_mark),
-                            "late": is_marked(late_mark),
-                        })
-
-                    # ---- parse totals from tfoot ----
-                    tfoot = table.select_one("tfoot")
-                    if tfoot:
-                        txt = tfoot.get_text(" ", strip=True)
-
-                        def grab(label: str) -> int:
-                            m = re.search(rf"{label}\s*:\s*(\d+)", txt, flags=re.I)
-                            return int(m.group(1)) if m else 0
-
-                        attendance_counts = {
-                            "attendance": grab("Attendance"),
-                            "absence": grab("Absence"),
-                            "late": grab("Late"),
-                        }
-
-            elif attendance_kind == "online":
-                # online totals block
-                box = (
-                    soup.select_one("div.user_attendance div.att_count")
-                    or soup.select_one("div.att_count")
-                    or att_soup.select_one("div.user_attendance div.att_count")
-                    or att_soup.select_one("div.att_count")
-                )
-
-                if box:
-                    attendance_counts = {"attendance": 0, "absence": 0, "late": 0}
-
-                    for p in box.find_all("p"):
-                        text = p.get_text(" ", strip=True).lower()
-                        span = p.find("span")
-                        if not span:
-                            continue
-
-                        try:
-                            val = int(re.search(r"\d+", span.get_text(strip=True)).group(0))
-                        except Exception:
-                            val = 0
-
-                        if any(k in text for k in ["attendance", "출석", "present"]):
-                            attendance_counts["attendance"] = val
-                        elif any(k in text for k in ["absence", "결석"]):
-                            attendance_counts["absence"] = val
-                        elif any(k in text for k in ["late", "지각"]):
-                            attendance_counts["late"] = val
-
-        # 6) ASSIGNMENTS (your existing logic)
-        assignments = None
+        # Assignment index link
+        assign_index_url = None
         assign_a = soup.select_one('a[href*="/mod/assign/index.php?id="]')
         if not assign_a:
             for a in soup.select("a[href]"):
@@ -981,52 +1196,172 @@ class EclassClient:
 
         if assign_a and assign_a.get("href"):
             assign_index_url = urljoin(course_url, assign_a["href"])
-            rr = self._request("GET", assign_index_url)
-            assign_html = rr.text
-            if not self._is_logged_in_html(assign_html):
-                raise AuthExpired("Session expired while opening assignment page.")
 
-            assign_soup = self._soup(assign_html)
-            table = assign_soup.select_one("table.generaltable")
-            assignments = []
+        return {
+            "subjectKey": subject_key,
+            "subjectNameFull": subject_name_full,
+            "subjectName": subject_name_clean,
+            "courseUrl": course_url,
+            "professorName": professor_name,
+            "attendanceUrl": attendance_url,
+            "attendanceKind": attendance_kind,
+            "assignIndexUrl": assign_index_url,
+        }
+
+    def _parse_course_attendance(
+        self,
+        course_page: Optional[PageLike],
+        att_page: PageLike,
+        attendance_kind: Optional[str],
+    ) -> Tuple[Optional[Dict[str, int]], Optional[List[Dict[str, Any]]]]:
+        """
+        Returns (totals, offline rows). Rows are only available for offline attendance.
+        """
+        if (att := self._fast(att_page)) is not None:
+            course = self._fast(course_page)
+            return fastparse.course_attendance(course.tree if course else None, att.tree, attendance_kind)
+        course_soup = self._soup(course_page) if course_page is not None else None
+        att_soup = self._soup(att_page)
+        attendance_counts = None
+        attendance_records = None
 
+        if attendance_kind == "offline":
+            # ---- parse rows ----
+            table = att_soup.select_one("table.attendance_my")
             if table:
+                def is_marked(x: str) -> bool:
+                    return (x or "").strip() in {"○", "O", "o", "◯"}
+
+                attendance_records = []
                 for tr in table.select("tbody tr"):
-                    tds = tr.select("td")
+                    tds = tr.find_all("td")
                     if len(tds) < 5:
                         continue
 
-                    week = tds[0].get_text(" ", strip=True) or None
-                    a = tds[1].select_one("a[href]")
-                    if not a:
+                    week_str = tds[0].get_text(strip=True)  # "2026-02-16"
+                    class_name = tds[1].get_text(" ", strip=True) or None
+
+                    att_mark = tds[2].get_text(strip=True)
+                    abs_mark = tds[3].get_text(strip=True)
+                    late_mark = tds[4].get_text(strip=True)
+
+                    # date normalize
+                    date_of_week = week_str
+                    try:
+                        date_of_week = datetime.strptime(week_str, "%Y-%m-%d").date().isoformat()
+                    except Exception:
+                        pass
+
+                    attendance_records.append({
+                        "date_of_week": date_of_week,
+                        "class_name": class_name,
+                        "attendance": is_marked(att_mark),
+                        "absence": is_marked(abs_mark),
+                        "late": is_marked(late_mark),
+                    })
+
+                # ---- parse totals from tfoot ----
+                tfoot = table.select_one("tfoot")
+                if tfoot:
+                    txt = tfoot.get_text(" ", strip=True)
+
+                    def grab(label: str) -> int:
+                        m = re.search(rf"{label}\s*:\s*(\d+)", txt, flags=re.I)
+                        return int(m.group(1)) if m else 0
+
+                    attendance_counts = {
+                        "attendance": grab("Attendance"),
+                        "absence": grab("Absence"),
+                        "late": grab("Late"),
+                    }
+
+        elif attendance_kind == "online":
+            # online totals block (course page may be unknown when it was not modified)
+            box = None
+            if course_soup is not None:
+                box = (
+                    course_soup.select_one("div.user_attendance div.att_count")
+                    or course_soup.select_one("div.att_count")
+                )
+            box = (
+                box
+                or att_soup.select_one("div.user_attendance div.att_count")
+                or att_soup.select_one("div.att_count")
+            )
+
+            if box:
+                attendance_counts = {"attendance": 0, "absence": 0, "late": 0}
+
+                for p in box.find_all("p"):
+                    text = p.get_text(" ", strip=True).lower()
+                    span = p.find("span")
+                    if not span:
                         continue
 
-                    name = a.get_text(" ", strip=True)
-                    url = urljoin(assign_index_url, a["href"])
-                    due_date = tds[2].get_text(" ", strip=True) or None
-                    submission = tds[3].get_text(" ", strip=True) or None
-                    grade = tds[4].get_text(" ", strip=True) or None
-
-                    assignments.append({
-                        "week": week,
-                        "name": name,
-                        "due_date": due_date,
-                        "submission": submission,
-                        "grade": grade,
-                        "url": url,
-                    })
+                    try:
+                        val = int(re.search(r"\d+", span.get_text(strip=True)).group(0))
+                    except Exception:
+                        val = 0
+
+                    if any(k in text for k in ["attendance", "출석", "present"]):
+                        attendance_counts["attendance"] = val
+                    elif any(k in text for k in ["absence", "결석"]):
+                        attendance_counts["absence"] = val
+                    elif any(k in text for k in ["late", "지각"]):
+                        attendance_counts["late"] = val
+
+        return attendance_counts, attendance_records
+
+    def _parse_course_assignments(self, assign_page: PageLike, assign_index_url: str) -> List[Dict[str, Any]]:
+        if (page := self._fast(assign_page)) is not None:
+            return fastparse.course_assignments(page.tree, assign_index_url)
+        table = self._soup(assign_page).select_one("table.generaltable")
+        assignments: List[Dict[str, Any]] = []
+
+        if table:
+            for tr in table.select("tbody tr"):
+                tds = tr.select("td")
+                if len(tds) < 5:
+                    continue
 
-        # NOTE: your quizzes part is below in your file; keep it as-is (or paste it here if you want me to merge too)
+                week = tds[0].get_text(" ", strip=True) or None
+                a = tds[1].select_one("a[href]")
+                if not a:
+                    continue
 
-        return {
-            "subjectKey": subject_key,
-            "subjectNameFull": subject_name_full,
-            "subjectName": subject_name_clean,
-            "courseUrl": course_url,
-            "professorName": professor_name,
+                name = a.get_text(" ", strip=True)
+                url = urljoin(assign_index_url, a["href"])
+                due_date = tds[2].get_text(" ", strip=True) or None
+                submission = tds[3].get_text(" ", strip=True) or None
+                grade = tds[4].get_text(" ", strip=True) or None
 
-            "attendanceUrl": attendance_url,
-            "attendanceKind": attendance_kind,
+                assignments.append({
+                    "week": week,
+                    "name": name,
+                    "due_date": due_date,
+                    "submission": submission,
+                    "grade": grade,
+                    "url": url,
+                })
+
+        return assignments
+
+    @staticmethod
+    def _course_result(
+        page: Dict[str, Any],
+        attendance_counts: Optional[Dict[str, int]],
+        attendance_records: Optional[List[Dict[str, Any]]],
+        assignments: Optional[List[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        return {
+            "subjectKey": page["subjectKey"],
+            "subjectNameFull": page["subjectNameFull"],
+            "subjectName": page["subjectName"],
+            "courseUrl": page["courseUrl"],
+            "professorName": page["professorName"],
+
+            "attendanceUrl": page["attendanceUrl"],
+            "attendanceKind": page["attendanceKind"],
             "attendance": attendance_counts,              # totals or None
             "attendance_records": attendance_records,     # list or None (offline only)
 
@@ -1035,21 +1370,114 @@ class EclassClient:
             # "quizzes": quizzes,
         }
 
+    def _course_stream(self) -> str:
+        """cfg.course_page_stream in effect: streaming needs the lxml backend."""
+        return self.cfg.course_page_stream if ParsedPage.backend == "lxml" else "off"
 
+    def _fetched_page(self, text: str, url: str, course: bool) -> ParsedPage:
+        return ParsedPage(text, url, course=course and self._course_stream() != "off")
 
+    def _fetch_logged_in(self, url: str, what: str, *, course: bool = False) -> ParsedPage:
+        r = self._request("GET", url)
+        page = self._fetched_page(r.text, r.url, course)
+        if not self._is_logged_in_html(page):
+            raise AuthExpired(f"Session expired while opening {what} page.")
+        return page
 
+    def get_attendance_for_course(self, subject_title: str, course_url: str):
+        """
+        Returns ONE course object with:
+        - attendance totals: {"attendance": int, "absence": int, "late": int} or None
+        - attendance_records (offline rows): [
+                {"date_of_week": "YYYY-MM-DD", "class_name": str|None,
+                "attendance": bool, "absence": bool, "late": bool}
+            ] or None
+        - attendanceUrl, attendanceKind
+        - assignments, quizzes
+        - courseUrl, subjectNameFull, subjectKey, subjectName
+        """
 
+        # 1) Open course page
+        course_page = self._fetch_logged_in(course_url, "course", course=True)
+        page = self._parse_course_page(course_page, subject_title, course_url)
 
+        # 2) Attendance totals + rows (rows only for offline)
+        attendance_counts = None
+        attendance_records = None
 
+        if page["attendanceUrl"]:
+            att_page = self._fetch_logged_in(page["attendanceUrl"], "attendance")
+            attendance_counts, attendance_records = self._parse_course_attendance(
+                course_page, att_page, page["attendanceKind"]
+            )
 
+        # 3) Assignments
+        assignments = None
+        if page["assignIndexUrl"]:
+            assign_page = self._fetch_logged_in(page["assignIndexUrl"], "assignment")
+            assignments = self._parse_course_assignments(assign_page, page["assignIndexUrl"])
+
+        return self._course_result(page, attendance_counts, attendance_records, assignments)
 
     # =========================
     # Bulk fetch (keeps going)
     # =========================
-    from typing import List, Dict, Any
+    def _subject_from_course_info(self, title: str, url: str, info: Dict[str, Any]) -> Dict[str, Any]:
+        # ---- subject short key ----
+        # Prefer already computed key if present, else make one
+        subject_key = (
+            info.get("subject")
+            or info.get("subjectKey")
+            or self.make_subject_key(title)
+        )
+
+        # ---- subject full name ----
+        # Prefer cleaned name if present, else clean from full title
+        subject_name = (
+            info.get("subject_name")
+            or info.get("subjectName")
+            or info.get("subjectNameFull")
+            or title
+        )
+
+        # If name includes "[...]" cut it off
+        if isinstance(subject_name, str) and "[" in subject_name:
+            subject_name = subject_name.split("[", 1)[0].strip()
+
+        # ---- attendance normalize ----
+        att = info.get("attendance") or {}
+        attendance = {
+            "attendance": int(att.get("attendance", 0) or 0),
+            "absence": int(att.get("absence", 0) or 0),
+            "late": int(att.get("late", 0) or 0),
+        }
+
+        return {
+            "subject": subject_key,
+            "subject_name": subject_name,
+            "professor_name": info.get("professorName"),
+            "course_url": info.get("course_url") or info.get("courseUrl") or url,
+            "attendance": attendance,  # totals
+            "attendance_records": info.get("attendance_records"),  # ✅ per-date rows (offline)
+            "assignments": info.get("assignments", None),
+            "quizzes": info.get("quizzes", None),
+        }
+
+    def _failed_subject(self, title: str, url: str, status: str, message: str) -> Dict[str, Any]:
+        return {
+            "subject": self.make_subject_key(title),
+            "subject_name": title.split("[", 1)[0].strip() if "[" in title else title,
+            "course_url": url,
+            "attendance": {"attendance": 0, "absence": 0, "late": 0},
+            "attendance_records": None,
+            "assignments": None,
+            "quizzes": None,
+            "status": status,
+            "message": message,
+        }
 
     def get_all_attendance(self) -> Dict[str, Any]:
-        self._ensure_logged_in()
+        # get_courses() raises AuthExpired itself, no extra home page GET needed
         courses = self.get_courses()  # <-- your existing function (list of (title, url))
 
         subjects: List[Dict[str, Any]] = []
@@ -1057,90 +1485,366 @@ class EclassClient:
         for title, url in courses:
             try:
                 info = self.get_attendance_for_course(title, url)
+                subjects.append(self._subject_from_course_info(title, url, info))
 
-                # ---- subject short key ----
-                # Prefer already computed key if present, else make one
-                subject_key = (
-                    info.get("subject")
-                    or info.get("subjectKey")
-                    or self.make_subject_key(title)
-                )
+            except (RateLimited, BlockedOrForbidden, TemporaryServerError) as e:
+                subjects.append(self._failed_subject(title, url, "request_failed", str(e)))
+
+            except AuthExpired as e:
+                subjects.append(self._failed_subject(title, url, "auth_expired", str(e)))
+
+            except Exception as e:
+                subjects.append(self._failed_subject(title, url, "unexpected_error", repr(e)))
+
+        # IMPORTANT: no self.student_id access, since your class doesn't have it
+        return {
+            "subjects": subjects
+        }
+
+    # =========================
+    # Async engine (httpx.AsyncClient)
+    # =========================
+    # Same flow as the blocking methods above, but a student's courses and
+    # each course's sub-pages are fetched concurrently. Concurrency towards
+    # one host is capped by cfg.max_concurrency_per_host.
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        sem = self._host_slots.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(max(1, self.cfg.max_concurrency_per_host))
+            self._host_slots[host] = sem
+        return sem
+
+    async def _asleep_backoff(self, attempt: int) -> None:
+        base = self.cfg.backoff_base * (2 ** attempt)
+        jitter = random.uniform(0, self.cfg.backoff_jitter)
+        with tracer.start_as_current_span("eclass.backoff", {"attempt": attempt}):
+            await asyncio.sleep(base + jitter)
+
+    async def _asend_streamed(
+        self, method: str, url: str, feed: fastparse.CoursePageFeed, *, allow_redirects: bool, **kwargs
+    ) -> httpx.Response:
+        """
+        client.request() that reads a 200 body into feed and stops
+        downloading once feed is done (the connection is then closed, not
+        returned to the pool). Other statuses are read in full.
+        """
+        feed.reset()
+        request = self.client.build_request(method, url, timeout=self.cfg.timeout, **kwargs)
+        r = await self.client.send(request, follow_redirects=allow_redirects, stream=True)
+        try:
+            if r.status_code == 200:
+                # fixed-size text blocks: the same content stops at the same place
+                async for block in r.aiter_text(fastparse.STREAM_BLOCK):
+                    if feed.feed(block):
+                        break
+            else:
+                await r.aread()
+        finally:
+            await r.aclose()
+        return r
+
+    async def _arequest(
+        self,
+        method: str,
+        url: str,
+        *,
+        allow_redirects: bool = True,
+        feed: Optional[fastparse.CoursePageFeed] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        last_exc: Optional[Exception] = None
+        endpoint = self._endpoint_class(url)
+
+        for attempt in range(self.cfg.max_retries):
+            if attempt:
+                metrics.ECLASS_RETRIES.labels(endpoint, type(last_exc).__name__).inc()
+            if self.rate_limiter is not None:
+                with tracer.start_as_current_span("eclass.rate_limit", {"endpoint": endpoint}):
+                    waited = await self.rate_limiter.aacquire(endpoint)
+                if waited is None:
+                    # fleet budget stayed empty for max_wait: never go over it
+                    metrics.ECLASS_RATE_LIMIT_WAIT_SECONDS.labels(endpoint).inc(self.rate_limiter.max_wait)
+                    raise RateLimited(f"Rate limit budget for {endpoint} exhausted: {method} {url}")
+                if waited:
+                    metrics.ECLASS_RATE_LIMIT_WAIT_SECONDS.labels(endpoint).inc(waited)
+            try:
+                async with self._host_slot(url):
+                    t0 = time.perf_counter()
+                    with tracer.start_as_current_span(
+                        "eclass.http", {"endpoint": endpoint, "method": method, "attempt": attempt}
+                    ) as span:
+                        try:
+                            if feed is None:
+                                r = await self.client.request(
+                                    method,
+                                    url,
+                                    timeout=self.cfg.timeout,
+                                    follow_redirects=allow_redirects,
+                                    **kwargs,
+                                )
+                            else:
+                                r = await self._asend_streamed(
+                                    method, url, feed, allow_redirects=allow_redirects, **kwargs
+                                )
+                                span.set_attribute("stopped_early", feed.done)
+                        except (httpx.TimeoutException, httpx.TransportError):
+                            metrics.ECLASS_REQUEST_SECONDS.labels(endpoint, "network").observe(time.perf_counter() - t0)
+                            raise
+                        span.set_attribute("status", r.status_code)
+                metrics.observe_eclass_response(endpoint, r.status_code, time.perf_counter() - t0)
+
+                if r.status_code == 429:
+                    ra = r.headers.get("Retry-After")
+                    if ra and ra.isdigit():
+                        await asyncio.sleep(int(ra))
+                    else:
+                        await self._asleep_backoff(attempt)
+                    last_exc = RateLimited(f"429 Rate limited at {url}")
+                    continue
+
+                if r.status_code == 403:
+                    if attempt < self.cfg.max_retries - 1:
+                        await self._asleep_backoff(attempt)
+                        last_exc = BlockedOrForbidden(f"403 Forbidden at {url}")
+                        continue
+                    raise BlockedOrForbidden(f"403 Forbidden at {url}")
+
+                if 500 <= r.status_code <= 599:
+                    if attempt < self.cfg.max_retries - 1:
+                        await self._asleep_backoff(attempt)
+                        last_exc = TemporaryServerError(f"{r.status_code} Server error at {url}")
+                        continue
+                    raise TemporaryServerError(f"{r.status_code} Server error at {url}")
+
+                if r.status_code == 304:
+                    # conditional GET (see _afetch_tracked)
+                    return r
+
+                r.raise_for_status()
+                return r
+
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                last_exc = e
+                if attempt < self.cfg.max_retries - 1:
+                    await self._asleep_backoff(attempt)
+                    continue
+                raise EclassError(f"Network error calling {url}: {e}") from e
+
+            except httpx.HTTPStatusError as e:
+                raise EclassError(f"HTTP error calling {url}: {e}") from e
+
+        raise EclassError(f"Request failed after retries: {method} {url}. Last error: {last_exc}")
+
+    async def alogin(self, username: str, password: str) -> None:
+        self.username = username
+        r1 = await self._arequest("GET", self.cfg.login_index_url)
+        soup = self._soup(r1.text)
+
+        form = soup.select_one("form.mform.form-login")
+        if not form:
+            raise LoginFailed("Login form not found on /login/index.php (layout changed or blocked).")
+
+        action = form.get("action") or self.cfg.login_index_url
+        post_url = urljoin(self.cfg.base_url, action)
+
+        payload: Dict[str, str] = {}
+        for inp in form.select("input[name]"):
+            name = inp.get("name")
+            if not name:
+                continue
+            if (inp.get("type") or "").lower() == "hidden":
+                payload[name] = inp.get("value", "")
 
-                # ---- subject full name ----
-                # Prefer cleaned name if present, else clean from full title
-                subject_name = (
-                    info.get("subject_name")
-                    or info.get("subjectName")
-                    or info.get("subjectNameFull")
-                    or title
+        payload["username"] = username
+        payload["password"] = password
+
+        submit = form.select_one('input[type="submit"][name]')
+        if submit and submit.get("name"):
+            payload[submit["name"]] = submit.get("value", "Log in")
+
+        r2 = await self._arequest(
+            "POST",
+            post_url,
+            data=payload,
+            headers={
+                "Origin": self.cfg.base_url.rstrip("/"),
+                "Referer": str(r1.url),
+                "Content-Type": "application/x-www-form-urlencoded",
+            },
+        )
+
+        r2_page = ParsedPage(r2.text, str(r2.url))
+        if self._is_logged_in_html(r2_page):
+            return
+
+        home = await self._arequest("GET", self.cfg.base_url)
+        home_page = ParsedPage(home.text, str(home.url))
+        if self._is_logged_in_html(home_page):
+            return
+
+        err = self._extract_login_error(r2_page) or self._extract_login_error(home_page)
+        if err:
+            raise LoginFailed(f"Login failed: {err}")
+
+        if self._looks_like_login_page(home_page) or "login" in str(home.url or ""):
+            raise LoginFailed(f"Login failed: ended at {home.url}")
+
+        raise LoginFailed("Login failed for unknown reason (no error message found).")
+
+    async def aget_courses(self) -> List[Tuple[str, str]]:
+        with tracer.start_as_current_span("eclass.courses") as span:
+            r = await self._arequest("GET", self.cfg.base_url)
+            page = ParsedPage(r.text, str(r.url))
+            if not self._is_logged_in_html(page):
+                raise AuthExpired("Not logged in (cannot fetch courses).")
+
+            courses = self._parse_course_list(page)
+            span.set_attribute("courses", len(courses))
+            return courses
+
+    def _course_feed(self, course: bool) -> Optional[fastparse.CoursePageFeed]:
+        return fastparse.CoursePageFeed() if course and self._course_stream() == "download" else None
+
+    def _afetched_page(self, r: httpx.Response, feed: Optional[fastparse.CoursePageFeed], course: bool) -> ParsedPage:
+        if feed is not None:
+            return ParsedPage.from_feed(feed, str(r.url))
+        return self._fetched_page(r.text, str(r.url), course)
+
+    async def _afetch_logged_in(self, url: str, what: str, *, course: bool = False) -> ParsedPage:
+        feed = self._course_feed(course)
+        r = await self._arequest("GET", url, feed=feed)
+        page = self._afetched_page(r, feed, course)
+        if not self._is_logged_in_html(page):
+            raise AuthExpired(f"Session expired while opening {what} page.")
+        return page
+
+    async def _afetch_tracked(
+        self, url: str, what: str, course_url: str, *, conditional: bool = True, course: bool = False
+    ) -> Tuple[Optional[ParsedPage], bool]:
+        """
+        _afetch_logged_in + page change tracking (self.tracker).
+        Returns (page, unchanged); page is None on 304 Not Modified.
+        A page whose content hash matches the last run is not parsed at all,
+        not even for the auth check (the same content was a logged-in page).
+        A course page streamed with "download" is hashed as far as it was
+        read: the cut-off is the same for the same content.
+        """
+        tracker = self.tracker
+        if tracker is None:
+            return await self._afetch_logged_in(url, what, course=course), False
+
+        headers = tracker.conditional_headers(url) if conditional else {}
+        feed = self._course_feed(course)
+        r = await self._arequest("GET", url, headers=headers, feed=feed)
+        if r.status_code == 304:
+            tracker.not_modified(course_url, url)
+            return None, True
+
+        page = self._afetched_page(r, feed, course)
+        if tracker.observe(course_url, url, page.html, r.headers):
+            return page, True
+
+        if not self._is_logged_in_html(page):
+            raise AuthExpired(f"Session expired while opening {what} page.")
+        return page, False
+
+    async def aget_attendance_for_course(self, subject_title: str, course_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Async get_attendance_for_course: sub-pages are fetched concurrently.
+
+        With a tracker set, unchanged pages are not parsed and their part of
+        the previous result is reused. Returns None when every page of the
+        course is unchanged: the caller then reuses the previous subject.
+        """
+        tracker = self.tracker
+        previous = tracker.previous_subject(course_url) if tracker else None
+
+        course_page, course_same = await self._afetch_tracked(course_url, "course", course_url, course=True)
+        page = tracker.course_info(course_url) if (tracker and course_same) else None
+        if page is None:
+            if course_page is None:
+                course_page, course_same = await self._afetch_tracked(
+                    course_url, "course", course_url, conditional=False, course=True
                 )
+            page = self._parse_course_page(course_page, subject_title, course_url)
+            if tracker:
+                tracker.remember_course_info(course_url, page)
+
+        async def fetch_attendance():
+            url = page["attendanceUrl"]
+            if not url:
+                return None, None, True
+            att_page, same = await self._afetch_tracked(url, "attendance", course_url)
+            if same and previous is not None:
+                return previous.get("attendance"), previous.get("attendance_records"), True
+            if att_page is None:
+                att_page, same = await self._afetch_tracked(url, "attendance", course_url, conditional=False)
+            # only online attendance looks at the course page itself
+            course = course_page if page["attendanceKind"] == "online" else None
+            counts, records = self._parse_course_attendance(course, att_page, page["attendanceKind"])
+            return counts, records, False
+
+        async def fetch_assignments():
+            url = page["assignIndexUrl"]
+            if not url:
+                return None, True
+            assign_page, same = await self._afetch_tracked(url, "assignment", course_url)
+            if same and previous is not None:
+                return previous.get("assignments"), True
+            if assign_page is None:
+                assign_page, same = await self._afetch_tracked(url, "assignment", course_url, conditional=False)
+            return self._parse_course_assignments(assign_page, url), False
+
+        (attendance_counts, attendance_records, att_same), (assignments, assign_same) = await asyncio.gather(
+            fetch_attendance(), fetch_assignments()
+        )
 
-                # If name includes "[...]" cut it off
-                if isinstance(subject_name, str) and "[" in subject_name:
-                    subject_name = subject_name.split("[", 1)[0].strip()
+        if tracker and previous is not None and course_same and att_same and assign_same:
+            tracker.mark_unchanged(course_url)
+            return None
 
-                # ---- attendance normalize ----
-                att = info.get("attendance") or {}
-                attendance = {
-                    "attendance": int(att.get("attendance", 0) or 0),
-                    "absence": int(att.get("absence", 0) or 0),
-                    "late": int(att.get("late", 0) or 0),
-                }
+        return self._course_result(page, attendance_counts, attendance_records, assignments)
 
-                subjects.append({
-                "subject": subject_key,
-                "subject_name": subject_name,
-                "professor_name": info.get("professorName"),
-                "course_url": info.get("course_url") or info.get("courseUrl") or url,
-                "attendance": attendance,  # totals
-                "attendance_records": info.get("attendance_records"),  # ✅ per-date rows (offline)
-                "assignments": info.get("assignments", None),
-                "quizzes": info.get("quizzes", None),
-            })
+    async def _aget_subject(self, title: str, url: str) -> Dict[str, Any]:
+        with tracer.start_as_current_span("eclass.course", {"course_id": self._course_id_from_url(url) or ""}) as span:
+            subject = await self._aget_subject_untraced(title, url)
+            span.set_attribute("status", subject.get("status") or "ok")
+            return subject
 
+    async def _aget_subject_untraced(self, title: str, url: str) -> Dict[str, Any]:
+        try:
+            info = await self.aget_attendance_for_course(title, url)
+            if info is None:
+                return self.tracker.previous_subject(url)
+            return self._subject_from_course_info(title, url, info)
 
-            except (RateLimited, BlockedOrForbidden, TemporaryServerError) as e:
-                subjects.append({
-                    "subject": self.make_subject_key(title),
-                    "subject_name": title.split("[", 1)[0].strip() if "[" in title else title,
-                    "course_url": url,
-                    "attendance": {"attendance": 0, "absence": 0, "late": 0},
-                    "attendance_records": None,
-                    "assignments": None,
-                    "quizzes": None,
-                    "status": "request_failed",
-                    "message": str(e),
-                })
+        except (RateLimited, BlockedOrForbidden, TemporaryServerError) as e:
+            self._drop_tracked_course(url)
+            return self._failed_subject(title, url, "request_failed", str(e))
 
-            except AuthExpired as e:
-                subjects.append({
-                    "subject": self.make_subject_key(title),
-                    "subject_name": title.split("[", 1)[0].strip() if "[" in title else title,
-                    "course_url": url,
-                    "attendance": {"attendance": 0, "absence": 0, "late": 0},
-                    "attendance_records": None,
-                    "assignments": None,
-                    "quizzes": None,
-                    "status": "auth_expired",
-                    "message": str(e),
-                })
+        except AuthExpired as e:
+            self._drop_tracked_course(url)
+            return self._failed_subject(title, url, "auth_expired", str(e))
 
-            except Exception as e:
-                subjects.append({
-                    "subject": self.make_subject_key(title),
-                    "subject_name": title.split("[", 1)[0].strip() if "[" in title else title,
-                    "course_url": url,
-                    "attendance": {"attendance": 0, "absence": 0, "late": 0},
-                    "attendance_records": None,
-                    "assignments": None,
-                    "quizzes": None,
-                    "status": "unexpected_error",
-                    "message": repr(e),
-                })
+        except Exception as e:
+            self._drop_tracked_course(url)
+            return self._failed_subject(title, url, "unexpected_error", repr(e))
 
-        # IMPORTANT: no self.student_id access, since your class doesn't have it
+    def _drop_tracked_course(self, course_url: str) -> None:
+        if self.tracker is not None:
+            self.tracker.drop_course(course_url)
+
+    async def aget_all_attendance(self) -> Dict[str, Any]:
+        """
+        Async get_all_attendance. aget_courses() already raises AuthExpired
+        when the session is gone, so no separate home page check is needed.
+        Subjects keep the course list order.
+        """
+        courses = await self.aget_courses()
+        subjects = await asyncio.gather(*(self._aget_subject(title, url) for title, url in courses))
         return {
-            "subjects": subjects
+            "subjects": list(subjects)
         }
 
 
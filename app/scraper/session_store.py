@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class EclassSessionStore:
+    """
+    Per-user eClass cookies (MoodleSession & co.) kept in Redis with a TTL,
+    so the next scrape can reuse the session instead of logging in again.
+    """
+
+    def __init__(self, redis_client, ttl_seconds: int) -> None:
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _key(user_id: Any) -> str:
+        return f"eclass:cookies:{user_id}"
+
+    def load(self, user_id: Any) -> Optional[List[Dict[str, str]]]:
+        try:
+            raw = self.redis.get(self._key(user_id))
+        except Exception:
+            return None
+        if not raw:
+            return None
+        try:
+            cookies = json.loads(raw)
+        except ValueError:
+            return None
+        return cookies or None
+
+    def save(self, user_id: Any, cookies: List[Dict[str, str]]) -> None:
+        if not cookies:
+            return
+        try:
+            self.redis.set(self._key(user_id), json.dumps(cookies), ex=self.ttl_seconds)
+        except Exception:
+            pass
+
+    def delete(self, user_id: Any) -> None:
+        try:
+            self.redis.delete(self._key(user_id))
+        except Exception:
+            pass
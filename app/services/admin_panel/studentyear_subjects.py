@@ -1,11 +1,12 @@
 from typing import List
 from uuid import UUID
 from app.api.schema.styear import MajorBase, Professors, SubjectOUT
-from app.database.models import StudentYear,Major,Subject
+from app.database.models import Class, StudentYear,Major,Subject
 
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
 
 class StYearService():
     def __init__(self,session:AsyncSession):
@@ -28,6 +29,10 @@ class StYearService():
         stmt = await self.session.execute(
             select(Subject)
             .where(Subject.student_year_id == sty_id)
+            .options(
+                selectinload(Subject.majors),
+                selectinload(Subject.classes).joinedload(Class.professor),
+            )
         )
 
         subjects = stmt.scalars().all()
@@ -8,6 +8,9 @@ from datetime import time
 
 from sqlalchemy.ext.asyncio import AsyncSession
 import pandas as pd
+from app.infra.redis_async import notification_cache_async
+from app.infra.redis_sync import TIMETABLE_VERSION_KEY
+from app.services.time_table import invalidate_group_timetables
 from pydantic import BaseModel,field_validator
 
 class ClassBase(BaseModel):
@@ -36,6 +39,16 @@ ALLOWED_EXTENSIONS = ["csv",]
 class ClassService:
     def __init__(self, session: AsyncSession):
         self.session = session
+
+    async def _timetable_changed(self, group_ids=None) -> None:
+        # drop rendered timetables (all groups when None)
+        await invalidate_group_timetables(group_ids)
+        # lets the reminder scheduler reload its day index
+        try:
+            await notification_cache_async.incr(TIMETABLE_VERSION_KEY)
+        except Exception:
+            pass
+
     async def adding_classes_by_csv(self, file: UploadFile) -> str:
         if file.content_type not in ALLOWED_CONTENT_TYPES:
             raise HTTPException(status_code=400, detail="File type not allowed. Allowed only for .csv!")
@@ -54,6 +67,8 @@ class ClassService:
             await self.session.execute(delete(ClassTime))
             await self.session.execute(delete(Class))
             await self.session.commit()
+            # the old classes are gone even if a row below fails: don't keep serving them
+            await self._timetable_changed()
 
             # ✅ Caches (speed)
             subject_cache: dict[str, Subject] = {}
@@ -156,6 +171,7 @@ class ClassService:
                     detail=f"DB integrity error (maybe duplicate ClassTime rows). Add UNIQUE constraint or clean CSV. {str(e)}"
                 )
 
+            await self._timetable_changed()
             return "successfully updated whole database"
 
         except ValidationError as e:
@@ -289,6 +305,7 @@ class ClassService:
                     detail=f"DB integrity error while inserting ClassTime rows: {str(e)}",
                 )
 
+            await self._timetable_changed([g.id for g in group_cache.values()])
             return {
                 "status": "ok",
                 "classes_updated": deleted_classes,
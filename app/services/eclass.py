@@ -5,10 +5,13 @@ from sqlalchemy import select
 
 
 from app.infra.redis_async import redis_user_info_cache_async,redis_registered_users
+from app.infra.rate_limit import eclass_rate_limiter
 from app.scraper.script import AuthExpired, BlockedOrForbidden, EclassClient, EclassError, LoginFailed, RateLimited, pack_student_rest
 from app.services.scraping import ScrapService
+from app.services.student_stats import STATS_TTL_SECONDS, build_stats_mapping, stats_key
 from app.worker.tasks import take_info_from_eclass_one_user
 from app.database.models import User,EclassSnapshot
+from app.services.identity import UserIdentity
 from app.utils import send_message
 from app.database.session_sync import get_sync_session
 from app.scraper.script import EclassClient
@@ -24,8 +27,8 @@ class EClassService():
     def __init__(self,session:AsyncSession):
         self.session = session
 
-    async def register_load_data(self,user:User):
-        if user.password == None:
+    async def register_load_data(self,user:User|UserIdentity):
+        if not user.has_password:
             raise HTTPException(detail="password is not found",status_code=404)
         
         
@@ -92,6 +95,8 @@ class EClassService():
         
 
         await redis_user_info_cache_async.set(str(user.id), json.dumps(info.payload),  ex=60*60*120)
+        await redis_user_info_cache_async.hset(stats_key(user.id), mapping=build_stats_mapping(info.payload))
+        await redis_user_info_cache_async.expire(stats_key(user.id), STATS_TTL_SECONDS)
 
         return info.payload
         
@@ -99,14 +104,15 @@ class EClassService():
 
 
     async def get_test(self,st_id:str,password:str):
-        c = EclassClient()
+        c = EclassClient(rate_limiter=eclass_rate_limiter)
 
    
         from pprint import pprint
         try:
-            c.login(st_id, password)
+            # async variants: the limiter may wait, which must not block the event loop
+            await c.alogin(st_id, password)
 
-            rows = c.get_all_attendance()
+            rows = await c.aget_all_attendance()
 
             final_json = pack_student_rest(st_id, rows)
             return final_json
@@ -121,6 +127,8 @@ class EClassService():
             print("AUTH EXPIRED:", e)
         except EclassError as e:
             print("GENERAL ERROR:", e)
+        finally:
+            await c.aclose()
 
             
         
@@ -0,0 +1,250 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, noload
+
+from app.database.models import Class, Enrollment, Professor, Subject, User
+
+
+class EnrollmentResolver:
+    """
+    Subject / Professor / Class / Enrollment resolution for a scrape run.
+
+    Subjects and professors are looked up by the names being resolved
+    (one WHERE name IN (...) query each, only for names not seen yet by
+    this resolver), classes per group (preload()). Missing rows are
+    created in batches with INSERT ... ON CONFLICT DO NOTHING RETURNING,
+    so resolving one user's enrollments costs a constant number of queries
+    that does not grow with the subject / professor tables.
+
+    Class is UNIQUE(group_id, subject_id): a professor change updates the
+    existing class, it never inserts a new one.
+
+    Rows created or changed since the last commit() are dropped from the maps
+    by rollback(), so a failed user does not leave ids of rolled back rows.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+        self.subjects: Dict[str, UUID] = {}
+        self.professors: Dict[str, UUID] = {}
+        # (group_id, subject_id) -> [class_id, professor_id]
+        self.classes: Dict[Tuple[UUID, UUID], List[UUID]] = {}
+        self._groups: Set[UUID] = set()
+        self._pending: List[Tuple[dict, object]] = []
+
+    # ---------- cache ----------
+    def preload(self, group_ids: Iterable[UUID]) -> None:
+        """Classes of the given groups (one query for all groups not loaded yet)."""
+        groups = {g for g in group_ids if g is not None} - self._groups
+        if not groups:
+            return
+        rows = self.session.execute(
+            select(Class.id, Class.group_id, Class.subject_id, Class.professor_id)
+            .where(Class.group_id.in_(groups))
+        ).all()
+        for cid, gid, sid, pid in rows:
+            self.classes[(gid, sid)] = [cid, pid]
+        self._groups |= groups
+
+    def commit(self) -> None:
+        self._pending.clear()
+
+    def rollback(self) -> None:
+        for cache, key in self._pending:
+            cache.pop(key, None)
+        self._pending.clear()
+
+    # ---------- resolution ----------
+    def resolve(self, user: User, subjects: List[dict]) -> Tuple[List[Enrollment], Set[UUID]]:
+        """
+        Enrollments for the scraped subjects, in the same order, and the ids
+        of the enrollments this call inserted (they have no assignment /
+        attendance rows yet, even if the course pages did not change).
+        """
+        if user.group_id is None:
+            raise ValueError(f"user.group_id is None for user_id={user.id} student_id={user.student_id}")
+        if not subjects:
+            return [], set()
+        self.preload([user.group_id])
+
+        names = [(s.get("subject_name") or "").strip() for s in subjects]
+        shorts = [(s.get("subject") or "").strip() for s in subjects]
+        profs = [(s.get("professor_name") or "").strip() for s in subjects]
+
+        self._ensure_subjects(dict(zip(names, shorts)))
+        self._ensure_professors(set(profs))
+
+        class_ids = self._ensure_classes(
+            user.group_id,
+            [(self.subjects[n], self.professors[p]) for n, p in zip(names, profs)],
+        )
+        by_class, created = self._ensure_enrollments(user, class_ids, subjects)
+        return [by_class[cid] for cid in class_ids], created
+
+    def _ensure_subjects(self, wanted: Dict[str, str]) -> None:
+        unknown = [n for n in wanted if n not in self.subjects]
+        if not unknown:
+            return
+        # rows that already exist survive a rollback: not tracked in _pending
+        self.subjects.update(
+            {name: sid for sid, name in self.session.execute(
+                select(Subject.id, Subject.name).where(Subject.name.in_(unknown))
+            ).all()}
+        )
+        missing = {n: wanted[n] for n in unknown if n not in self.subjects}
+        if not missing:
+            return
+        stmt = (
+            insert(Subject.__table__)
+            .values([{"id": uuid4(), "name": n, "short_name": s} for n, s in missing.items()])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Subject.__table__.c.id, Subject.__table__.c.name)
+        )
+        found = dict((name, sid) for sid, name in self.session.execute(stmt).all())
+        left = set(missing) - set(found)
+        if left:
+            # created concurrently by another worker
+            found.update(
+                {name: sid for sid, name in self.session.execute(
+                    select(Subject.id, Subject.name).where(Subject.name.in_(left))
+                ).all()}
+            )
+        for name, sid in found.items():
+            self.subjects[name] = sid
+            self._pending.append((self.subjects, name))
+
+    def _ensure_professors(self, wanted: Set[str]) -> None:
+        unknown = [n for n in wanted if n not in self.professors]
+        if not unknown:
+            return
+        self.professors.update(
+            {name: pid for pid, name in self.session.execute(
+                select(Professor.id, Professor.name).where(Professor.name.in_(unknown))
+            ).all()}
+        )
+        missing = [n for n in unknown if n not in self.professors]
+        if not missing:
+            return
+        stmt = (
+            insert(Professor.__table__)
+            .values([{"id": uuid4(), "name": n} for n in missing])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Professor.__table__.c.id, Professor.__table__.c.name)
+        )
+        found = dict((name, pid) for pid, name in self.session.execute(stmt).all())
+        left = set(missing) - set(found)
+        if left:
+            found.update(
+                {name: pid for pid, name in self.session.execute(
+                    select(Professor.id, Professor.name).where(Professor.name.in_(left))
+                ).all()}
+            )
+        for name, pid in found.items():
+            self.professors[name] = pid
+            self._pending.append((self.professors, name))
+
+    def _ensure_classes(self, group_id: UUID, pairs: List[Tuple[UUID, UUID]]) -> List[UUID]:
+        """pairs: (subject_id, professor_id) per subject -> class ids in the same order."""
+        missing: Dict[UUID, UUID] = {}
+        changed: List[dict] = []
+        for sid, pid in pairs:
+            entry = self.classes.get((group_id, sid))
+            if entry is None:
+                missing.setdefault(sid, pid)
+            elif entry[1] != pid:
+                # professor can change (online, different teacher) -> update (no insert)
+                changed.append({"b_id": entry[0], "b_professor_id": pid})
+                entry[1] = pid
+                self._pending.append((self.classes, (group_id, sid)))
+
+        if missing:
+            table = Class.__table__
+            stmt = (
+                insert(table)
+                .values([
+                    {"id": uuid4(), "group_id": group_id, "subject_id": sid, "professor_id": pid}
+                    for sid, pid in missing.items()
+                ])
+                .on_conflict_do_nothing(index_elements=["group_id", "subject_id"])
+                .returning(table.c.id, table.c.subject_id, table.c.professor_id)
+            )
+            rows = self.session.execute(stmt).all()
+            left = set(missing) - {sid for _, sid, _ in rows}
+            if left:
+                rows += self.session.execute(
+                    select(Class.id, Class.subject_id, Class.professor_id).where(
+                        Class.group_id == group_id,
+                        Class.subject_id.in_(left),
+                    )
+                ).all()
+            for cid, sid, pid in rows:
+                self.classes[(group_id, sid)] = [cid, pid]
+                self._pending.append((self.classes, (group_id, sid)))
+                if pid != missing[sid]:
+                    changed.append({"b_id": cid, "b_professor_id": missing[sid]})
+                    self.classes[(group_id, sid)][1] = missing[sid]
+
+        if changed:
+            table = Class.__table__
+            self.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values(professor_id=bindparam("b_professor_id")),
+                changed,
+            )
+
+        return [self.classes[(group_id, sid)][0] for sid, _ in pairs]
+
+    def _ensure_enrollments(
+        self, user: User, class_ids: List[UUID], subjects: List[dict]
+    ) -> Tuple[Dict[UUID, Enrollment], Set[UUID]]:
+        """class_id -> Enrollment, plus the ids of the enrollments inserted here."""
+        wanted = list(dict.fromkeys(class_ids))
+
+        def load(ids) -> Dict[UUID, Enrollment]:
+            rows = self.session.execute(
+                select(Enrollment)
+                .options(noload(Enrollment.attendanceinfos))
+                .where(Enrollment.user_id == user.id, Enrollment.class_id.in_(ids))
+            ).scalars().all()
+            return {e.class_id: e for e in rows}
+
+        by_class = load(wanted)
+        missing = [cid for cid in wanted if cid not in by_class]
+        if not missing:
+            return by_class, set()
+
+        first_data: Dict[UUID, dict] = {}
+        for cid, data in zip(class_ids, subjects):
+            first_data.setdefault(cid, data)
+
+        values = []
+        for cid in missing:
+            att = first_data[cid].get("attendance") or {}
+            values.append({
+                "id": uuid4(),
+                "user_id": user.id,
+                "class_id": cid,
+                "attendance": _safe_int(att.get("attendance")),
+                "absence": _safe_int(att.get("absence")),
+                "late": _safe_int(att.get("late")),
+            })
+        table = Enrollment.__table__
+        created = set(self.session.execute(
+            insert(table)
+            .values(values)
+            .on_conflict_do_nothing(index_elements=["user_id", "class_id"])
+            .returning(table.c.id)
+        ).scalars().all())
+        by_class.update(load(missing))
+        return by_class, created
+
+
+def _safe_int(v: Optional[object], default: int = 0) -> int:
+    try:
+        return int(v)
+    except Exception:
+        return default
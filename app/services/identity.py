@@ -0,0 +1,140 @@
+"""
+Cached telegram_id -> user identity for the bot-facing dependencies.
+
+    identity:tg:{telegram_id}  ->  JSON {id, student_id, group_id, first_name, last_name, has_password}
+
+A miss reads only these columns (no ORM graph). Unknown telegram ids are
+cached too, for a shorter time. Every place that changes a user's
+telegram_id / password / group (registration, CSV import, scraper
+disabling a user) must call one of the invalidate_* helpers.
+"""
+import json
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import User
+from app.infra.redis_async import redis_user_info_cache_async
+
+IDENTITY_TTL_SECONDS = 300
+IDENTITY_MISS_TTL_SECONDS = 30
+_MISS = "-"
+
+
+def identity_key(telegram_id: Any) -> str:
+    return f"identity:tg:{telegram_id}"
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    """What the hot endpoints need from a user; the password itself is never cached."""
+
+    id: UUID
+    telegram_id: str
+    student_id: str
+    group_id: Optional[UUID]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    has_password: bool
+
+    def dumps(self) -> str:
+        data = asdict(self)
+        data["id"] = str(self.id)
+        data["group_id"] = str(self.group_id) if self.group_id else None
+        return json.dumps(data)
+
+    @classmethod
+    def loads(cls, raw: Any) -> "UserIdentity":
+        data = json.loads(raw)
+        data["id"] = UUID(data["id"])
+        data["group_id"] = UUID(data["group_id"]) if data.get("group_id") else None
+        return cls(**data)
+
+
+async def _load_identity(session: AsyncSession, telegram_id: str) -> Optional[UserIdentity]:
+    row = (await session.execute(
+        select(
+            User.id,
+            User.student_id,
+            User.group_id,
+            User.first_name,
+            User.last_name,
+            User.password.isnot(None),
+        ).where(User.telegram_id == telegram_id)
+    )).one_or_none()
+    if row is None:
+        return None
+    uid, student_id, group_id, first_name, last_name, has_password = row
+    return UserIdentity(
+        id=uid,
+        telegram_id=telegram_id,
+        student_id=student_id,
+        group_id=group_id,
+        first_name=first_name,
+        last_name=last_name,
+        has_password=bool(has_password),
+    )
+
+
+async def get_identity(session: AsyncSession, telegram_id: str) -> Optional[UserIdentity]:
+    """Redis first, then a column-only select; Redis errors fall back to the DB."""
+    key = identity_key(telegram_id)
+    try:
+        cached = await redis_user_info_cache_async.get(key)
+    except Exception:
+        cached = None
+    if cached is not None:
+        if isinstance(cached, bytes):
+            cached = cached.decode()
+        if cached == _MISS:
+            return None
+        try:
+            return UserIdentity.loads(cached)
+        except (ValueError, KeyError, TypeError):
+            pass
+
+    identity = await _load_identity(session, telegram_id)
+    try:
+        if identity is None:
+            await redis_user_info_cache_async.set(key, _MISS, ex=IDENTITY_MISS_TTL_SECONDS)
+        else:
+            await redis_user_info_cache_async.set(key, identity.dumps(), ex=IDENTITY_TTL_SECONDS)
+    except Exception:
+        pass
+    return identity
+
+
+# Invalidation runs after the DB commit: a Redis error must not fail the
+# request / scrape that made the change. The stale entry expires after
+# IDENTITY_TTL_SECONDS at the latest.
+async def invalidate_identity(*telegram_ids: Optional[str]) -> None:
+    keys = [identity_key(t) for t in telegram_ids if t]
+    if not keys:
+        return
+    try:
+        await redis_user_info_cache_async.delete(*keys)
+    except Exception:
+        pass
+
+
+async def invalidate_all_identities() -> None:
+    try:
+        keys = [k async for k in redis_user_info_cache_async.scan_iter(match=identity_key("*"), count=1000)]
+        for i in range(0, len(keys), 1000):
+            await redis_user_info_cache_async.delete(*keys[i:i + 1000])
+    except Exception:
+        pass
+
+
+def invalidate_identity_sync(redis_client, *telegram_ids: Optional[str]) -> None:
+    """For the sync (Celery) side, e.g. with redis_sync.redis_user_info_cache."""
+    keys = [identity_key(t) for t in telegram_ids if t]
+    if not keys:
+        return
+    try:
+        redis_client.delete(*keys)
+    except Exception:
+        pass
@@ -0,0 +1,211 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.database.models import NotificationOutbox
+from app.infra.telegram import SendResult, TelegramSender
+from app.infra.tracing import tracer
+
+
+class NotificationOutboxService:
+    """
+    Transactional outbox for Telegram messages.
+
+    enqueue() only adds a row to the caller's session, so a message is
+    committed (or rolled back) together with the data it is about.
+    drain() claims due rows with FOR UPDATE SKIP LOCKED and commits them as
+    "sending" before any network call, so no row lock is held while Telegram
+    is slow and several dispatchers can run at once without sending a message
+    twice. A "sending" row whose lease ran out (the dispatcher died mid-send)
+    is claimed again like a pending one.
+    """
+
+    max_attempts: int = 5
+    retry_base_seconds: int = 30
+    sending_lease_seconds: int = 300
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+    def enqueue(self, chat_id: str, text: str, parse_mode: Optional[str] = "HTML") -> NotificationOutbox:
+        row = NotificationOutbox(chat_id=str(chat_id), text=text, parse_mode=parse_mode)
+        self.session.add(row)
+        return row
+
+    def _claim(self, batch_size: int) -> List[NotificationOutbox]:
+        """Marks due rows as "sending" and commits, releasing the row locks."""
+        now = datetime.utcnow()
+        rows = list(self.session.execute(
+            select(NotificationOutbox)
+            .where(
+                NotificationOutbox.status.in_(("pending", "sending")),
+                NotificationOutbox.available_at <= now,
+            )
+            .order_by(NotificationOutbox.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all())
+        for row in rows:
+            row.status = "sending"
+            row.attempts += 1
+            row.available_at = now + timedelta(seconds=self.sending_lease_seconds)
+        self.session.commit()
+        return rows
+
+    def _apply(self, row: NotificationOutbox, result: SendResult, now: datetime, stats: dict) -> None:
+        if result.ok:
+            row.status = "sent"
+            row.sent_at = now
+            row.last_error = None
+            stats["sent"] += 1
+            return
+
+        row.last_error = (result.error or "")[:500]
+        if result.permanent or row.attempts >= self.max_attempts:
+            row.status = "failed"
+            stats["failed"] += 1
+            return
+
+        row.status = "pending"
+        delay = max(result.retry_after or 0, self.retry_base_seconds * (2 ** (row.attempts - 1)))
+        row.available_at = now + timedelta(seconds=delay)
+        stats["retried"] += 1
+
+    def drain(self, batch_size: int = 100, max_batches: int = 20) -> dict:
+        """Sends due messages batch by batch; each batch is committed on its own."""
+        stats = {"sent": 0, "failed": 0, "retried": 0}
+
+        async def run() -> None:
+            async with TelegramSender() as tg:
+                for _ in range(max_batches):
+                    rows = self._claim(batch_size)
+                    if not rows:
+                        break
+                    with tracer.start_as_current_span("notify.batch", {"messages": len(rows)}):
+                        results = await tg.send_many((r.chat_id, r.text, r.parse_mode) for r in rows)
+                        now = datetime.utcnow()
+                        # The messages are out: failing to record that must
+                        # not abort the drain. The claim is already committed,
+                        # so the rows just stay "sending" until their lease
+                        # runs out instead of going back to "pending" now.
+                        batch = dict.fromkeys(stats, 0)
+                        try:
+                            for row, result in zip(rows, results):
+                                self._apply(row, result, now, batch)
+                            self.session.commit()
+                        except Exception:
+                            self.session.rollback()
+                            continue
+                        for k, v in batch.items():
+                            stats[k] += v
+
+        with tracer.start_as_current_span("notify.drain") as span:
+            try:
+                asyncio.run(run())
+            except Exception:
+                self.session.rollback()
+                raise
+            for k, v in stats.items():
+                span.set_attribute(k, v)
+        return stats
+
+
+# KEYS = suppression keys (ARGV[2] of them) followed by candidate keys.
+# Suppression keys are set unconditionally first, then every candidate is
+# SET NX in order; returns the 1-based indexes of the candidates that won.
+_DEDUPE_LUA = """
+local ttl = tonumber(ARGV[1])
+local n_suppress = tonumber(ARGV[2])
+for i = 1, n_suppress do
+    redis.call('SET', KEYS[i], '1', 'EX', ttl)
+end
+local won = {}
+for i = n_suppress + 1, #KEYS do
+    if redis.call('SET', KEYS[i], '1', 'NX', 'EX', ttl) then
+        won[#won + 1] = i - n_suppress
+    end
+end
+return won
+"""
+
+
+class NotificationDedupeBatch:
+    """
+    Send-once candidates of one user, resolved in a single Redis round trip.
+
+    once() registers a standalone message, group() a message built from the
+    lines whose keys win (e.g. "3 new assignments"), suppress() a key that is
+    set unconditionally before any candidate is checked. resolve() returns
+    the messages to send, in registration order.
+
+    The keys resolve() won are only final once the outbox rows holding their
+    messages are committed: commit() forgets them then, release() deletes
+    them after a rollback so the messages are sent by the next run instead
+    of being lost.
+    """
+
+    def __init__(self) -> None:
+        self._suppress: List[str] = []
+        self._keys: List[str] = []
+        # (render or None, [(candidate index, text), ...])
+        self._slots: List[Tuple[Optional[Callable[[List[str]], str]], List[Tuple[int, str]]]] = []
+        # candidate keys won by resolve() whose messages are not committed yet
+        self._claimed: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._suppress)
+
+    def _add_key(self, key: str) -> int:
+        self._keys.append(key)
+        return len(self._keys)
+
+    def suppress(self, key: str) -> None:
+        self._suppress.append(key)
+
+    def once(self, key: str, message: str) -> None:
+        self._slots.append((None, [(self._add_key(key), message)]))
+
+    def group(self, lines: List[Tuple[str, str]], render: Callable[[List[str]], str]) -> None:
+        """lines: (key, line); render gets the winning lines (never empty)."""
+        if lines:
+            self._slots.append((render, [(self._add_key(key), line) for key, line in lines]))
+
+    def resolve(self, redis_client, ttl_seconds: int) -> List[str]:
+        if not self._keys and not self._suppress:
+            return []
+        won = set(redis_client.eval(
+            _DEDUPE_LUA,
+            len(self._suppress) + len(self._keys),
+            *self._suppress, *self._keys,
+            ttl_seconds, len(self._suppress),
+        ) or [])
+
+        self._claimed += [self._keys[idx - 1] for idx in won]
+
+        messages: List[str] = []
+        for render, entries in self._slots:
+            texts = [text for idx, text in entries if idx in won]
+            if not texts:
+                continue
+            messages.append(render(texts) if render else texts[0])
+
+        self._suppress.clear()
+        self._keys.clear()
+        self._slots.clear()
+        return messages
+
+    def commit(self) -> None:
+        self._claimed.clear()
+
+    def release(self, redis_client) -> None:
+        """Deletes the keys won since the last commit(); best-effort."""
+        keys, self._claimed = self._claimed, []
+        if not keys:
+            return
+        try:
+            redis_client.delete(*keys)
+        except Exception:
+            pass
@@ -1,21 +1,40 @@
+import asyncio
 from datetime import datetime, timedelta
 import json
+import time
 from zoneinfo import ZoneInfo
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from uuid import uuid4
 from typing import Optional, Any
 TZ = ZoneInfo("Asia/Tashkent")
-from app.infra.redis_sync import redis_scrape_cache,redis_user_info_cache,redis_registered_users_sync
+from app.infra.redis_sync import redis_scrape_cache,redis_user_info_cache,redis_registered_users_sync,redis_eclass_sessions
 from app.database.models import (
     EclassSnapshot, User, Professor, Class, Subject, Enrollment, Assignment, Quiz,AttendanceInfo
 )
 from app.scraper.script import AuthExpired, BlockedOrForbidden, EclassClient, EclassError, LoginFailed, RateLimited, pack_student_rest
+from app.scraper.session_store import EclassSessionStore
+from app.infra.rate_limit import eclass_rate_limiter
+from app.scraper.fingerprints import PageChangeTracker, PageFingerprintStore
+from app.services.enrollments import EnrollmentResolver
+from app.services.student_stats import save_student_stats
+from app.services.identity import invalidate_identity_sync
 
-import requests
-from app.config import bot_settings
+from app.services.notifications import NotificationDedupeBatch, NotificationOutboxService
+from app.config import scraper_settings
+from app.infra import metrics, tracing
+from app.infra.tracing import tracer
 
-API_URL = bot_settings.API_URL
+eclass_session_store = EclassSessionStore(redis_eclass_sessions, scraper_settings.session_cookie_ttl)
+page_fingerprint_store = PageFingerprintStore(redis_scrape_cache, scraper_settings.page_fingerprint_ttl)
+
+# send-once dedupe keys (notify:u:...) live this long
+NOTIFY_TTL_SECONDS = 60 * 60 * 24 * 90
+
+# scrape_user_duration_seconds{result}; anything else is "Exception"
+SCRAPE_RESULT_LABELS = {"LoginFailed", "AuthExpired", "BlockedOrForbidden", "RateLimited", "TemporaryServerError", "EclassError"}
 
 failed_message = (
                 "⚠️ <b>Authentication Error</b>\n\n"
@@ -24,14 +43,6 @@ failed_message = (
                 "🚀 Tap /start to begin registration."
             )
 
-
-def send_message(user_telegram_id: str, message: str):
-    requests.post(API_URL, json={
-        "chat_id": user_telegram_id,
-        "text": message,
-        "parse_mode": "HTML"
-    })
-
 import json
 from datetime import datetime,date
 from typing import Optional, Dict, Any, List
@@ -120,6 +131,20 @@ class ScrapService:
     def __init__(self, session: Session,is_send = True):
         self.is_send = is_send
         self.session = session
+        # per-run Subject/Professor/Class/Enrollment lookups
+        self.enrollments = EnrollmentResolver(session)
+        # Telegram messages go to NotificationOutbox, see app/services/notifications.py
+        self.outbox = NotificationOutboxService(session)
+        self.notifications_queued = 0
+        # send-once candidates of the user being synced, see _flush_notifications
+        self.notify_batch = NotificationDedupeBatch()
+
+    def _rollback(self) -> None:
+        self.session.rollback()
+        self.enrollments.rollback()
+        # outbox rows are gone: let the next run win their send-once keys again
+        self.notify_batch.release(redis_scrape_cache)
+        self.notify_batch = NotificationDedupeBatch()
     
 
     def _parse_date(self, s: Any) -> Optional[date]:
@@ -130,31 +155,20 @@ class ScrapService:
         except Exception:
             return None
 
-    def _sync_attendance_infos(self, enrollment: Enrollment, data: dict) -> None:
+    def _attendance_info_rows(self, enrollment: Enrollment, data: dict) -> List[Dict[str, Any]]:
         """
-        Save detailed attendance rows to AttendanceInfo table.
+        Detailed attendance rows of one subject, as AttendanceInfo values.
         NO notifications.
         """
         rows = data.get("attendance_records") or []
-
-
-        if not rows:
-            return
-
-        # Load existing infos for this enrollment
-        existing = self.session.execute(
-            select(AttendanceInfo).where(AttendanceInfo.enrollment_id == enrollment.id)
-        ).scalars().all()
-
-        # key = (date_of_week, class_name)
-        existing_map = {(x.date_of_week, (x.class_name or "").strip()): x for x in existing}
+        out: List[Dict[str, Any]] = []
 
         for r in rows:
             d = self._parse_date(r.get("date_of_week") or r.get("date") or r.get("week"))
             if not d:
                 continue
 
-            class_name = (r.get("class_name") or r.get("class") or "").strip() or None
+            class_name = (r.get("class_name") or r.get("class") or "").strip()
 
             # Accept either booleans OR "status"
             status = (r.get("status") or "").strip().lower()
@@ -162,25 +176,46 @@ class ScrapService:
             absence = bool(r.get("absence")) or status in {"absence", "absent", "결석"}
             late = bool(r.get("late")) or status in {"late", "지각"}
 
-            key = (d, (class_name or "").strip())
-            obj = existing_map.get(key)
-
-            if obj is None:
-                obj = AttendanceInfo(
-                    enrollment_id=enrollment.id,
-                    date_of_week=d,
-                    class_name=class_name,
-                    attendance=attendance,
-                    absence=absence,
-                    late=late,
-                )
-                self.session.add(obj)
-            else:
-                obj.class_name = class_name
-                obj.attendance = attendance
-                obj.absence = absence
-                obj.late = late
-                self.session.add(obj)
+            out.append({
+                "enrollment_id": enrollment.id,
+                "date_of_week": d,
+                "class_name": class_name,
+                "attendance": attendance,
+                "absence": absence,
+                "late": late,
+            })
+        return out
+
+    def _upsert_attendance_infos(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Save detailed attendance rows of a whole user in one statement.
+        Key (enrollment_id, date_of_week, class_name); existing rows are only
+        updated when a flag actually changed, is_seen is left alone.
+        """
+        # one row per key (a statement may not hit the same row twice), last wins
+        by_key = {(r["enrollment_id"], r["date_of_week"], r["class_name"]): r for r in rows}
+        if not by_key:
+            return
+
+        table = AttendanceInfo.__table__
+        stmt = insert(table).values([
+            {"id": uuid4(), "is_seen": False, **r} for r in by_key.values()
+        ])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_attendanceinfo_enrollment_date_class",
+            set_={
+                "attendance": excluded.attendance,
+                "absence": excluded.absence,
+                "late": excluded.late,
+            },
+            where=or_(
+                table.c.attendance.is_distinct_from(excluded.attendance),
+                table.c.absence.is_distinct_from(excluded.absence),
+                table.c.late.is_distinct_from(excluded.late),
+            ),
+        )
+        self.session.execute(stmt)
 
     # =========================
     # Helpers
@@ -233,14 +268,24 @@ class ScrapService:
         parts.append(f"{mins}m")
         return " ".join(parts)
 
-    def _notify_once(self, key: str, ttl_seconds: int = 60 * 60 * 24 * 90) -> bool:
+    def _flush_notifications(self, user: User) -> None:
+        """Resolves the user's send-once keys in one Redis call; winners go to the outbox."""
         # Redis only for dedupe/time management
-        return bool(redis_scrape_cache.set(key, "1", nx=True, ex=ttl_seconds))
+        for msg in self.notify_batch.resolve(redis_scrape_cache, NOTIFY_TTL_SECONDS):
+            self._send(user, msg)
+
+    def _enqueue(self, chat_id: Optional[str], text: str) -> None:
+        """Telegram message via the outbox: sent only if this transaction commits."""
+        if not chat_id:
+            return
+        self.outbox.enqueue(chat_id, text)
+        self.notifications_queued += 1
+        metrics.SCRAPE_NOTIFICATIONS.inc()
 
     def _send(self, user: User, text: str):
         
         if user.telegram_id and self.is_send:
-            send_message(user.telegram_id, text)
+            self._enqueue(user.telegram_id, text)
 
     def _subject_title(self, data: dict) -> str:
         code = data.get("subject") or ""
@@ -250,83 +295,139 @@ class ScrapService:
         return name or code or "Subject"
 
     # =========================
-    # DB sync: ensure Subject/Professor/Class/Enrollment exists
+    # Scrape one student (async engine, concurrent course fetches)
     # =========================
-    def _get_or_create_enrollment(self, user: User, data: dict) -> Enrollment:
+    def _fetch_student_rows(self, user: User, tracker: Optional[PageChangeTracker] = None) -> dict:
         """
-        IMPORTANT:
-        Your Class has UNIQUE(group_id, subject_id). So:
-        - Find class by (group_id, subject_id)
-        - Update professor_id if changed (do NOT insert new class)
+        Reuses the user's stored eClass cookies when there are any; a full
+        login only happens when they are missing or the home page comes
+        back as the login page (AuthExpired).
         """
-        if user.group_id is None:
-            raise ValueError(f"user.group_id is None for user_id={user.id} student_id={user.student_id}")
-
-        subject_name = (data.get("subject_name") or "").strip()
-        subject_short = (data.get("subject") or "").strip()
-        professor_name = (data.get("professor_name") or "").strip()
-
-        # Subject: find or create
-        subject = self.session.execute(
-            select(Subject).where(Subject.name == subject_name)
-        ).scalars().one_or_none()
-        if subject is None:
-            subject = Subject(name=subject_name, short_name=subject_short)
-            self.session.add(subject)
-            self.session.flush()
-
-        # Professor: find or create
-        professor = self.session.execute(
-            select(Professor).where(Professor.name == professor_name)
-        ).scalars().one_or_none()
-        if professor is None:
-            professor = Professor(name=professor_name)
-            self.session.add(professor)
-            self.session.flush()
-
-        # Class: unique by (group_id, subject_id)
-        klass = self.session.execute(
-            select(Class).where(
-                Class.group_id == user.group_id,
-                Class.subject_id == subject.id
-            )
-        ).scalars().one_or_none()
+        async def run() -> dict:
+            client = EclassClient(rate_limiter=eclass_rate_limiter)
+            client.tracker = tracker
+            try:
+                cookies = eclass_session_store.load(user.id)
+                if cookies:
+                    client.load_cookies(cookies)
+                    client.username = user.student_id
+                    try:
+                        rows = await client.aget_all_attendance()
+                        eclass_session_store.save(user.id, client.export_cookies())
+                        return rows
+                    except AuthExpired:
+                        client.clear_cookies()
+
+                with tracer.start_as_current_span("eclass.login"):
+                    await client.alogin(user.student_id, user.password)
+                rows = await client.aget_all_attendance()
+                eclass_session_store.save(user.id, client.export_cookies())
+                return rows
+            finally:
+                await client.aclose()
+
+        with tracer.start_as_current_span("scrape.fetch") as span:
+            rows = asyncio.run(run())
+            span.set_attribute("subjects", len(rows.get("subjects") or []))
+            return rows
+
+    def _page_tracker(self, user: User) -> PageChangeTracker:
+        """Fingerprints from the last run + the subjects saved in EclassSnapshot."""
+        with tracer.start_as_current_span("db.snapshot_load"):
+            snap = self.session.execute(
+                select(EclassSnapshot).where(EclassSnapshot.user_id == user.id)
+            ).scalars().first()
+        previous = {}
+        if snap and isinstance(snap.payload, dict):
+            for subj in snap.payload.get("subjects") or []:
+                if subj.get("course_url"):
+                    previous[subj["course_url"]] = subj
+        return PageChangeTracker(page_fingerprint_store, user.id, previous)
+
+    def _sync_student(self, user: User, final_json: dict, tracker: Optional[PageChangeTracker] = None) -> None:
+        """
+        Writes one scraped student to Postgres + Redis and commits.
+        Subjects whose pages did not change since the last run are not
+        re-synced (unless their enrollment was just created); only their
+        deadline reminders are evaluated.
+        """
+        with metrics.SCRAPE_DB_SYNC_SECONDS.time(), tracer.start_as_current_span("db.sync"):
+            self._sync_student_rows(user, final_json, tracker)
 
-        if klass is None:
-            klass = Class(
-                group_id=user.group_id,
-                subject_id=subject.id,
-                professor_id=professor.id
-            )
-            self.session.add(klass)
-            self.session.flush()
-        else:
-            # professor can change (online, different teacher) -> update (no insert)
-            if klass.professor_id != professor.id:
-                klass.professor_id = professor.id
-                self.session.add(klass)
-
-        # Enrollment: find or create
-        enrollment = self.session.execute(
-            select(Enrollment).where(
-                Enrollment.user_id == user.id,
-                Enrollment.class_id == klass.id
-            )
-        ).scalars().one_or_none()
-
-        if enrollment is None:
-            att = data.get("attendance") or {}
-            enrollment = Enrollment(
-                user_id=user.id,
-                class_id=klass.id,
-                attendance=self._safe_int(att.get("attendance"), 0),
-                absence=self._safe_int(att.get("absence"), 0),
-                late=self._safe_int(att.get("late"), 0),
+    def _sync_student_rows(self, user: User, final_json: dict, tracker: Optional[PageChangeTracker] = None) -> None:
+        unchanged = tracker.unchanged_courses if tracker else set()
+        scraped_enrollment_ids: set = set()
+        attendance_rows: List[Dict[str, Any]] = []
+
+        # 1) Sync subjects that exist in e-class
+        subjects = final_json.get("subjects", [])
+        with tracer.start_as_current_span("db.resolve_enrollments", {"subjects": len(subjects)}):
+            enrollments, created = self.enrollments.resolve(user, subjects)
+
+        with tracer.start_as_current_span("db.compare") as span:
+            for subj, enrollment in zip(subjects, enrollments):
+                scraped_enrollment_ids.add(enrollment.id)
+
+                # a new enrollment (CSV class reload, group change) has no
+                # assignment / attendance rows yet: sync it even if unchanged
+                if subj.get("course_url") in unchanged and enrollment.id not in created:
+                    self._remind_unchanged(user, enrollment, subj)
+                    continue
+
+                self.compare_with_old_values(user, enrollment, subj)
+                attendance_rows += self._attendance_info_rows(enrollment, subj)
+            span.set_attribute("unchanged", len(unchanged))
+
+        with tracer.start_as_current_span("db.attendance_upsert", {"rows": len(attendance_rows)}):
+            self._upsert_attendance_infos(attendance_rows)
+        with tracer.start_as_current_span("notify.dedupe"):
+            self._flush_notifications(user)
+
+        # 2) HARD DELETE enrollments that are in DB but NOT in scrape
+        with tracer.start_as_current_span("db.delete_dropped"):
+            db_enrollments = self.session.execute(
+                select(Enrollment).join(Class, Enrollment.class_id == Class.id).where(
+                    Enrollment.user_id == user.id,
+                    Class.group_id == user.group_id
+                )
+            ).scalars().all()
+
+            for enr in db_enrollments:
+                if enr.id not in scraped_enrollment_ids:
+                    self._hard_delete_enrollment(enr)
+
+        # commit db changes for this user
+        with tracer.start_as_current_span("db.commit"):
+            self.session.commit()
+        self.enrollments.commit()
+        self.notify_batch.commit()
+
+        # store cache in redis
+        final_json["first_name"] = user.first_name
+        final_json["last_name"] = user.last_name
+        with tracer.start_as_current_span("redis.cache"):
+            save_student_payload_to_redis(
+                redis_user_info_cache,
+                user.id,
+                final_json=final_json
             )
-            self.session.add(enrollment)
-            self.session.flush()
+            # compact attendance counts for the reminder jobs
+            save_student_stats(redis_user_info_cache, user.id, final_json)
+
+        with tracer.start_as_current_span("db.snapshot_save"):
+            stmt = select(EclassSnapshot).where(EclassSnapshot.user_id == user.id)
+            snap = self.session.execute(stmt).scalars().first()
+            if snap:
+                snap.payload = final_json
+            else:
+                snap = EclassSnapshot(user_id=user.id, payload=final_json)
+                self.session.add(snap)
+
+            self.session.commit()
 
-        return enrollment
+        # fingerprints only after the data they describe is stored
+        if tracker is not None:
+            tracker.commit()
 
     # =========================
     # Hard delete dropped enrollments
@@ -350,6 +451,113 @@ class ScrapService:
     # =========================
     # Compare + update + notify
     # =========================
+    def _remind_assignment(self, user: User, db: Enrollment, subject_label: str,
+                           a_name: str, a_url: Optional[str], a_due: Optional[datetime],
+                           a_sub: Optional[str], now: datetime) -> None:
+        if not (a_due and a_due >= now and a_sub == "No submission" and a_url):
+            return
+
+        left = a_due - now
+        if left.total_seconds() <= 0:
+            return
+
+        days_left = left.total_seconds() / 86400.0
+        if days_left <= 1:
+            tag = "due1"
+        elif days_left <= 2:
+            tag = "due2"
+        elif days_left <= 5:
+            tag = "due5"
+        else:
+            tag = None
+
+        if tag:
+            key = f"notify:u:{user.id}:e:{db.id}:a:{a_url}:{tag}"
+            due_txt = a_due.strftime("%d-%m-%Y %H:%M")
+            left_txt = self._format_time_left(left)
+
+            header = "🚨 <b>Assignment deadline in 24h!</b>" if tag == "due1" else "⏳ <b>Assignment deadline is coming</b>"
+
+            self.notify_batch.once(
+                key,
+                f"{header}\n"
+                f"━━━━━━━━━━━━━━\n"
+                f"📘 <b>{subject_label}</b>\n\n"
+                f"📝 <b>{a_name}</b>\n"
+                f"📅 Deadline: <b>{due_txt}</b>\n"
+                f"⏰ Time left: <b>{left_txt}</b>\n\n"
+                f"🔗 <a href='{a_url}'>Open</a>\n"
+                f"━━━━━━━━━━━━━━\n"
+                f"🚀 Don’t miss the deadline!"
+            )
+
+    def _remind_quiz(self, user: User, db: Enrollment, subject_label: str,
+                     q_name: str, q_url: Optional[str], q_close: Optional[datetime],
+                     is_submitted: bool, now: datetime) -> None:
+        if not (q_close and q_close >= now and not is_submitted and q_url):
+            return
+
+        left = q_close - now
+        if left.total_seconds() <= 0:
+            return
+
+        days_left = left.total_seconds() / 86400.0
+        if days_left <= 1:
+            tag = "close1"
+        elif days_left <= 2:
+            tag = "close2"
+        elif days_left <= 5:
+            tag = "close5"
+        else:
+            tag = None
+
+        if tag:
+            key = f"notify:u:{user.id}:e:{db.id}:q:{q_url}:{tag}"
+            close_txt = q_close.strftime("%d-%m-%Y %H:%M")
+            left_txt = self._format_time_left(left)
+            header = "🚨 <b>Quiz closing soon!</b>" if tag == "due1" else "⏳ <b>Quiz reminder</b>"
+
+            self.notify_batch.once(
+                key,
+                f"{header}\n"
+                f"━━━━━━━━━━━━━━\n"
+                f"📘 <b>{subject_label}</b>\n\n"
+                f"📝 <b>{q_name}</b>\n"
+                f"📅 Closes: <b>{close_txt}</b>\n"
+                f"⏰ Time left: <b>{left_txt}</b>\n\n"
+                f"🔗 {q_url}\n"
+                f"━━━━━━━━━━━━━━\n"
+                f"⚡ Don’t wait until the last minute!"
+            )
+
+    def _remind_unchanged(self, user: User, db: Enrollment, data: dict) -> None:
+        """
+        Subject reused from the last run (pages unchanged): nothing to sync,
+        only the time based deadline reminders can still fire.
+        """
+        now = self._now()
+        subject_label = self._subject_title(data)
+
+        for a in data.get("assignments") or []:
+            self._remind_assignment(
+                user, db, subject_label,
+                a.get("name") or "Assignment",
+                (a.get("url") or "").strip() or None,
+                self._parse_dt(a.get("due_date")),
+                a.get("submission"),
+                now,
+            )
+
+        for q in data.get("quizzes") or []:
+            self._remind_quiz(
+                user, db, subject_label,
+                q.get("name") or "Quiz",
+                (q.get("url") or "").strip() or None,
+                self._parse_dt(q.get("quiz_closes")),
+                (q.get("status") or "").strip().lower() == "submitted",
+                now,
+            )
+
     def compare_with_old_values(self, user: User, db: Enrollment, data: dict):
         now = self._now()
         subject_label = self._subject_title(data)
@@ -401,8 +609,6 @@ class ScrapService:
 
             # ✅ Dedupe key (includes new values, so it sends once per new state)
             key = f"notify:u:{user.id}:e:{db.id}:att:{data.get('subject')}:{new_att}:{new_abs}:{new_late}"
-            if not self._notify_once(key):
-                return
 
             def fmt_line(label: str, emoji: str, old: Optional[int], new: int, highlight: bool) -> str:
                 before = "—" if old is None else str(old)
@@ -421,7 +627,7 @@ class ScrapService:
                 f"{fmt_line('Late',       '⏳', old_late, new_late, late_inc or first_sync_should_notify)}\n\n"
                 f"Keep it up 💪"
             )
-            self._send(user, msg)
+            self.notify_batch.once(key, msg)
 
         # ✅ Call once after computing old/new
         notify_attendance_change(old_abs, new_abs, old_late, new_late, old_att, new_att, is_first_sync)
@@ -434,8 +640,8 @@ class ScrapService:
         # -------------------------
         parsed_assignments = data.get("assignments") or []
 
-        # aggregate "new assignments" for ONE subject
-        new_assignment_lines: list[str] = []
+        # aggregate "new assignments" for ONE subject: (dedupe key, line)
+        new_assignment_lines: list[tuple[str, str]] = []
 
         if parsed_assignments:
             existing = self.session.execute(
@@ -484,14 +690,14 @@ class ScrapService:
                 # only if created now, not overdue, not submitted
                 if created and (not is_overdue) and is_not_submitted and a_url:
                     key_new = f"notify:u:{user.id}:e:{db.id}:a:{a_url}:new"
-                    if self._notify_once(key_new):
-                        due_txt = a_due.strftime("%d-%m-%Y %H:%M") if a_due else "-"
-                        open_link = f'<a href="{a_url}">Open</a>' 
-                        new_assignment_lines.append(
-                            f"📝 <b>{a_name}</b>\n"
-                            f"📅 Deadline: <b>{due_txt}</b>\n"
-                            f"🔗 {open_link}"
-                        )
+                    due_txt = a_due.strftime("%d-%m-%Y %H:%M") if a_due else "-"
+                    open_link = f'<a href="{a_url}">Open</a>' 
+                    new_assignment_lines.append((
+                        key_new,
+                        f"📝 <b>{a_name}</b>\n"
+                        f"📅 Deadline: <b>{due_txt}</b>\n"
+                        f"🔗 {open_link}"
+                    ))
 
                     # If new assignment is already within <=5 days:
                     # suppress due5 and due2 reminders forever (redis keys),
@@ -500,55 +706,13 @@ class ScrapService:
                         left = a_due - now
                         days_left = left.total_seconds() / 86400.0
                         if days_left <= 5:
-                            redis_scrape_cache.set(
-                                f"notify:u:{user.id}:e:{db.id}:a:{a_url}:due5", "1",
-                                ex=60 * 60 * 24 * 90
-                            )
+                            self.notify_batch.suppress(f"notify:u:{user.id}:e:{db.id}:a:{a_url}:due5")
                         if days_left <= 2:
-                            redis_scrape_cache.set(
-                                f"notify:u:{user.id}:e:{db.id}:a:{a_url}:due2", "1",
-                                ex=60 * 60 * 24 * 90
-                            )
+                            self.notify_batch.suppress(f"notify:u:{user.id}:e:{db.id}:a:{a_url}:due2")
 
                 # Reminders (exact time left):
                 # only if not submitted, not overdue, has due date
-                # Reminders (exact time left):
-                # only if not submitted, not overdue, has due date
-                if a_due and (not is_overdue) and is_not_submitted and a_url:
-                    left = a_due - now
-                    if left.total_seconds() <= 0:
-                        continue
-
-                    days_left = left.total_seconds() / 86400.0
-                    if days_left <= 1:
-                        tag = "due1"
-                    elif days_left <= 2:
-                        tag = "due2"
-                    elif days_left <= 5:
-                        tag = "due5"
-                    else:
-                        tag = None
-
-                    if tag:
-                        key = f"notify:u:{user.id}:e:{db.id}:a:{a_url}:{tag}"
-                        if self._notify_once(key):  # ✅ you missed this
-                            due_txt = a_due.strftime("%d-%m-%Y %H:%M")
-                            left_txt = self._format_time_left(left)
-
-                            header = "🚨 <b>Assignment deadline in 24h!</b>" if tag == "due1" else "⏳ <b>Assignment deadline is coming</b>"
-
-                            self._send(
-                                user,
-                                f"{header}\n"
-                                f"━━━━━━━━━━━━━━\n"
-                                f"📘 <b>{subject_label}</b>\n\n"
-                                f"📝 <b>{a_name}</b>\n"
-                                f"📅 Deadline: <b>{due_txt}</b>\n"
-                                f"⏰ Time left: <b>{left_txt}</b>\n\n"
-                                f"🔗 <a href='{a_url}'>Open</a>\n"
-                                f"━━━━━━━━━━━━━━\n"
-                                f"🚀 Don’t miss the deadline!"
-                            )
+                self._remind_assignment(user, db, subject_label, a_name, a_url, a_due, a_sub, now)
 
 
                 # Grade notify once (even after overdue):
@@ -557,34 +721,34 @@ class ScrapService:
                     # notify only if it wasn't graded before
                     if old_grade_norm is None:
                         key = f"notify:u:{user.id}:e:{db.id}:a:{a_url}:graded"
-                        if self._notify_once(key):
-                            self._send(
-                                user,
-                                f"✅ <b>Assignment graded</b>\n"
-                                f"<b>{subject_label}</b>\n"
-                                f"• {a_name}\n"
-                                f"Grade: <b>{new_grade_norm}</b>\n"
-                                f"{a_url}"
-                            )
-
-        # Send ONE message for all new assignments of this subject
-        if new_assignment_lines:
-            count = len(new_assignment_lines)
-            msg = (
+                        self.notify_batch.once(
+                            key,
+                            f"✅ <b>Assignment graded</b>\n"
+                            f"<b>{subject_label}</b>\n"
+                            f"• {a_name}\n"
+                            f"Grade: <b>{new_grade_norm}</b>\n"
+                            f"{a_url}"
+                        )
+
+        # Send ONE message for all new assignments of this subject (lines whose key wins)
+        def render_new_assignments(lines: list[str]) -> str:
+            count = len(lines)
+            return (
                 f"🆕 <b>{count} New assignment{'s' if count > 1 else ''} added</b>\n"
                 f"━━━━━━━━━━━━━━\n"
                 f"📘 <b>{subject_label}</b>\n\n"
-                + "\n\n".join(new_assignment_lines) +
+                + "\n\n".join(lines) +
                 "\n\n━━━━━━━━━━━━━━\n"
                 f"✅ Good luck! Submit early 💪"
             )
-            self._send(user, msg)
+
+        self.notify_batch.group(new_assignment_lines, render_new_assignments)
 
         # -------------------------
         # Quizzes (DB existence via Postgres, Redis only for send dedupe)
         # -------------------------
         parsed_quizzes = data.get("quizzes") or []
-        new_quiz_lines: list[str] = []
+        new_quiz_lines: list[tuple[str, str]] = []
 
         if parsed_quizzes:
             existing_q = self.session.execute(
@@ -634,181 +798,170 @@ class ScrapService:
                 # -------------------------
                 if created and (not is_overdue) and (not is_submitted) and q_url:
                     key_new = f"notify:u:{user.id}:e:{db.id}:q:{q_url}:new"
-                    if self._notify_once(key_new):
-                        close_txt = q_close.strftime("%d-%m-%Y %H:%M") if q_close else "-"
-                        new_quiz_lines.append(
-                            f"• <b>{q_name}</b>\n"
-                            f"  Closes: <b>{close_txt}</b>\n"
-                            f"  {q_url}"
-                        )
+                    close_txt = q_close.strftime("%d-%m-%Y %H:%M") if q_close else "-"
+                    new_quiz_lines.append((
+                        key_new,
+                        f"• <b>{q_name}</b>\n"
+                        f"  Closes: <b>{close_txt}</b>\n"
+                        f"  {q_url}"
+                    ))
 
                 # -------------------------
                 # Reminder logic
                 # Only if NOT submitted and NOT overdue
                 # -------------------------
-                if q_close and (not is_overdue) and (not is_submitted) and q_url:
-                    left = q_close - now
-                    if left.total_seconds() <= 0:
-                        continue
-
-                    days_left = left.total_seconds() / 86400.0
-                    if days_left <= 1:
-                        tag = "close1"
-                    elif days_left <= 2:
-                        tag = "close2"
-                    elif days_left <= 5:
-                        tag = "close5"
-                    else:
-                        tag = None
-
-                    if tag:
-                        key = f"notify:u:{user.id}:e:{db.id}:q:{q_url}:{tag}"
-                        if self._notify_once(key):
-                            close_txt = q_close.strftime("%d-%m-%Y %H:%M")
-                            left_txt = self._format_time_left(left)
-                            header = "🚨 <b>Quiz closing soon!</b>" if tag == "due1" else "⏳ <b>Quiz reminder</b>"
-
-                            self._send(
-                                user,
-                                f"{header}\n"
-                                f"━━━━━━━━━━━━━━\n"
-                                f"📘 <b>{subject_label}</b>\n\n"
-                                f"📝 <b>{q_name}</b>\n"
-                                f"📅 Closes: <b>{close_txt}</b>\n"
-                                f"⏰ Time left: <b>{left_txt}</b>\n\n"
-                                f"🔗 {q_url}\n"
-                                f"━━━━━━━━━━━━━━\n"
-                                f"⚡ Don’t wait until the last minute!"
-                            )
+                self._remind_quiz(user, db, subject_label, q_name, q_url, q_close, is_submitted, now)
 
         # Send one message for new quizzes
-        # Send one message for new quizzes
-        if new_quiz_lines:
-            msg = (
+        def render_new_quizzes(lines: list[str]) -> str:
+            return (
                 f"🆕 <b>New Quiz Available!</b>\n"
                 f"━━━━━━━━━━━━━━\n"
                 f"📘 <b>{subject_label}</b>\n\n"
-                + "\n\n".join(new_quiz_lines) +
+                + "\n\n".join(lines) +
                 "\n\n━━━━━━━━━━━━━━\n"
                 f"🚀 Don’t forget to complete it on time!"
             )
-            self._send(user, msg)
+
+        self.notify_batch.group(new_quiz_lines, render_new_quizzes)
 
 
 
     # =========================
     # Scrape for all + hard delete dropped
     # =========================
-    def scrape_e_class_for_all(self):
-        users = self.session.execute(
-            select(User).where(
+    def eligible_user_ids(self) -> list:
+        """Users the bulk scrape covers (registered, password known, in a group)."""
+        return list(self.session.execute(
+            select(User.id).where(
                 User.telegram_id != None,
-                User.password != None
+                User.password != None,
+                User.group_id != None,
             )
-        ).scalars().all()
+        ).scalars().all())
 
-        
-        errors = []
+    def scrape_user(self, user: User, page_stats: Optional[dict] = None) -> Optional[dict]:
+        """
+        Scrape + sync one user of the bulk run.
+        Returns None on success, else an error entry; never raises.
+        """
+        started = time.perf_counter()
+        with tracer.start_as_current_span("scrape.user", {"user_id": str(user.id)}) as span:
+            error = self._scrape_user(user, page_stats)
+            result = "ok" if error is None else (error["error"] if error["error"] in SCRAPE_RESULT_LABELS else "Exception")
+            span.set_attribute("result", result)
+        metrics.SCRAPE_USER_SECONDS.labels(result).observe(time.perf_counter() - started)
+        return error
+
+    def _scrape_user(self, user: User, page_stats: Optional[dict] = None) -> Optional[dict]:
+        try:
+            tracker = self._page_tracker(user)
+            rows = self._fetch_student_rows(user, tracker)
+            final_json = pack_student_rest(user.student_id, rows)
 
-        for user in users:
-            if user.group_id is None:
-                continue
+            self._sync_student(user, final_json, tracker)
+            if page_stats is not None:
+                for k, v in tracker.stats.items():
+                    page_stats[k] = page_stats.get(k, 0) + v
+            return None
 
-            client = EclassClient()
+        except (LoginFailed, AuthExpired, BlockedOrForbidden) as e:
+            # ✅ disable this user for future scraping: clear password
+            self._rollback()
+            eclass_session_store.delete(user.id)
+            user.password = None
+            self.session.add(user)
+            self._enqueue(user.telegram_id, failed_message)
+            self.session.commit()
+            invalidate_identity_sync(redis_user_info_cache, user.telegram_id)
+            return {
+                "user_id": str(user.id),
+                "student_id": user.student_id,
+                "error": type(e).__name__
+            }
+
+        except (RateLimited, EclassError) as e:
+            # ✅ just skip user, don't stop whole job
+            self._rollback()
+            return {
+                "user_id": str(user.id),
+                "student_id": user.student_id,
+                "error": type(e).__name__
+            }
 
-            try:
-                client.login(user.student_id, user.password)
-                rows = client.get_all_attendance()
-                final_json = pack_student_rest(user.student_id, rows)
+        except Exception as e:
+            # ✅ any unexpected error: rollback and continue
+            self._rollback()
+            return {
+                "user_id": str(user.id),
+                "student_id": user.student_id,
+                "error": str(e)
+            }
+
+    def scrape_e_class_for_user_id(self, user_id) -> dict:
+        """Bulk run subtask entry point (see app/worker/tasks.py)."""
+        user = self.session.execute(
+            select(User).where(User.id == user_id)
+        ).scalar_one_or_none()
+
+        if not user or user.group_id is None or not user.password or not user.telegram_id:
+            return {"user_id": str(user_id), "skipped": True}
 
-                scraped_enrollment_ids: set = set()
+        page_stats: dict = {}
+        with tracing.record() as spans:
+            error = self.scrape_user(user, page_stats)
+        return {
+            "user_id": str(user_id),
+            "error": error,
+            "page_cache": page_stats,
+            "notifications": self.notifications_queued,
+            # every phase: summarize_eclass_scrape merges them across users
+            "phases": tracing.top_phases(spans, limit=None),
+            "seconds": round(max((s.duration for s in spans if s.name == "scrape.user"), default=0.0), 3),
+        }
 
-                # 1) Sync subjects
-                for subj in final_json.get("subjects", []):
-                    enrollment = self._get_or_create_enrollment(user, subj)
-                    scraped_enrollment_ids.add(enrollment.id)
+    def scrape_e_class_for_all(self):
+        users = self.session.execute(
+            select(User).where(
+                User.telegram_id != None,
+                User.password != None
+            )
+        ).scalars().all()
 
-                    self.compare_with_old_values(user, enrollment, subj)
-                    self._sync_attendance_infos(enrollment, subj)
 
+        errors = []
+        page_stats: dict = {}
+        self.enrollments.preload({u.group_id for u in users})
 
-                # 2) Hard delete dropped enrollments
-                db_enrollments = self.session.execute(
-                    select(Enrollment)
-                    .join(Class, Enrollment.class_id == Class.id)
-                    .where(
-                        Enrollment.user_id == user.id,
-                        Class.group_id == user.group_id
-                    )
-                ).scalars().all()
-
-                for enr in db_enrollments:
-                    if enr.id not in scraped_enrollment_ids:
-                        self._hard_delete_enrollment(enr)
-
-                # commit db changes for this user
-                self.session.commit()
-
-                # store cache in redis
-                final_json["first_name"] = user.first_name
-                final_json["last_name"] = user.last_name
-                save_student_payload_to_redis(
-                    redis_user_info_cache,
-                    user.id,
-                    final_json=final_json
-                )
-                stmt = select(EclassSnapshot).where(EclassSnapshot.user_id == user.id)
-                snap = self.session.execute(stmt).scalars().first() 
-                if snap:
-                    snap.payload = final_json
-                else:
-                    snap = EclassSnapshot(user_id=user.id, payload=final_json)
-                    self.session.add(snap)
-
-                self.session.commit()
-                
-                        
-            except (LoginFailed, AuthExpired, BlockedOrForbidden) as e:
-                # ✅ disable this user for future scraping: clear password
-                user.password = None
-                self.session.add(user)
-                self.session.commit()
-
-                send_message(user.telegram_id,failed_message)
-                errors.append({
-                    "user_id": str(user.id),
-                    "student_id": user.student_id,
-                    "error": type(e).__name__
-                })
-                continue
+        with tracing.record() as spans, tracer.start_as_current_span("scrape.all", {"users": len(users)}):
+            for user in users:
+                if user.group_id is None:
+                    continue
 
-            except (RateLimited, EclassError) as e:
-                # ✅ just skip user, don't stop whole job
-                self.session.rollback()
-                errors.append({
-                    "user_id": str(user.id),
-                    "student_id": user.student_id,
-                    "error": type(e).__name__
-                })
-                continue
+                error = self.scrape_user(user, page_stats)
+                if error:
+                    errors.append(error)
 
-            except Exception as e:
-                # ✅ any unexpected error: rollback and continue
-                self.session.rollback()
-                errors.append({
-                    "user_id": str(user.id),
-                    "student_id": user.student_id,
-                    "error": str(e)
-                })
-                continue
-      
+        slow_phases = tracing.top_phases(spans)
+        self._report_trace(spans, slow_phases)
         return {
-      
+
             "failed": len(errors),
             "errors": errors,
-          
+            # pages: fetched, not_modified: 304s, hash_hits: same content,
+            # reused_courses: subjects taken from the snapshot without parse/sync
+            "page_cache": page_stats,
+            "slow_phases": slow_phases,
+
         }
 
+    def _report_trace(self, spans: list, slow_phases: list) -> None:
+        """Waterfalls of the slowest users + the phases the run spent most time in."""
+        users = sorted((s for s in spans if s.name == "scrape.user"), key=lambda s: s.duration, reverse=True)
+        parts = [tracing.waterfall(spans, root) for root in users[:scraper_settings.trace_waterfall_users]]
+        parts.append("top phases (self time)\n" + tracing.format_phases(slow_phases))
+        tracer.emit_report("\n\n".join(parts))
+
     def scrape_e_class_for_one_user(self,user_id):
         
         user = self.session.execute(
@@ -817,71 +970,31 @@ class ScrapService:
 
         if not user:
             return HTTPException(detail="User not found",status_code=404)
-        client = EclassClient()
         try:
-            client.login(user.student_id, user.password)
-            rows = client.get_all_attendance()
+            rows = self._fetch_student_rows(user)
             final_json = pack_student_rest(user.student_id, rows)
 
-            scraped_enrollment_ids: set = set()
-
-            # 1) Sync subjects that exist in e-class
-            for subj in final_json.get("subjects", []):
-                enrollment = self._get_or_create_enrollment(user, subj)
-                scraped_enrollment_ids.add(enrollment.id)
-
-                self.compare_with_old_values(user, enrollment, subj)
-                self._sync_attendance_infos(enrollment, subj)
-
-            
-
-            # 2) HARD DELETE enrollments that are in DB but NOT in scrape
-            db_enrollments = self.session.execute(
-                select(Enrollment).join(Class, Enrollment.class_id == Class.id).where(
-                    Enrollment.user_id == user.id,
-                    Class.group_id == user.group_id
-                )
-            ).scalars().all()
-
-            for enr in db_enrollments:
-                if enr.id not in scraped_enrollment_ids:
-                    self._hard_delete_enrollment(enr)
-
-            self.session.commit()
-
-            final_json["first_name"] = user.first_name
-            final_json["last_name"] = user.last_name
-            
-            save_student_payload_to_redis(
-                redis_user_info_cache,user.id,final_json=final_json
-            )
-
-            stmt = select(EclassSnapshot).where(EclassSnapshot.user_id == user.id)
-            snap = self.session.execute(stmt).scalars().first() 
-            if snap:
-                snap.payload = final_json
-            else:
-                snap = EclassSnapshot(user_id=user.id, payload=final_json)
-                self.session.add(snap)
-
-            self.session.commit()
-            send_message(
-                user_telegram_id=user.telegram_id,
-                message=(
+            self._sync_student(user, final_json)
+            self._enqueue(
+                user.telegram_id,
+                (
                     "🎉 <b>Great news!</b>\n\n"
                     "Everything is ready for you.\n"
                     "Click <b>/start</b> to access your dashboard and features."
                 )
             )
+            self.session.commit()
 
             redis_registered_users_sync.delete(str(user.id))
             return final_json
         
         except LoginFailed as e:
-           
+            eclass_session_store.delete(user.id)
             redis_registered_users_sync.delete(str(user.id))
             
-            send_message(user.telegram_id,failed_message)
+            self._rollback()
+            self._enqueue(user.telegram_id, failed_message)
+            self.session.commit()
         except RateLimited as e:
             raise HTTPException(detail="RATE LIMITED:",status_code=400)
         except BlockedOrForbidden as e:
@@ -891,6 +1004,6 @@ class ScrapService:
         except EclassError as e:
             raise HTTPException("E-class ERROR:",status_code=400)
         except Exception as e:
-            self.session.rollback()
+            self._rollback()
             return str(e)
     
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Compact per-user attendance stats for the reminder jobs.
+
+One Redis hash per user next to the full student payload (same DB):
+    stats:{user_id}  ->  {"_first_name": "...", "<subject code>": "att:abs:late", ...}
+Written at scrape time, read for all users of a job in one pipeline.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+FIRST_NAME_FIELD = "_first_name"
+STATS_TTL_SECONDS = 60 * 60 * 120
+
+
+def stats_key(user_id: Any) -> str:
+    return f"stats:{user_id}"
+
+
+def _int(v: Any) -> int:
+    try:
+        return int(v or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_stats_mapping(payload: Dict[str, Any], first_name: Optional[str] = None) -> Dict[str, str]:
+    """payload: final_json / cached student payload ({"subjects": [...], "first_name": ...})."""
+    mapping = {FIRST_NAME_FIELD: first_name or payload.get("first_name") or ""}
+    for s in payload.get("subjects") or []:
+        code = s.get("subject")
+        if not code:
+            continue
+        att = s.get("attendance") or {}
+        mapping[code] = f"{_int(att.get('attendance'))}:{_int(att.get('absence'))}:{_int(att.get('late'))}"
+    return mapping
+
+
+def save_student_stats(redis_client, user_id: Any, payload: Dict[str, Any], ttl_seconds: int = STATS_TTL_SECONDS) -> None:
+    key = stats_key(user_id)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hset(key, mapping=build_stats_mapping(payload))
+    pipe.expire(key, ttl_seconds)
+    pipe.execute()
+
+
+def parse_stats_hash(raw: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+    """HGETALL result -> {"first_name", "subjects_by_code": {code: {attendance, absence, late}}}."""
+    if not raw:
+        return None
+    first_name = None
+    subjects_by_code: Dict[str, Dict[str, int]] = {}
+    for field, value in raw.items():
+        if isinstance(field, bytes):
+            field = field.decode()
+        if isinstance(value, bytes):
+            value = value.decode()
+        if field == FIRST_NAME_FIELD:
+            first_name = value or None
+            continue
+        parts = (value.split(":") + ["0", "0", "0"])[:3]
+        subjects_by_code[field] = {
+            "attendance": _int(parts[0]),
+            "absence": _int(parts[1]),
+            "late": _int(parts[2]),
+        }
+    return {"first_name": first_name, "subjects_by_code": subjects_by_code}
+
+
+def load_student_stats_many(redis_client, user_ids: Iterable[Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """One pipelined HGETALL per user, a single round trip; None for users without a hash."""
+    ids = [str(u) for u in user_ids]
+    if not ids:
+        return {}
+    pipe = redis_client.pipeline(transaction=False)
+    for user_id in ids:
+        pipe.hgetall(stats_key(user_id))
+    return {user_id: parse_stats_hash(raw) for user_id, raw in zip(ids, pipe.execute())}
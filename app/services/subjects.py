@@ -8,6 +8,7 @@ from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import Major, StudentYear, Subject, SubjectMajorLink
+from app.services.time_table import invalidate_group_timetables
 
 ALLOWED_CONTENT_TYPES = ["text/csv", "application/vnd.ms-excel"]  # browsers sometimes send weird types
 ALLOWED_EXTENSIONS = ["csv", "tsv"]
@@ -256,6 +257,8 @@ class SubjectService:
                     )
 
             await self.session.commit()
+            # deleting subjects cascades to their classes/class times
+            await invalidate_group_timetables()
             return "Subjects fully replaced from file"
 
         except Exception as e:
@@ -1,38 +1,47 @@
+import json
+
 from sqlmodel import select
 from sqlalchemy.orm import selectinload
 
 from app.database.models import User, ClassTime, Class, Subject, Group  # adjust import
+from app.infra.redis_async import redis_user_info_cache_async
+
+# Rendered timetable per group ({"group_name", "timetable"}); dropped by
+# ClassService on every CSV import, the TTL is only a safety net.
+TIMETABLE_CACHE_TTL = 60 * 60 * 24
+
+
+def group_timetable_key(group_id) -> str:
+    return f"timetable:group:{group_id}"
+
+
+async def invalidate_group_timetables(group_ids=None) -> None:
+    """Drops the cached timetables of `group_ids`, or of every group when None."""
+    try:
+        if group_ids is not None:
+            keys = [group_timetable_key(g) for g in group_ids]
+        else:
+            keys = [k async for k in redis_user_info_cache_async.scan_iter(match=group_timetable_key("*"))]
+        if keys:
+            await redis_user_info_cache_async.delete(*keys)
+    except Exception:
+        pass
+
 
 class TimeTableService:
     def __init__(self, session):
         self.session = session
 
-    async def my_time_table(self, user: User):
-        # Reload user with group eager-loaded (prevents user.group lazy load)
-        stmt_user = (
-            select(User)
-            .where(User.id == user.id)
-            .options(selectinload(User.group))
-        )
-        db_user = (await self.session.execute(stmt_user)).scalars().first()
-        if not db_user:
-            return {"detail": "User not found"}
-
-        if not db_user.group_id:
-            return {
-                "first_name": db_user.first_name or "",
-                "group_name": None,
-                "timetable": {},
-                "detail": "User has no group",
-            }
-
-        group_name = db_user.group.group_name if db_user.group else None
+    async def _build_group_timetable(self, group_id) -> dict:
+        group_name = (await self.session.execute(
+            select(Group.group_name).where(Group.id == group_id)
+        )).scalar_one_or_none()
 
         # Load ClassTime -> klass -> subject eagerly (prevents lazy loads)
         stmt = (
             select(ClassTime)
             .join(Class, ClassTime.class_id == Class.id)
-            .where(Class.group_id == db_user.group_id)
+            .where(Class.group_id == group_id)
             .options(
                 selectinload(ClassTime.klass).selectinload(Class.subject),
             )
@@ -63,8 +72,38 @@ class TimeTableService:
         order = ["monday","tuesday","wednesday","thursday","friday","saturday","sunday"]
         ordered = {d: timetable[d] for d in order if d in timetable}
 
+        return {"group_name": group_name, "timetable": ordered}
+
+    async def group_timetable(self, group_id) -> dict:
+        key = group_timetable_key(group_id)
+        try:
+            cached = await redis_user_info_cache_async.get(key)
+        except Exception:
+            cached = None
+        if cached:
+            return json.loads(cached)
+
+        data = await self._build_group_timetable(group_id)
+        try:
+            await redis_user_info_cache_async.set(key, json.dumps(data, ensure_ascii=False), ex=TIMETABLE_CACHE_TTL)
+        except Exception:
+            pass
+        return data
+
+    async def my_time_table(self, user: User):
+        # current_user already carries group_id/first_name: no user reload
+        if not user.group_id:
+            return {
+                "first_name": user.first_name or "",
+                "group_name": None,
+                "timetable": {},
+                "detail": "User has no group",
+            }
+
+        data = await self.group_timetable(user.group_id)
+
         return {
-            "first_name": db_user.first_name or "",
-            "group_name": group_name,
-            "timetable": ordered,
+            "first_name": user.first_name or "",
+            "group_name": data["group_name"],
+            "timetable": data["timetable"],
         }
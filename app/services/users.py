@@ -15,7 +15,9 @@ import pandas as pd
 from app.database.models import Class, Enrollment,Group,User
 from app.api.schema.user import CreateFullUserByCsv
 from app.scraper.script import EclassClient
+from app.infra.rate_limit import eclass_rate_limiter
 from app.services.eclass import EClassService
+from app.services.identity import UserIdentity, get_identity, invalidate_all_identities, invalidate_identity
 
 ALLOWED_CONTENT_TYPES = [
     "text/csv",
@@ -55,6 +57,25 @@ class UserService():
             ) 
         return user
 
+    async def get_current_identity(self,telegram_id:str)->UserIdentity:
+        # cached id/group/names only, no ORM graph (see app/services/identity.py)
+        identity = await get_identity(self.session,telegram_id)
+        if not identity:
+            raise HTTPException(
+                detail="User is not registered\Please Register first!",
+                status_code=404
+            )
+        return identity
+
+    async def get_current_identity_with_password(self,telegram_id:str)->UserIdentity:
+        identity = await self.get_current_identity(telegram_id)
+        if not identity.has_password:
+            raise HTTPException(
+                detail="User is not fully registered\Please Register first!",
+                status_code=403
+            )
+        return identity
+
     async def adding_subjects_by_csv(self, file: UploadFile) -> str:
         if file.content_type not in ALLOWED_CONTENT_TYPES:
             raise HTTPException(detail="File type not allowed. Allowed only for .csv!", status_code=400)
@@ -72,6 +93,7 @@ class UserService():
             await self.session.execute(delete(Enrollment))
             await self.session.execute(delete(User))
             await self.session.commit()
+            await invalidate_all_identities()
 
             for i in data:
                 user_data = i.model_dump()
@@ -107,6 +129,7 @@ class UserService():
                     )
 
             await self.session.commit()
+            await invalidate_all_identities()
             return "successfully updated whole database"
 
         except ValidationError as e:
@@ -149,14 +172,16 @@ class UserService():
         if user.password:
             raise HTTPException(detail="user must register with password",status_code=300)
         
+        old_telegram_id = user.telegram_id
         user.telegram_id = telegram_id
 
         await self.session.commit()
+        await invalidate_identity(old_telegram_id,telegram_id)
         return user
     
 
     async def register_with_password(self,student_id:str,password:str,telegram_id:str):
-        c = EclassClient()
+        c = EclassClient(rate_limiter=eclass_rate_limiter)
         d= EClassService(self.session)
         query = await self.session.execute(select(User).where(User.student_id == student_id))
         user = query.scalar_one_or_none()
@@ -164,10 +189,11 @@ class UserService():
         result,err = await c.check_credentials(user.student_id,password)
 
         if result:
-            user
+            old_telegram_id = user.telegram_id
             user.password = password
             user.telegram_id = telegram_id
             await self.session.commit()
+            await invalidate_identity(old_telegram_id,telegram_id)
             return await d.register_load_data(user)
 
             
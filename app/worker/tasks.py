@@ -1,10 +1,14 @@
-from app.config import db_settings
+from app.config import db_settings, scraper_settings
 
 import os
-from celery import Celery
+from celery import Celery, chord, group
 from kombu import Queue
 
 from app.database.session_sync import get_sync_session
+from app.infra import tracing
+from app.infra.metrics import setup_celery_metrics
+from app.infra.tracing import setup_celery_tracing, tracer
+from app.services.notifications import NotificationOutboxService
 from app.services.scraping import ScrapService
 
 # -------------------------
@@ -20,6 +24,11 @@ celery = Celery(
 celery.conf.timezone = "Asia/Tashkent"
 celery.conf.enable_utc = True
 
+# Per-user scrape subtasks are long and uneven: the bulk worker takes them
+# one at a time (--prefetch-multiplier=1, --concurrency in docker-compose.yml)
+# and take_info_from_eclass_for_user only acks once finished, so a dead
+# worker's users are picked up again. The realtime queue keeps the defaults.
+
 
 
 # Queues
@@ -33,9 +42,29 @@ celery.conf.task_queues = (
 # Route tasks
 celery.conf.task_routes = {
     "app.worker.tasks.take_info_from_eclass": {"queue": "bulk"},
+    "app.worker.tasks.take_info_from_eclass_for_user": {"queue": "bulk"},
+    "app.worker.tasks.summarize_eclass_scrape": {"queue": "bulk"},
     "app.worker.tasks.take_info_from_eclass_one_user": {"queue": "realtime"},
+    "app.worker.tasks.dispatch_notifications": {"queue": "realtime"},
+}
+
+# Safety net for the outbox: scrape tasks trigger a drain right after they
+# queue messages, this picks up retries and anything a crash left behind.
+celery.conf.beat_schedule = {
+    "dispatch-notifications": {
+        "task": "app.worker.tasks.dispatch_notifications",
+        "schedule": 30.0,
+    },
 }
 
+# task timings; PROMETHEUS_MULTIPROC_DIR must be set for the prefork pool
+setup_celery_metrics(scraper_settings.worker_metrics_port)
+# one span per task; subtasks join the dispatcher's trace via a traceparent header
+setup_celery_tracing()
+
+# scrape errors worth another try later (eClass throttling / hiccups)
+RETRYABLE_ERRORS = {"RateLimited", "TemporaryServerError", "EclassError"}
+
 
 
 
@@ -44,14 +73,86 @@ celery.conf.task_routes = {
 # -------------------------
 @celery.task(name="app.worker.tasks.take_info_from_eclass")
 def take_info_from_eclass():
+    """Dispatcher: one bulk subtask per user, summary in the chord callback."""
+    with get_sync_session() as session:
+        user_ids = ScrapService(session).eligible_user_ids()
+
+    if not user_ids:
+        return {"dispatched": 0}
+
+    traceparent = tracing.current_span().traceparent
+    options = {"headers": {"traceparent": traceparent}} if traceparent else {}
+    header = group(take_info_from_eclass_for_user.s(str(user_id)).set(**options) for user_id in user_ids)
+    chord(header)(summarize_eclass_scrape.s())
+    return {"dispatched": len(user_ids)}
+
+@celery.task(
+    bind=True,
+    name="app.worker.tasks.take_info_from_eclass_for_user",
+    max_retries=scraper_settings.bulk_scrape_max_retries,
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def take_info_from_eclass_for_user(self, user_id):
     with get_sync_session() as session:
         service = ScrapService(session)
-        service.scrape_e_class_for_all()
+        result = service.scrape_e_class_for_user_id(user_id)
         session.commit()
 
+    if result.get("notifications"):
+        dispatch_notifications.delay()
+
+    error = result.get("error")
+    if error and error.get("error") in RETRYABLE_ERRORS and self.request.retries < self.max_retries:
+        countdown = scraper_settings.bulk_scrape_retry_backoff * (2 ** self.request.retries)
+        raise self.retry(countdown=countdown)
+    return result
+
+@celery.task(name="app.worker.tasks.summarize_eclass_scrape")
+def summarize_eclass_scrape(results):
+    errors = []
+    page_stats = {}
+    for r in results or []:
+        if not r:
+            continue
+        if r.get("error"):
+            errors.append(r["error"])
+        for k, v in (r.get("page_cache") or {}).items():
+            page_stats[k] = page_stats.get(k, 0) + v
+
+    slow_phases = tracing.merge_phases(r.get("phases") for r in results or [] if r)
+    slowest = sorted(
+        ({"user_id": r["user_id"], "seconds": r["seconds"]} for r in results or [] if r and r.get("seconds")),
+        key=lambda x: x["seconds"], reverse=True,
+    )[:scraper_settings.trace_waterfall_users]
+    tracer.emit_report(
+        "slowest users\n"
+        + "\n".join(f"{u['user_id']} {u['seconds']:.3f}s" for u in slowest)
+        + "\n\ntop phases (self time)\n"
+        + tracing.format_phases(slow_phases)
+    )
+
+    return {
+        "users": len(results or []),
+        "failed": len(errors),
+        "errors": errors,
+        "page_cache": page_stats,
+        "slow_phases": slow_phases,
+        "slowest_users": slowest,
+    }
+
 @celery.task(name="app.worker.tasks.take_info_from_eclass_one_user")
 def take_info_from_eclass_one_user(user_id):
     with get_sync_session() as session:
         service = ScrapService(session, is_send=False)
         service.scrape_e_class_for_one_user(user_id)
         session.commit()
+
+    if service.notifications_queued:
+        dispatch_notifications.delay()
+
+@celery.task(name="app.worker.tasks.dispatch_notifications")
+def dispatch_notifications():
+    """Drains NotificationOutbox; safe to run concurrently (SKIP LOCKED)."""
+    with get_sync_session() as session:
+        return NotificationOutboxService(session).drain()
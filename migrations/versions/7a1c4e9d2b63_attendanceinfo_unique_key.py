@@ -0,0 +1,43 @@
+"""attendanceinfo unique key
+
+Revision ID: 7a1c4e9d2b63
+Revises: 2fe484ff2111
+Create Date: 2026-10-16 10:12:44.218307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a1c4e9d2b63'
+down_revision: Union[str, Sequence[str], None] = '2fe484ff2111'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # keep one row per (enrollment, date, class), preferring rows already seen
+    op.execute(
+        """
+        DELETE FROM attendanceinfo a
+        USING attendanceinfo b
+        WHERE a.enrollment_id = b.enrollment_id
+          AND a.date_of_week = b.date_of_week
+          AND a.class_name = b.class_name
+          AND (a.is_seen, a.ctid) < (b.is_seen, b.ctid)
+        """
+    )
+    op.create_unique_constraint(
+        'uq_attendanceinfo_enrollment_date_class',
+        'attendanceinfo',
+        ['enrollment_id', 'date_of_week', 'class_name'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_attendanceinfo_enrollment_date_class', 'attendanceinfo', type_='unique')
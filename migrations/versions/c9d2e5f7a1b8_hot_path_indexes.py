@@ -0,0 +1,60 @@
+"""hot path indexes
+
+Revision ID: c9d2e5f7a1b8
+Revises: b3e8f0a6c4d1
+Create Date: 2026-10-16 12:31:07.514209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d2e5f7a1b8'
+down_revision: Union[str, Sequence[str], None] = 'b3e8f0a6c4d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns); subject.name, professor.name and
+# class(group_id, subject_id) are already covered by their unique constraints
+INDEXES = [
+    ('ix_assignment_enrollment_id', 'assignment', ['enrollment_id']),
+    ('ix_quiz_enrollment_id', 'quiz', ['enrollment_id']),
+    ('ix_classtime_class_id', 'classtime', ['class_id']),
+    ('ix_class_subject_id', 'class', ['subject_id']),
+    ('ix_users_student_id', 'users', ['student_id']),
+    ('ix_users_group_id', 'users', ['group_id']),
+    ('ix_subjectmajorlink_subject_id', 'subjectmajorlink', ['subject_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+        # latest unseen absence/late per enrollment (NotificationAttendanceService)
+        op.create_index(
+            'ix_attendanceinfo_unseen_absence_late',
+            'attendanceinfo',
+            ['enrollment_id', sa.text('date_of_week DESC')],
+            unique=False,
+            postgresql_where=sa.text('is_seen IS false AND (absence IS true OR late IS true)'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_attendanceinfo_unseen_absence_late', table_name='attendanceinfo',
+                      postgresql_concurrently=True, if_exists=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
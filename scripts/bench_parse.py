@@ -0,0 +1,56 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# HTML parse benchmark for EclassClient
+#
+# Replays one synthetic student (scripts/eclass_pages.py) through
+# EclassClient.get_all_attendance() without network and reports how many
+# BeautifulSoup parses and how much parse time one student costs.
+#
+#   python scripts/bench_parse.py [students] [courses]
+#
+# "legacy" re-parses on every consumer (old behaviour),
+# "shared" parses each response once (ParsedPage reuse).
+# =========================
+import time
+
+from app.scraper.script import EclassClient, ParsedPage
+from scripts import eclass_pages
+from scripts.page_corpus import replay_client
+
+
+def run(mode: str, students: int, courses: int) -> dict:
+    ParsedPage.reuse = mode == "shared"
+    ParsedPage.reset_stats()
+
+    eclass_pages.BASE_URL = EclassClient().cfg.base_url.rstrip("/")
+    sites = [dict(eclass_pages.student_site(courses, seed=i)) for i in range(students)]
+
+    t0 = time.perf_counter()
+    for site in sites:
+        replay_client(site).get_all_attendance()
+    wall = time.perf_counter() - t0
+
+    return {
+        "mode": mode,
+        "parses_per_student": ParsedPage.parse_count / students,
+        "parse_ms_per_student": ParsedPage.parse_seconds * 1000 / students,
+        "wall_ms_per_student": wall * 1000 / students,
+    }
+
+
+if __name__ == "__main__":
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    courses = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    print(f"students={students} courses/student={courses}")
+    for mode in ("legacy", "shared"):
+        r = run(mode, students, courses)
+        print(
+            f"{r['mode']:>7}: parses/student={r['parses_per_student']:.1f} "
+            f"parse={r['parse_ms_per_student']:.1f}ms/student "
+            f"total={r['wall_ms_per_student']:.1f}ms/student"
+        )
+    ParsedPage.reuse = True
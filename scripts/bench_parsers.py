@@ -0,0 +1,191 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# Per-parser benchmark + output check on the page corpus
+#
+# Times every EclassClient parser on every page of its kind (fresh parse
+# each round, GC off while timing) and the whole replayed scrape per
+# student, then reports min / median / mean / stddev per page.
+#
+#   python scripts/bench_parsers.py [--corpus NAME] [--rounds 15] [--backend lxml|bs4]
+#       [--check] [--save out.json] [--compare baseline.json --tolerance 0.25]
+#
+# --corpus   scripts/fixtures/<NAME> (see scripts/record_pages.py);
+#            without it the synthetic pages of scripts/eclass_pages.py
+# --backend  ParsedPage.backend for the run (default: PARSER_BACKEND);
+#            offline_attendance_page has no lxml version and always runs
+#            on BeautifulSoup. scripts/diff_parsers.py checks that both
+#            backends return the same
+# --check    replayed output must equal each student's expected.json
+# --compare  fail when a parser's median got slower than the baseline
+#            by more than --tolerance (baselines from --save on the same
+#            machine only)
+#
+# Exit code 1 on a check mismatch or a regression.
+# =========================
+import argparse
+import gc
+import json
+import platform
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.scraper.script import EclassClient, ParsedPage
+from scripts.page_corpus import Corpus, first_difference, load_corpus, replay_student
+
+# parser name -> (page kind, fn(client, html, url)); each call parses the html itself
+PARSERS: Dict[str, Tuple[str, Callable]] = {
+    "course_list": ("home", lambda c, html, url: c._parse_course_list(ParsedPage(html, url))),
+    "course_page": ("course", lambda c, html, url: c._parse_course_page(html, "", url)),
+    # lxml backend: parsed only up to the course fields (fastparse.CoursePageFeed)
+    "course_page_stream": (
+        "course",
+        lambda c, html, url: c._parse_course_page(ParsedPage(html, url, course=True), "", url),
+    ),
+    "quiz_url": ("course", lambda c, html, url: c._find_quiz_url(html)),
+    "offline_attendance_rows": ("offline_attendance", lambda c, html, url: c._parse_offline_attendance_rows(html)),
+    "offline_attendance_page": ("offline_attendance", lambda c, html, url: c._parse_offline_attendance_page(html)),
+    "course_attendance": (
+        "offline_attendance",
+        lambda c, html, url: c._parse_course_attendance(None, html, "offline"),
+    ),
+    "online_attendance_page": ("online_attendance", lambda c, html, url: c._parse_online_attendance_page(html)),
+    "assignments_index_page": ("assign_index", lambda c, html, url: c._parse_assignments_index_page(html)),
+    "course_assignments": ("assign_index", lambda c, html, url: c._parse_course_assignments(html, url)),
+    "quiz_index_rows": ("quiz_index", lambda c, html, url: c._parse_quiz_index_rows(html, url)),
+    "quiz_view_status": ("quiz_view", lambda c, html, url: c._quiz_status_from_page(html)),
+}
+
+
+def _time(fn: Callable[[], object], rounds: int) -> List[float]:
+    fn()  # warm-up
+    times = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - t0)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return times
+
+
+def _stats(per_page: List[float], pages: int, students: int) -> dict:
+    return {
+        "pages": pages,
+        "min_ms": min(per_page) * 1000,
+        "median_ms": statistics.median(per_page) * 1000,
+        "mean_ms": statistics.fmean(per_page) * 1000,
+        "stddev_ms": (statistics.stdev(per_page) if len(per_page) > 1 else 0.0) * 1000,
+        # all of this parser's pages of one student, median round
+        "per_student_ms": statistics.median(per_page) * 1000 * pages / max(students, 1),
+    }
+
+
+def bench(corpus: Corpus, rounds: int, only: List[str]) -> Dict[str, dict]:
+    client = EclassClient()
+    results: Dict[str, dict] = {}
+    students = len(corpus.students)
+
+    for name, (kind, fn) in PARSERS.items():
+        if only and name not in only:
+            continue
+        pages = [p for s in corpus.students for p in s.pages if p.kind == kind]
+        if not pages:
+            continue
+        # one sample per page and round: median of the page's rounds
+        per_page = [statistics.median(_time(lambda p=p: fn(client, p.html, p.url), rounds)) for p in pages]
+        results[name] = _stats(per_page, len(pages), students)
+
+    if not only or "student_total" in only:
+        per_student = [statistics.median(_time(lambda s=s: replay_student(s.site), max(1, rounds // 5)))
+                       for s in corpus.students]
+        results["student_total"] = _stats(per_student, students, students)
+    return results
+
+
+def check(corpus: Corpus) -> int:
+    failed = 0
+    for s in corpus.students:
+        if s.expected is None:
+            print(f"check {s.id}: no expected.json, skipped")
+            continue
+        diff = first_difference(s.expected, replay_student(s.site))
+        if diff:
+            failed += 1
+            path, exp, got = diff
+            print(f"check {s.id}: MISMATCH at {path}\n    expected {exp!r:.200}\n    got      {got!r:.200}")
+        else:
+            print(f"check {s.id}: ok")
+    return failed
+
+
+def compare(results: Dict[str, dict], baseline_path: str, tolerance: float) -> int:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["benchmarks"]
+    regressions = 0
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = r["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        bad = ratio > 1 + tolerance
+        regressions += bad
+        print(f"{'SLOWER' if bad else 'ok':<7}{name:<26} {base['median_ms']:>9.3f} -> {r['median_ms']:>9.3f} ms  x{ratio:.2f}")
+    return regressions
+
+
+def main(args) -> int:
+    if args.backend:
+        ParsedPage.backend = args.backend
+    corpus = load_corpus(args.corpus)
+    kinds: Dict[str, int] = {}
+    for s in corpus.students:
+        for p in s.pages:
+            kinds[p.kind] = kinds.get(p.kind, 0) + 1
+    print(f"backend={ParsedPage.backend} corpus={corpus.name} students={len(corpus.students)} " + " ".join(f"{k}={v}" for k, v in sorted(kinds.items())))
+
+    failed = check(corpus) if args.check else 0
+
+    results = bench(corpus, args.rounds, args.only)
+    print(f"\n{'parser':<26}{'pages':>6}{'min':>10}{'median':>10}{'mean':>10}{'stddev':>10}{'/student':>11}  (ms)")
+    for name, r in results.items():
+        print(f"{name:<26}{r['pages']:>6}{r['min_ms']:>10.3f}{r['median_ms']:>10.3f}{r['mean_ms']:>10.3f}"
+              f"{r['stddev_ms']:>10.3f}{r['per_student_ms']:>11.2f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform()},
+                "corpus": corpus.name,
+                "backend": ParsedPage.backend,
+                "rounds": args.rounds,
+                "benchmarks": results,
+            }, f, indent=1)
+        print(f"\nsaved {args.save}")
+
+    regressions = 0
+    if args.compare:
+        print(f"\ncompared with {args.compare} (tolerance {args.tolerance:.0%})")
+        regressions = compare(results, args.compare, args.tolerance)
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the eClass parsers on the page corpus.")
+    parser.add_argument("--corpus", default=None, help="scripts/fixtures/<name> or a path; default: synthetic pages")
+    parser.add_argument("--backend", choices=("lxml", "bs4"), default=None, help="parser backend to time")
+    parser.add_argument("--rounds", type=int, default=15, help="timed rounds per page")
+    parser.add_argument("--only", action="append", default=[], help="parser name (repeatable), incl. student_total")
+    parser.add_argument("--check", action="store_true", help="compare replayed output with expected.json")
+    parser.add_argument("--save", default=None, help="write results as JSON")
+    parser.add_argument("--compare", default=None, help="baseline JSON from --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed median slowdown for --compare")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,216 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# Differential check: lxml fast path vs BeautifulSoup parsers
+#
+# Runs every parser of scripts/bench_parsers.py (plus the login check) on
+# every corpus page with ParsedPage.backend = "bs4" and = "lxml", and the
+# whole replayed scrape per student, and reports the first difference of
+# each mismatch. Hand-written edge-case pages (menu-text fallbacks,
+# comments / scripts inside cells, nested tables, entities, XML
+# declaration, empty pages, course pages that stream past the first
+# block ...) always run as well. course_page_stream / logged_in_stream
+# check the early-stopped course page tree (fastparse.CoursePageFeed).
+#
+#   python scripts/diff_parsers.py [--corpus NAME] [--verbose]
+#
+# Run it on a freshly recorded corpus before relying on
+# PARSER_BACKEND=lxml against a changed eClass theme.
+# Exit code 1 on any mismatch.
+# =========================
+import argparse
+import json
+import warnings
+from typing import Any, Callable, List, Tuple
+
+from bs4 import XMLParsedAsHTMLWarning
+
+from app.scraper.script import EclassClient, ParsedPage
+from scripts.bench_parsers import PARSERS
+from scripts.page_corpus import first_difference, load_corpus, replay_student
+
+CHECKS = dict(PARSERS)
+CHECKS["logged_in"] = ("*", lambda c, html, url: c._is_logged_in_html(html))
+CHECKS["logged_in_stream"] = ("course", lambda c, html, url: c._is_logged_in_html(ParsedPage(html, url, course=True)))
+
+_BASE = EclassClient().cfg.base_url.rstrip("/")
+_LOGOUT = f'<a href="{_BASE}/login/logout.php?sesskey=x">Log out</a>'
+
+# (kind, url, html)
+EDGE_CASES: List[Tuple[str, str, str]] = [
+    ("course", f"{_BASE}/course/view.php?id=1", f"""<html><body>{_LOGOUT}
+        <div class="coursename"><h1><a href="#">Data&nbsp;Structures  <!-- x --> and
+        Algorithms-2 [202601-ABC]</a></h1></div>
+        <h4 class="media-heading">Staff</h4>
+        <h4 class="media-heading"> Kim <b>Min</b>\tSu <script>var a = 1;</script></h4>
+        <a href="/local/ubattendance/my_status.php">
+            <span>Offline</span> <i>attendance</i></a>
+        <a href="/report/ubcompletion/progress.php?id=1">Online Attendance</a>
+        <a href="/mod/assign/index.php"> Assign<!-- c -->ment </a>
+        <a href="/mod/quiz/index.php?x=1"><style>.q{{}}</style>QUIZ</a>
+    </body></html>"""),
+    ("course", f"{_BASE}/course/view.php?id=2", f"""<html><body>{_LOGOUT}
+        <div class="coursename x"><h1>No link</h1></div>
+        <a href="">empty</a><a href="/report/ubcompletion/progress.php">online-attendance</a>
+        <a href="/mod/assign/index.php">Assignments</a><a href="/mod/quiz/index.php">Quizzes</a>
+    </body></html>"""),
+    ("course", f"{_BASE}/course/view.php?id=3", f"""<html><body>{_LOGOUT}
+        <a class="submenu-attendance" href="/local/ubattendance/my_status.php?id=3&amp;x=1">A</a>
+        <a href="/local/ubattendance/my_status.php?id=9">second</a>
+        <a href="/mod/quiz/index.php">Quiz</a><a href="/mod/quiz/index.php?id=3">later</a>
+    </body></html>"""),
+    # streamed course pages: the stop point must not change the result
+    ("course", f"{_BASE}/course/view.php?id=4", f"""<html><body>{_LOGOUT}
+        <div class="coursename"><h1>Title only</h1></div>
+        <div class="usermenu"><img class="userpicture"></div>
+        <h4 class="media-heading">Too many words in this heading here</h4>
+        <a href="/mod/assign/index.php?id=4">Assignment</a>
+        <div class="x coursename"><h1><span><a href="#">Real &amp; Name</a></span></h1></div>
+        <h4 class="media-heading">Lee Ji Eun</h4>
+        <a href="/report/ubcompletion/progress.php?id=4">Online</a>
+        {"<p>filler</p>" * 2000}
+        <a href="/local/ubattendance/my_status.php?id=4">Offline</a>
+        {"<p>filler</p>" * 4000}
+        <div class="coursename"><h1><a href="#">Later name</a></h1></div>
+        <h4 class="media-heading">Later Professor</h4>
+        <a href="/mod/assign/index.php?id=99">Assignment</a>
+        <a href="/mod/quiz/index.php?id=4">Quiz</a>
+    </body></html>"""),
+    ("course", f"{_BASE}/course/view.php?id=5", f"""<html><body>{_LOGOUT}
+        <div class="coursename"><h1><a href="#">{"Long name " * 3000}</a></h1></div>
+        <h4 class="media-heading">Park Su</h4>
+        <a href="/mod/assign/index.php?id=5">Assignment</a>
+        {"<p>filler</p>" * 3000}
+        <a href="/report/ubcompletion/progress.php?id=5">Online</a>
+        <div class="user_attendance"><div class="att_count"><p>Late<span>1</span></p></div></div>
+    </body></html>"""),
+    ("offline_attendance", f"{_BASE}/local/ubattendance/my_status.php?id=1", f"""<html><body>{_LOGOUT}
+        <table class="attendance_my"><thead><tr><th>Week</th></tr></thead><tbody>
+        <tr><td> 2026-03-02 </td><td>Lecture <span>1</span></td><td> ○ </td><td></td><td>o<!-- -->x</td></tr>
+        <tr><td>not a date</td><td></td><td>◯</td><td>O</td><td>&nbsp;</td></tr>
+        <tr><td>short</td><td>row</td></tr>
+        <tr><td><table><tbody><tr><td>n1</td><td>n2</td><td>n3</td><td>n4</td><td>n5</td></tr></tbody></table></td>
+            <td>b</td><td>c</td><td>d</td><td>e</td></tr>
+        </tbody><tfoot><tr><td>Attendance : 3 Absence: 1</td><td>late :2</td></tr></tfoot></table>
+    </body></html>"""),
+    ("offline_attendance", f"{_BASE}/local/ubattendance/my_status.php?id=2",
+     f"<html><body>{_LOGOUT}<table class='attendance_my'><tr><td>a</td></tr></table></body></html>"),
+    ("online_attendance", f"{_BASE}/report/ubcompletion/progress.php?id=1", f"""<html><body>{_LOGOUT}
+        <div class="att_count"><p>ignored<span>9</span></p></div>
+        <div class="user_attendance_table"><div class="att_count">
+            <p class="count01">Attendance: <span> 12 </span></p>
+            <p class="count02">Absence<span>x</span> 4</p>
+            <p class="count03">Late<span><b>2</b></span></p><p>no span 7</p>
+        </div></div></body></html>"""),
+    ("online_attendance", f"{_BASE}/report/ubcompletion/progress.php?id=2", f"""<html><body>{_LOGOUT}
+        <div class="alert alert-danger">The attendance of this course has <b>not been set</b>.</div>
+    </body></html>"""),
+    ("online_attendance", f"{_BASE}/report/ubcompletion/progress.php?id=3", f"""<html><body>{_LOGOUT}
+        <div class="error_message">Something else</div>
+        <div class="user_attendance"><div class="att_count"><p>출석<span>-</span></p></div></div>
+    </body></html>"""),
+    ("assign_index", f"{_BASE}/mod/assign/index.php?id=1", f"""<html><body>{_LOGOUT}
+        <table class="generaltable"><tbody>
+        <tr><td>Week 1</td><td><a href="view.php?id=5">HW&amp;1 <em>draft</em></a></td><td>Monday, 2 March 2026, 11:59 PM</td>
+            <td>Submitted</td><td>-</td></tr>
+        <tr><td></td><td>No link</td><td></td><td></td><td></td></tr>
+        <tr><td></td><td></td><td></td><td></td><td></td></tr>
+        <tr class="divider"><td colspan="5"></td></tr>
+        </tbody></table></body></html>"""),
+    ("assign_index", f"{_BASE}/mod/assign/index.php?id=2",
+     f"<html><body>{_LOGOUT}<table class='generaltable'><tr><td>1</td><td>2</td><td>3</td><td>4</td><td>5</td></tr></table></body></html>"),
+    ("quiz_index", f"{_BASE}/mod/quiz/index.php?id=1", f"""<html><body>{_LOGOUT}
+        <table class="generaltable"><tbody>
+        <tr><td>1</td><td><a href="view.php?id=7">Quiz <span>one</span></a></td><td>2026-03-02 10:00</td><td>8.00</td></tr>
+        <tr><td>2</td><td><a href="/mod/quiz/view.php?id=8">Two</a></td><td></td><td> - </td></tr>
+        <tr><td>3</td><td>no link</td><td></td><td></td></tr>
+        </tbody></table></body></html>"""),
+    ("quiz_view", f"{_BASE}/mod/quiz/view.php?id=1",
+     f"<html><body>{_LOGOUT}<div class='box quizattemptsummary'>x</div></body></html>"),
+    ("quiz_view", f"{_BASE}/mod/quiz/view.php?id=2",
+     f"<html><body>{_LOGOUT}<p>No attempts have been made yet</p><input type='submit' value='Attempt quiz now'></body></html>"),
+    ("home", f"{_BASE}/", f"""<?xml version="1.0" encoding="UTF-8"?>
+        <html><body><div class="userpicture"></div><div class="usermenu"></div>
+        <ul class="my-course-lists"><li><a class="course_link x" href="/course/view.php?id=1">
+        <div><h3>Course <b>A</b></h3></div>fallback</a></li>
+        <li><a class="course_link" href="/course/view.php?id=2"> Course&nbsp;B </a></li>
+        <li><a class="course_link">no href</a></li></ul>
+        <ul class="my-course-lists"><ul class="my-course-lists"><li><a class="course_link" href="c3">C</a></li></ul></ul>
+    </body></html>"""),
+    ("home", f"{_BASE}/", ""),
+    ("home", f"{_BASE}/", "   <!-- only a comment -->  "),
+    ("home", f"{_BASE}/login/index.php", '<html><body><form class="form-login"><input type="password" name="password"></form></body></html>'),
+]
+
+
+def _outcome(fn: Callable[[], Any]) -> Any:
+    try:
+        return json.loads(json.dumps(fn(), default=str))
+    except Exception as e:
+        return {"raised": type(e).__name__}
+
+
+def _both(fn: Callable[[], Any]) -> Tuple[Any, Any]:
+    backend = ParsedPage.backend
+    try:
+        ParsedPage.backend = "bs4"
+        expected = _outcome(fn)
+        ParsedPage.backend = "lxml"
+        actual = _outcome(fn)
+    finally:
+        ParsedPage.backend = backend
+    return expected, actual
+
+
+def _report(label: str, expected: Any, actual: Any, verbose: bool) -> int:
+    diff = first_difference(expected, actual)
+    if diff:
+        path, exp, got = diff
+        print(f"MISMATCH {label} at {path}\n    bs4  {exp!r:.200}\n    lxml {got!r:.200}")
+        return 1
+    if verbose:
+        print(f"ok {label}")
+    return 0
+
+
+def check_pages(pages: List[Tuple[str, str, str]], verbose: bool) -> Tuple[int, int]:
+    client = EclassClient()
+    checked = failed = 0
+    for kind, url, html in pages:
+        for name, (parser_kind, fn) in CHECKS.items():
+            if parser_kind not in (kind, "*"):
+                continue
+            expected, actual = _both(lambda: fn(client, html, url))
+            checked += 1
+            failed += _report(f"{name} {url}", expected, actual, verbose)
+    return checked, failed
+
+
+def main(args) -> int:
+    # the XML-declaration edge case
+    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+    corpus = load_corpus(args.corpus)
+    pages = [(p.kind, p.url, p.html) for s in corpus.students for p in s.pages]
+
+    checked, failed = check_pages(pages, args.verbose)
+    print(f"corpus={corpus.name}: {checked} parser runs on {len(pages)} pages, {failed} mismatches")
+
+    edge_checked, edge_failed = check_pages(EDGE_CASES, args.verbose)
+    print(f"edge cases: {edge_checked} parser runs on {len(EDGE_CASES)} pages, {edge_failed} mismatches")
+
+    student_failed = 0
+    for s in corpus.students:
+        expected, actual = _both(lambda: replay_student(s.site))
+        student_failed += _report(f"student {s.id}", expected, actual, args.verbose)
+    print(f"students: {len(corpus.students)} replayed, {student_failed} mismatches")
+
+    return 1 if failed or edge_failed or student_failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the lxml and BeautifulSoup parser backends.")
+    parser.add_argument("--corpus", default=None, help="scripts/fixtures/<name> or a path; default: synthetic pages")
+    parser.add_argument("--verbose", action="store_true", help="print matching checks too")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,248 @@
+"""
+Synthetic eClass (Moodle) pages.
+
+Markup mirrors what EclassClient reads on the real site (course list,
+course page menu, ubattendance / ubcompletion pages, assign + quiz index)
+and is padded with nav drawer / footer noise so page sizes are realistic.
+Used by the scraper benchmarks and dev tooling under scripts/.
+"""
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+
+BASE_URL = "https://eclass.inha.ac.kr"
+
+SUBJECT_NAMES = [
+    "Discrete Mathematics",
+    "Academic English 4",
+    "Digital Logic Circuit",
+    "Data Structures",
+    "Operating Systems",
+    "Computer Architecture",
+    "Probability and Statistics",
+    "Object Oriented Programming-2",
+    "Linear Algebra",
+    "Calculus 2",
+]
+
+PROFESSORS = [
+    "John Smith",
+    "Kim Min Su",
+    "Alisher Karimov",
+    "Lee Ji Eun",
+    "Maria Petrova",
+]
+
+
+def _header(logged_in: bool = True) -> str:
+    nav = "".join(
+        f'<li class="nav-item"><a class="nav-link" href="{BASE_URL}/mod/page/view.php?id={9000 + i}">'
+        f"Menu item {i}</a></li>"
+        for i in range(60)
+    )
+    user = (
+        f'<div class="usermenu"><span class="userpicture"><img src="/u.png"></span>'
+        f'<a href="{BASE_URL}/login/logout.php?sesskey=abc123">Log out</a></div>'
+        if logged_in
+        else ""
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>eClass</title>"
+        + "".join(f'<script src="/theme/js/{i}.js"></script>' for i in range(12))
+        + "</head><body>"
+        + f'<header class="navbar">{user}<ul class="navbar-nav">{nav}</ul></header>'
+    )
+
+
+def _footer() -> str:
+    links = "".join(f'<a href="{BASE_URL}/help.php?p={i}">Help {i}</a>' for i in range(40))
+    return f'<footer id="page-footer"><div class="footer-links">{links}</div><p>Inha University</p></footer></body></html>'
+
+
+def course_id(idx: int) -> int:
+    return 2300 + idx
+
+
+def course_title(idx: int) -> str:
+    name = SUBJECT_NAMES[idx % len(SUBJECT_NAMES)]
+    return f"{name}[202601-SOC{2000 + idx}-00{idx % 9}]"
+
+
+def login_page(error: str | None = None) -> str:
+    err = f'<div class="loginerrors"><p class="error">{error}</p></div>' if error else ""
+    return (
+        _header(logged_in=False)
+        + err
+        + f'<form class="mform form-login" action="{BASE_URL}/login/index.php" method="post">'
+        '<input type="hidden" name="logintoken" value="tok123">'
+        '<input type="text" name="username"><input type="password" name="password">'
+        '<input type="submit" name="loginbutton" value="Log in"></form>'
+        + _footer()
+    )
+
+
+def home_page(courses: int) -> str:
+    items = "".join(
+        f'<li><a class="course_link" href="{BASE_URL}/course/view.php?id={course_id(i)}">'
+        f"<h3>{course_title(i)}</h3></a></li>"
+        for i in range(courses)
+    )
+    return _header() + f'<ul class="my-course-lists">{items}</ul>' + _footer()
+
+
+def course_page(idx: int, attendance_kind: str = "offline", with_quiz: bool = True) -> str:
+    cid = course_id(idx)
+    sections = "".join(
+        f'<li class="section"><h3>Week {w}</h3>'
+        + "".join(
+            f'<a href="{BASE_URL}/mod/resource/view.php?id={cid * 100 + w * 10 + k}">Lecture {w}.{k}</a>'
+            for k in range(6)
+        )
+        + "</li>"
+        for w in range(1, 16)
+    )
+    if attendance_kind == "offline":
+        att_link = f'<a class="submenu-attendance" href="{BASE_URL}/local/ubattendance/my_status.php?id={cid}">Offline-Attendance</a>'
+        att_box = ""
+    else:
+        att_link = f'<a class="submenu-progress" href="{BASE_URL}/report/ubcompletion/progress.php?id={cid}">Online-Attendance</a>'
+        att_box = (
+            '<div class="user_attendance"><div class="att_count">'
+            '<p class="count01">Attendance<span> 9</span></p>'
+            '<p class="count02">Absence<span> 1</span></p>'
+            '<p class="count03">Late<span> 2</span></p></div></div>'
+        )
+    quiz_link = f'<a href="{BASE_URL}/mod/quiz/index.php?id={cid}">Quiz</a>' if with_quiz else ""
+    prof = PROFESSORS[idx % len(PROFESSORS)]
+    return (
+        _header()
+        + f'<div class="coursename"><h1><a href="{BASE_URL}/course/view.php?id={cid}">{course_title(idx)}</a></h1></div>'
+        + f'<div class="course-menu">{att_link}'
+        + f'<a href="{BASE_URL}/mod/assign/index.php?id={cid}">Assignment</a>{quiz_link}</div>'
+        + f'<div class="prof"><h4 class="media-heading">{prof}</h4></div>'
+        + att_box
+        + f'<ul class="topics">{sections}</ul>'
+        + _footer()
+    )
+
+
+def offline_attendance_page(idx: int, weeks: int = 14, seed: int = 0) -> str:
+    rnd = random.Random(seed * 1000 + idx)
+    start = date(2026, 2, 16)
+    rows = []
+    totals = {"att": 0, "abs": 0, "late": 0}
+    for w in range(weeks):
+        mark = rnd.choices(["att", "abs", "late"], weights=[8, 1, 1])[0]
+        totals[mark] += 1
+        cells = ["○" if mark == k else "" for k in ("att", "abs", "late")]
+        rows.append(
+            f"<tr><td>{(start + timedelta(days=7 * w)).isoformat()}</td><td>Class {w % 2 + 1}</td>"
+            + "".join(f"<td>{c}</td>" for c in cells)
+            + "</tr>"
+        )
+    tfoot = (
+        f'<tfoot><tr><td colspan="5">Attendance : {totals["att"]} '
+        f'Absence : {totals["abs"]} Late : {totals["late"]}</td></tr></tfoot>'
+    )
+    return (
+        _header()
+        + '<table class="attendance_my"><thead><tr><th>Date</th><th>Class</th>'
+        "<th>Attendance</th><th>Absence</th><th>Late</th></tr></thead>"
+        + f"<tbody>{''.join(rows)}</tbody>{tfoot}</table>"
+        + _footer()
+    )
+
+
+def online_attendance_page(idx: int) -> str:
+    return (
+        _header()
+        + '<div class="user_attendance_table"><div class="att_count">'
+        '<p class="count01">Attendance<span> 9</span></p>'
+        '<p class="count02">Absence<span> 1</span></p>'
+        '<p class="count03">Late<span> 2</span></p></div></div>'
+        + _footer()
+    )
+
+
+def assign_index_page(idx: int, items: int = 8, now: datetime | None = None) -> str:
+    now = now or datetime(2026, 3, 10, 12, 0)
+    cid = course_id(idx)
+    rows = []
+    for i in range(items):
+        due = now + timedelta(days=i * 3 - 9)
+        submitted = i % 3 == 0
+        rows.append(
+            f"<tr><td>Week {i + 1}</td>"
+            f'<td><a href="view.php?id={cid * 10 + i}">Homework {i + 1}</a></td>'
+            f"<td>{due.strftime('%Y-%m-%d %H:%M')}</td>"
+            f"<td>{'Submitted for grading' if submitted else 'No submission'}</td>"
+            f"<td>{'9.00 / 10.00' if submitted and i < 3 else '-'}</td></tr>"
+        )
+        rows.append('<tr class="lastrow"><td colspan="5"></td></tr>')
+    return (
+        _header()
+        + '<table class="generaltable"><thead><tr><th>Week</th><th>Assignment</th>'
+        "<th>Due date</th><th>Submission</th><th>Grade</th></tr></thead>"
+        + f"<tbody>{''.join(rows)}</tbody></table>"
+        + _footer()
+    )
+
+
+def quiz_index_page(idx: int, items: int = 12, now: datetime | None = None) -> str:
+    now = now or datetime(2026, 3, 10, 12, 0)
+    cid = course_id(idx)
+    rows = []
+    for i in range(items):
+        closes = now + timedelta(days=i * 2 - 10)
+        graded = i % 2 == 0
+        rows.append(
+            f"<tr><td>Week {i + 1}</td>"
+            f'<td><a href="view.php?id={cid * 100 + i}">Quiz {i + 1}</a></td>'
+            f"<td>{closes.strftime('%Y-%m-%d %H:%M')}</td>"
+            f"<td>{'8.00' if graded else '-'}</td></tr>"
+        )
+    return (
+        _header()
+        + '<table class="generaltable"><thead><tr><th>Week</th><th>Name</th>'
+        "<th>Quiz closes</th><th>Grade</th></tr></thead>"
+        + f"<tbody>{''.join(rows)}</tbody></table>"
+        + _footer()
+    )
+
+
+def quiz_view_page(submitted: bool) -> str:
+    if submitted:
+        body = (
+            "<h3>Summary of your previous attempts</h3>"
+            '<table class="generaltable quizattemptsummary"><tbody>'
+            "<tr><td>1</td><td>Finished</td><td>8.00</td></tr></tbody></table>"
+        )
+    else:
+        body = (
+            '<div class="box quizattempt"><p>No attempts have been made yet</p>'
+            '<form><input type="submit" value="Attempt quiz now"></form></div>'
+        )
+    return _header() + f'<div role="main">{body}</div>' + _footer()
+
+
+def student_site(courses: int = 8, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Every (url, html) one student's scrape touches, without login pages.
+    Every third course uses online attendance.
+    """
+    pages: List[Tuple[str, str]] = [(f"{BASE_URL}/", home_page(courses))]
+    for i in range(courses):
+        cid = course_id(i)
+        kind = "online" if i % 3 == 2 else "offline"
+        pages.append((f"{BASE_URL}/course/view.php?id={cid}", course_page(i, kind)))
+        if kind == "offline":
+            pages.append((f"{BASE_URL}/local/ubattendance/my_status.php?id={cid}", offline_attendance_page(i, seed=seed)))
+        else:
+            pages.append((f"{BASE_URL}/report/ubcompletion/progress.php?id={cid}", online_attendance_page(i)))
+        pages.append((f"{BASE_URL}/mod/assign/index.php?id={cid}", assign_index_page(i)))
+        pages.append((f"{BASE_URL}/mod/quiz/index.php?id={cid}", quiz_index_page(i)))
+        for q in range(12):
+            pages.append((f"{BASE_URL}/mod/quiz/view.php?id={cid * 100 + q}", quiz_view_page(q % 2 == 0)))
+    return pages
@@ -0,0 +1,181 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# Index usage check for the hot queries
+#
+# Creates every table in a throwaway schema, seeds it with generated rows,
+# ANALYZEs, then runs EXPLAIN on the lookups the scraper / API / admin panel
+# do all the time and checks that the planner picks the expected index.
+# Everything runs in one transaction that is rolled back: nothing is left
+# in the configured database.
+#
+#   python scripts/explain_check.py [--scale 1.0] [-v]
+#
+# Exit code 1 when a query does not use its index.
+# =========================
+import argparse
+import json
+from typing import Any, Iterator, List, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+from sqlmodel import SQLModel
+
+from app.database import models  # noqa: F401  (registers the tables)
+from app.database.models import Assignment, AttendanceInfo, Class, ClassTime, Professor, Quiz, Subject, User
+from app.database.session_sync import engine
+
+SCHEMA = "explain_check"
+
+SEED_SQL = [
+    """INSERT INTO "group" (id, group_name)
+       SELECT gen_random_uuid(), 'G-' || g FROM generate_series(1, :groups) g""",
+    """INSERT INTO subject (id, short_name, name)
+       SELECT gen_random_uuid(), 'S' || s, 'Subject ' || s FROM generate_series(1, :subjects) s""",
+    """INSERT INTO professor (id, name)
+       SELECT gen_random_uuid(), 'Prof ' || p FROM generate_series(1, :professors) p""",
+    """INSERT INTO subjectmajorlink (id, subject_id)
+       SELECT gen_random_uuid(), id FROM subject""",
+    # classes_per_group distinct subjects per group (UNIQUE(group_id, subject_id))
+    """WITH g AS (SELECT id, row_number() OVER () AS rn FROM "group"),
+            s AS (SELECT id, row_number() OVER () AS rn FROM subject),
+            p AS (SELECT id, row_number() OVER () AS rn FROM professor)
+       INSERT INTO class (id, group_id, subject_id, professor_id)
+       SELECT gen_random_uuid(), g.id, s.id, p.id
+       FROM g
+       CROSS JOIN generate_series(0, :classes_per_group - 1) k
+       JOIN s ON s.rn = ((g.rn * 7 + k) % :subjects) + 1
+       JOIN p ON p.rn = ((g.rn + k) % :professors) + 1""",
+    """INSERT INTO classtime (id, class_id, room)
+       SELECT gen_random_uuid(), c.id, 'R' || k FROM class c CROSS JOIN generate_series(1, 2) k""",
+    """WITH g AS (SELECT id, row_number() OVER () AS rn FROM "group")
+       INSERT INTO users (id, student_id, telegram_id, password, group_id, is_subscribed, is_started)
+       SELECT gen_random_uuid(), 'U' || lpad(u::text, 8, '0'), 'tg' || u, 'pw', g.id, false, false
+       FROM generate_series(1, :users) u
+       JOIN g ON g.rn = (u % :groups) + 1""",
+    """INSERT INTO enrollment (id, user_id, class_id)
+       SELECT gen_random_uuid(), u.id, c.id FROM users u JOIN class c ON c.group_id = u.group_id""",
+    # ~10% of the days are absence/late, only the last two days are unseen
+    """INSERT INTO attendanceinfo (id, date_of_week, class_name, attendance, absence, late, is_seen, enrollment_id)
+       SELECT gen_random_uuid(), DATE '2025-09-01' + d, 'Lecture',
+              NOT x.m, x.m AND d % 2 = 0, x.m AND d % 2 = 1, d < :days - 2, e.id
+       FROM enrollment e
+       CROSS JOIN generate_series(0, :days - 1) d
+       CROSS JOIN LATERAL (SELECT abs(hashtext(e.id::text || d::text)) % 10 = 0 AS m) x""",
+    """INSERT INTO assignment (id, enrollment_id)
+       SELECT gen_random_uuid(), e.id FROM enrollment e CROSS JOIN generate_series(1, 3)""",
+    """INSERT INTO quiz (id, enrollment_id)
+       SELECT gen_random_uuid(), e.id FROM enrollment e CROSS JOIN generate_series(1, 2)""",
+]
+
+
+def seed_params(scale: float) -> dict:
+    return {
+        "groups": max(2, int(60 * scale)),
+        "subjects": max(20, int(300 * scale)),
+        "professors": max(10, int(200 * scale)),
+        "classes_per_group": 8,
+        "users": max(100, int(6000 * scale)),
+        "days": 10,
+    }
+
+
+def unseen_absence_ranked():
+    # inner query of NotificationAttendanceService.get_assignment_more_info
+    return select(
+        AttendanceInfo.id,
+        AttendanceInfo.enrollment_id,
+        AttendanceInfo.date_of_week,
+        func.row_number().over(
+            partition_by=AttendanceInfo.enrollment_id,
+            order_by=AttendanceInfo.date_of_week.desc(),
+        ).label("rn"),
+    ).where(
+        AttendanceInfo.is_seen.is_(False),
+        (AttendanceInfo.absence.is_(True) | AttendanceInfo.late.is_(True)),
+    )
+
+
+def checks(conn) -> List[Tuple[str, Any, str]]:
+    """(label, statement, index the plan must use); sample values come from the seeded rows."""
+    subject_id, subject_name = conn.execute(select(Subject.id, Subject.name).limit(1).offset(5)).one()
+    professor_name = conn.execute(select(Professor.name).limit(1).offset(5)).scalar_one()
+    class_id, group_id, class_subject_id = conn.execute(
+        select(Class.id, Class.group_id, Class.subject_id).limit(1).offset(5)
+    ).one()
+    student_id = conn.execute(select(User.student_id).limit(1).offset(5)).scalar_one()
+    enrollment_id = conn.execute(select(Assignment.enrollment_id).limit(1).offset(5)).scalar_one()
+
+    return [
+        ("subject by name", select(Subject.id).where(Subject.name == subject_name), "subject_name_key"),
+        ("professor by name", select(Professor.id).where(Professor.name == professor_name), "professor_name_key"),
+        ("class by group+subject",
+         select(Class.id).where(Class.group_id == group_id, Class.subject_id == class_subject_id),
+         "uq_class_group_subject_prof"),
+        ("classes of subject", select(Class.id).where(Class.subject_id == subject_id), "ix_class_subject_id"),
+        ("classtimes of class", select(ClassTime.id).where(ClassTime.class_id == class_id), "ix_classtime_class_id"),
+        ("user by student_id", select(User.id).where(User.student_id == student_id), "ix_users_student_id"),
+        ("users of group",
+         select(User.id).where(User.group_id == group_id, User.telegram_id.isnot(None)),
+         "ix_users_group_id"),
+        ("assignments of enrollment",
+         select(Assignment).where(Assignment.enrollment_id == enrollment_id), "ix_assignment_enrollment_id"),
+        ("quizzes of enrollment", select(Quiz).where(Quiz.enrollment_id == enrollment_id), "ix_quiz_enrollment_id"),
+        ("attendance of enrollment",
+         select(AttendanceInfo.id).where(AttendanceInfo.enrollment_id == enrollment_id),
+         "uq_attendanceinfo_enrollment_date_class"),
+        ("latest unseen absence/late", unseen_absence_ranked(), "ix_attendanceinfo_unseen_absence_late"),
+    ]
+
+
+def _index_names(node: dict) -> Iterator[str]:
+    if "Index Name" in node:
+        yield node["Index Name"]
+    for child in node.get("Plans", []):
+        yield from _index_names(child)
+
+
+def explain(conn, stmt) -> dict:
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    raw = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar_one()
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+
+def main(args) -> int:
+    params = seed_params(args.scale)
+    failed = 0
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+            conn.execute(text(f"SET LOCAL search_path TO {SCHEMA}"))
+            SQLModel.metadata.create_all(conn)
+
+            for sql in SEED_SQL:
+                conn.execute(text(sql), params)
+            for table in SQLModel.metadata.sorted_tables:
+                conn.execute(text(f'ANALYZE "{table.name}"'))
+            print("seeded:", ", ".join(f"{k}={v}" for k, v in params.items()))
+
+            for label, stmt, index in checks(conn):
+                plan = explain(conn, stmt)
+                used = sorted(set(_index_names(plan)))
+                ok = index in used
+                failed += not ok
+                print(f"{'ok ' if ok else 'FAIL'} {label:<30} {plan['Node Type']:<18} cost={plan['Total Cost']:<10} "
+                      f"indexes={','.join(used) or '-'}")
+                if not ok or args.verbose:
+                    print("     expected " + index)
+                    print("     " + json.dumps(plan)[:600])
+        finally:
+            trans.rollback()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot queries on a seeded throwaway schema.")
+    parser.add_argument("--scale", type=float, default=1.0, help="dataset size multiplier")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    sys.exit(main(parser.parse_args()))
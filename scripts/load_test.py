@@ -0,0 +1,176 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# End-to-end scrape load test against the local eClass stand-in
+#
+# Starts scripts/mock_eclass.py in-process, points EclassClient at it,
+# seeds N mock students (group LOADTEST, telegram_id loadtest-<n>) and runs
+# ScrapService.scrape_e_class_for_all() against the configured Postgres +
+# Redis, --runs times (run 2+ shows the cookie / page-change reuse).
+# Reports users/min, failures, page cache counters, the slowest phases and
+# what the mock served.
+#
+#   python scripts/load_test.py --students 50 [--runs 2] [--latency-ms 150]
+#       [--p429 0.01] [--p5xx 0.01] [--etag] [--no-rate-limit] [--force]
+#
+# Use a disposable database: the scrape writes enrollments, attendance
+# and outbox rows for the seeded users. scrape_e_class_for_all also takes
+# every other user with a password, and those cannot log in to the mock
+# (their passwords would be cleared), so the run refuses to start while
+# such users exist unless --force is given.
+# =========================
+import argparse
+import threading
+import time
+
+from scripts.mock_eclass import add_mock_arguments, create_app, mock_config, student_username
+
+LOADTEST_GROUP = "LOADTEST"
+TELEGRAM_PREFIX = "loadtest-"
+
+
+def start_mock(app, host: str, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started:
+        if time.time() > deadline or not thread.is_alive():
+            raise RuntimeError(f"mock eClass did not start on {host}:{port}")
+        time.sleep(0.05)
+    return server, thread
+
+
+def seed_users(session, students: int, password: str) -> int:
+    """Creates the missing mock students; returns how many were added."""
+    from sqlalchemy import select
+    from app.database.models import Group, User
+
+    group = session.execute(select(Group).where(Group.group_name == LOADTEST_GROUP)).scalar_one_or_none()
+    if group is None:
+        group = Group(group_name=LOADTEST_GROUP)
+        session.add(group)
+        session.flush()
+
+    existing = set(session.execute(
+        select(User.student_id).where(User.telegram_id.like(f"{TELEGRAM_PREFIX}%"))
+    ).scalars().all())
+    added = 0
+    for n in range(1, students + 1):
+        student_id = student_username(n)
+        if student_id in existing:
+            continue
+        session.add(User(
+            student_id=student_id,
+            telegram_id=f"{TELEGRAM_PREFIX}{n}",
+            first_name="Load",
+            last_name=f"Test {n}",
+            password=password,
+            group_id=group.id,
+        ))
+        added += 1
+    # seeded users that lost their password in an earlier run get it back
+    for user in session.execute(
+        select(User).where(User.telegram_id.like(f"{TELEGRAM_PREFIX}%"), User.password == None)
+    ).scalars().all():
+        user.password = password
+    session.commit()
+    return added
+
+
+def other_users(session) -> int:
+    """Users the bulk scrape would pick up that are not mock students."""
+    from sqlalchemy import func, select
+    from app.database.models import User
+
+    return session.execute(
+        select(func.count()).select_from(User).where(
+            User.telegram_id != None,
+            User.password != None,
+            User.telegram_id.notlike(f"{TELEGRAM_PREFIX}%"),
+        )
+    ).scalar_one()
+
+
+def mock_stats(base_url: str, reset: bool = False) -> dict:
+    import httpx
+
+    with httpx.Client(base_url=base_url, timeout=10) as c:
+        stats = c.get("/__stats").json()
+        if reset:
+            c.post("/__reset")
+    return stats
+
+
+def main(args) -> int:
+    base_url = f"http://{args.host}:{args.port}/"
+    # settings are read at import time: set them before importing app.*
+    os.environ["BASE_URL"] = base_url
+    os.environ["LOGIN_INDEX_URL"] = base_url + "login/index.php"
+    if args.no_rate_limit:
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    from app.config import scraper_settings
+    from app.database.session_sync import get_sync_session
+    from app.services.scraping import ScrapService
+
+    cfg = mock_config(args)
+    start_mock(create_app(cfg, base_url), args.host, args.port)
+    print(f"mock eClass on {base_url}: students={cfg.students} courses={cfg.courses} "
+          f"latency={cfg.latency_ms:.0f}+-{cfg.jitter_ms:.0f}ms p429={cfg.p429} p5xx={cfg.p5xx} etag={cfg.etag}")
+    print(f"rate limit: {'on' if scraper_settings.rate_limit_enabled else 'off'} "
+          f"(login {scraper_settings.rate_limit_login_rps}/s, course {scraper_settings.rate_limit_course_rps}/s, "
+          f"subpage {scraper_settings.rate_limit_subpage_rps}/s), "
+          f"max_concurrency_per_host={scraper_settings.max_concurrency_per_host}")
+
+    with get_sync_session() as session:
+        others = other_users(session)
+        if others and not args.force:
+            print(f"refusing to run: {others} non-mock users would be scraped against the mock (use --force "
+                  f"only on a disposable database)")
+            return 2
+        added = seed_users(session, cfg.students, cfg.password)
+    print(f"seeded {added} new mock students ({cfg.students} total)\n")
+
+    failed_runs = 0
+    for run in range(1, args.runs + 1):
+        mock_stats(base_url, reset=True)
+        with get_sync_session() as session:
+            t0 = time.perf_counter()
+            result = ScrapService(session).scrape_e_class_for_all()
+            elapsed = time.perf_counter() - t0
+
+        users = cfg.students + others
+        served = mock_stats(base_url)["requests"]
+        print(f"run {run}: {users} users in {elapsed:.1f}s = {users / elapsed * 60:.1f} users/min, "
+              f"failed={result['failed']}")
+        print("  page cache: " + ", ".join(f"{k}={v}" for k, v in sorted((result.get("page_cache") or {}).items())))
+        print("  mock served: " + ", ".join(f"{k}={v}" for k, v in served.items()))
+        for phase in (result.get("slow_phases") or [])[:args.phases]:
+            print(f"  phase {phase['phase']:<24} self={phase['self_s']:.2f}s total={phase['total_s']:.2f}s n={phase['count']}")
+        errors: dict = {}
+        for e in result["errors"]:
+            errors[e["error"]] = errors.get(e["error"], 0) + 1
+        if errors:
+            print("  errors: " + ", ".join(f"{k}={v}" for k, v in errors.items()))
+        failed_runs += bool(result["failed"])
+        print()
+
+    return 1 if failed_runs else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape load test against a local mock eClass.")
+    add_mock_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--runs", type=int, default=1, help="bulk scrapes in a row")
+    parser.add_argument("--phases", type=int, default=8, help="slowest phases to print per run")
+    parser.add_argument("--no-rate-limit", action="store_true", help="turn off the fleet-wide eClass rate limiter")
+    parser.add_argument("--force", action="store_true", help="run even if non-mock users exist (disposable DB only)")
+    parser.set_defaults(students=50)
+    sys.exit(main(parser.parse_args()))
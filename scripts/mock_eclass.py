@@ -0,0 +1,241 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# Local eClass stand-in for scrape load tests
+#
+# ASGI app serving the Moodle endpoints EclassClient touches, with the
+# synthetic pages of scripts/eclass_pages.py: /login/index.php (GET form,
+# POST login), / (course list), /course/view.php,
+# /local/ubattendance/my_status.php, /report/ubcompletion/progress.php,
+# /mod/assign/index.php, /mod/quiz/index.php and /mod/quiz/view.php.
+#
+#   python scripts/mock_eclass.py [--students 100] [--courses 8] [--port 8765]
+#       [--latency-ms 150 --jitter-ms 100] [--p429 0.01 --retry-after 1] [--p5xx 0.01]
+#
+# Students log in as S0001 .. S<N> with --password (default "pass"); any
+# other login gets the Moodle error page. Sessions are in memory, so a
+# restart expires every stored cookie (AuthExpired -> re-login).
+# GET /__stats returns request counts per endpoint and status,
+# POST /__reset clears them.
+#
+# Point the app at it with BASE_URL=http://127.0.0.1:8765/ and
+# LOGIN_INDEX_URL=http://127.0.0.1:8765/login/index.php
+# (scripts/load_test.py does this itself).
+# =========================
+import argparse
+import asyncio
+import hashlib
+import random
+import secrets
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+
+from scripts import eclass_pages
+
+SESSION_COOKIE = "MoodleSession"
+
+
+@dataclass
+class MockConfig:
+    students: int = 100
+    courses: int = 8
+    password: str = "pass"
+    latency_ms: float = 150.0
+    jitter_ms: float = 100.0
+    p429: float = 0.0
+    retry_after: int = 1
+    p5xx: float = 0.0
+    etag: bool = False
+    seed: int = 0
+
+
+def student_username(n: int) -> str:
+    return f"S{n:04d}"
+
+
+def create_app(cfg: MockConfig, base_url: str) -> FastAPI:
+    eclass_pages.BASE_URL = base_url.rstrip("/")
+    app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+    sessions: dict = {}  # cookie -> student index
+    stats: Counter = Counter()
+    rnd = random.Random(cfg.seed)
+
+    @lru_cache(maxsize=None)
+    def home(courses: int) -> str:
+        return eclass_pages.home_page(courses)
+
+    @lru_cache(maxsize=None)
+    def course(idx: int) -> str:
+        return eclass_pages.course_page(idx, "online" if idx % 3 == 2 else "offline")
+
+    @lru_cache(maxsize=4096)
+    def offline_attendance(idx: int, student: int) -> str:
+        return eclass_pages.offline_attendance_page(idx, seed=student)
+
+    @lru_cache(maxsize=None)
+    def online_attendance(idx: int) -> str:
+        return eclass_pages.online_attendance_page(idx)
+
+    @lru_cache(maxsize=None)
+    def assign_index(idx: int) -> str:
+        return eclass_pages.assign_index_page(idx)
+
+    @lru_cache(maxsize=None)
+    def quiz_index(idx: int) -> str:
+        return eclass_pages.quiz_index_page(idx)
+
+    @lru_cache(maxsize=None)
+    def quiz_view(submitted: bool) -> str:
+        return eclass_pages.quiz_view_page(submitted)
+
+    def course_idx(request: Request):
+        try:
+            idx = int(request.query_params.get("id", "")) - eclass_pages.course_id(0)
+        except ValueError:
+            return None
+        return idx if 0 <= idx < cfg.courses else None
+
+    async def simulate(endpoint: str):
+        """Latency + injected failures; returns a response to send instead, or None."""
+        delay = max(0.0, cfg.latency_ms + rnd.uniform(-cfg.jitter_ms, cfg.jitter_ms)) / 1000
+        if delay:
+            await asyncio.sleep(delay)
+        roll = rnd.random()
+        if roll < cfg.p429:
+            stats[f"{endpoint} 429"] += 1
+            return Response("Too many requests", status_code=429, headers={"Retry-After": str(cfg.retry_after)})
+        if roll < cfg.p429 + cfg.p5xx:
+            stats[f"{endpoint} 503"] += 1
+            return Response("Service unavailable", status_code=503)
+        return None
+
+    def page(request: Request, endpoint: str, html: str) -> Response:
+        if cfg.etag:
+            tag = '"' + hashlib.blake2b(html.encode(), digest_size=8).hexdigest() + '"'
+            if request.headers.get("if-none-match") == tag:
+                stats[f"{endpoint} 304"] += 1
+                return Response(status_code=304, headers={"ETag": tag})
+            stats[f"{endpoint} 200"] += 1
+            return HTMLResponse(html, headers={"ETag": tag})
+        stats[f"{endpoint} 200"] += 1
+        return HTMLResponse(html)
+
+    def logged_in(request: Request):
+        return sessions.get(request.cookies.get(SESSION_COOKIE))
+
+    @app.get("/login/index.php")
+    async def login_form():
+        if (r := await simulate("login")) is not None:
+            return r
+        stats["login 200"] += 1
+        return HTMLResponse(eclass_pages.login_page())
+
+    @app.post("/login/index.php")
+    async def login_post(request: Request):
+        if (r := await simulate("login")) is not None:
+            return r
+        form = await request.form()
+        username = str(form.get("username") or "")
+        ok = (
+            username.startswith("S") and username[1:].isdigit()
+            and 1 <= int(username[1:]) <= cfg.students
+            and form.get("password") == cfg.password
+        )
+        if not ok:
+            stats["login failed"] += 1
+            return HTMLResponse(eclass_pages.login_page("Invalid login, please try again"))
+        cookie = secrets.token_hex(16)
+        sessions[cookie] = int(username[1:])
+        stats["login ok"] += 1
+        resp = RedirectResponse(eclass_pages.BASE_URL + "/", status_code=303)
+        resp.set_cookie(SESSION_COOKIE, cookie, path="/")
+        return resp
+
+    @app.get("/login/logout.php")
+    async def logout(request: Request):
+        sessions.pop(request.cookies.get(SESSION_COOKIE), None)
+        return RedirectResponse(eclass_pages.BASE_URL + "/login/index.php", status_code=303)
+
+    def course_route(path: str, endpoint: str, render):
+        @app.get(path)
+        async def handler(request: Request):
+            if (r := await simulate(endpoint)) is not None:
+                return r
+            student = logged_in(request)
+            if student is None:
+                stats[f"{endpoint} login"] += 1
+                return HTMLResponse(eclass_pages.login_page())
+            idx = course_idx(request)
+            html = render(idx, student, request) if idx is not None or endpoint in ("home", "quiz_view") else None
+            if html is None:
+                stats[f"{endpoint} 404"] += 1
+                return HTMLResponse("Not found", status_code=404)
+            return page(request, endpoint, html)
+
+    def render_quiz_view(_idx, _student, request):
+        try:
+            qid = int(request.query_params.get("id", ""))
+        except ValueError:
+            return None
+        return quiz_view(qid % 100 % 2 == 0)
+
+    course_route("/", "home", lambda _i, _s, _r: home(cfg.courses))
+    course_route("/course/view.php", "course", lambda i, _s, _r: course(i))
+    course_route("/local/ubattendance/my_status.php", "offline_attendance",
+                 lambda i, s, _r: offline_attendance(i, s) if i % 3 != 2 else None)
+    course_route("/report/ubcompletion/progress.php", "online_attendance",
+                 lambda i, _s, _r: online_attendance(i) if i % 3 == 2 else None)
+    course_route("/mod/assign/index.php", "assign_index", lambda i, _s, _r: assign_index(i))
+    course_route("/mod/quiz/index.php", "quiz_index", lambda i, _s, _r: quiz_index(i))
+    course_route("/mod/quiz/view.php", "quiz_view", render_quiz_view)
+
+    @app.get("/__stats")
+    async def get_stats():
+        return JSONResponse({"sessions": len(sessions), "requests": dict(sorted(stats.items()))})
+
+    @app.post("/__reset")
+    async def reset_stats():
+        stats.clear()
+        return {"ok": True}
+
+    return app
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--students", type=int, default=100)
+    parser.add_argument("--courses", type=int, default=8)
+    parser.add_argument("--password", default="pass", help="password every mock student logs in with")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="mean response latency")
+    parser.add_argument("--jitter-ms", type=float, default=100.0, help="+- uniform jitter around the mean")
+    parser.add_argument("--p429", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    parser.add_argument("--p5xx", type=float, default=0.0, help="share of requests answered with 503")
+    parser.add_argument("--etag", action="store_true", help="send ETags and answer If-None-Match with 304")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def mock_config(args) -> MockConfig:
+    return MockConfig(
+        students=args.students, courses=args.courses, password=args.password,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, p429=args.p429,
+        retry_after=args.retry_after, p5xx=args.p5xx, etag=args.etag, seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a synthetic eClass for load tests.")
+    add_mock_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    app = create_app(mock_config(args), f"http://{args.host}:{args.port}/")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
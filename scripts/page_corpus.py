@@ -0,0 +1,207 @@
+"""
+Recorded eClass page corpus for offline parser checks and benchmarks.
+
+A corpus lives in scripts/fixtures/<name>/:
+
+    manifest.json            name, source, students -> (recorded_at, pages)
+    <student>/NNN-<kind>.html
+    <student>/expected.json  replay_student() output when it was recorded
+
+Pages are anonymised by scripts/record_pages.py before they are written.
+load_corpus(None) builds the same structure from the synthetic pages in
+scripts/eclass_pages.py, so the tools also run on a fresh checkout.
+"""
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.scraper.script import EclassClient
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# kind -> one of the pages a student's scrape touches
+PAGE_KINDS = ("home", "course", "offline_attendance", "online_attendance", "assign_index", "quiz_index", "quiz_view")
+
+
+def page_kind(url: str) -> str:
+    path = urlparse(url).path.rstrip("/")
+    if "/login/" in path + "/":
+        return "login"
+    if path in ("", "/index.php", "/my"):
+        return "home"
+    if path.endswith("/course/view.php"):
+        return "course"
+    if "/local/ubattendance/" in path:
+        return "offline_attendance"
+    if "/report/ubcompletion/" in path:
+        return "online_attendance"
+    if path.endswith("/mod/assign/index.php"):
+        return "assign_index"
+    if path.endswith("/mod/quiz/index.php"):
+        return "quiz_index"
+    if path.endswith("/mod/quiz/view.php"):
+        return "quiz_view"
+    return "other"
+
+
+@dataclass
+class CorpusPage:
+    url: str
+    kind: str
+    html: str
+    final_url: Optional[str] = None
+
+
+@dataclass
+class CorpusStudent:
+    id: str
+    pages: List[CorpusPage]
+    expected: Optional[dict] = None
+
+    @property
+    def site(self) -> Dict[str, str]:
+        """url -> html, for replay_client()."""
+        site = {}
+        for p in self.pages:
+            site[p.url] = p.html
+            if p.final_url:
+                site.setdefault(p.final_url, p.html)
+        return site
+
+
+@dataclass
+class Corpus:
+    name: str
+    source: str
+    students: List[CorpusStudent] = field(default_factory=list)
+
+
+# =========================
+# Replay (no network)
+# =========================
+class CannedResponse:
+    def __init__(self, url: str, text: str) -> None:
+        self.url = url
+        self.text = text
+        self.status_code = 200
+        self.headers: Dict[str, str] = {}
+
+
+def replay_client(site: Dict[str, str]) -> EclassClient:
+    """EclassClient whose blocking requests are answered from site (url -> html)."""
+    client = EclassClient()
+
+    def fake_request(method, url, **kwargs):
+        html = site.get(url) or site.get(url.rstrip("/") + "/") or site.get(url.rstrip("/"))
+        if html is None:
+            raise KeyError(url)
+        return CannedResponse(url, html)
+
+    client._request = fake_request
+    return client
+
+
+def replay_student(site: Dict[str, str]) -> dict:
+    """
+    Everything the parsers extract from one student's pages: the
+    get_all_attendance() result plus the quizzes of every course.
+    JSON-normalised, so it compares equal to a stored expected.json.
+    """
+    client = replay_client(site)
+    data = client.get_all_attendance()
+    quizzes = {}
+    for subj in data["subjects"]:
+        course_url = subj["course_url"]
+        if course_url in site:
+            quizzes[course_url] = client.get_quizzes_for_course(site[course_url])
+    return json.loads(json.dumps({"subjects": data["subjects"], "quizzes": quizzes}, default=str))
+
+
+# =========================
+# Load / save
+# =========================
+def synthetic_corpus(students: int = 5, courses: int = 8) -> Corpus:
+    from scripts import eclass_pages
+
+    eclass_pages.BASE_URL = EclassClient().cfg.base_url.rstrip("/")
+    corpus = Corpus(name="synthetic", source="scripts/eclass_pages.py")
+    for i in range(students):
+        pages = [CorpusPage(url, page_kind(url), html) for url, html in eclass_pages.student_site(courses, seed=i)]
+        corpus.students.append(CorpusStudent(f"s{i + 1}", pages))
+    return corpus
+
+
+def load_corpus(name: Optional[str] = None) -> Corpus:
+    """scripts/fixtures/<name> (a path works too); None = synthetic pages."""
+    if not name:
+        return synthetic_corpus()
+    root = name if os.path.isdir(name) else os.path.join(FIXTURES_DIR, name)
+    with open(os.path.join(root, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    corpus = Corpus(name=manifest["name"], source=manifest.get("source", ""))
+    for entry in manifest["students"]:
+        pages = []
+        for p in entry["pages"]:
+            with open(os.path.join(root, p["file"]), encoding="utf-8") as f:
+                pages.append(CorpusPage(p["url"], p["kind"], f.read(), p.get("final_url")))
+        expected = None
+        expected_path = os.path.join(root, entry["id"], "expected.json")
+        if os.path.exists(expected_path):
+            with open(expected_path, encoding="utf-8") as f:
+                expected = json.load(f)
+        corpus.students.append(CorpusStudent(entry["id"], pages, expected))
+    return corpus
+
+
+def save_student(name: str, student: CorpusStudent, source: str = "recorded") -> str:
+    """Writes one student's pages + expected.json and (re)writes the manifest."""
+    root = os.path.join(FIXTURES_DIR, name)
+    student_dir = os.path.join(root, student.id)
+    os.makedirs(student_dir, exist_ok=True)
+
+    entries: List[Dict[str, Any]] = []
+    for n, page in enumerate(student.pages):
+        rel = f"{student.id}/{n:03d}-{page.kind}.html"
+        with open(os.path.join(root, rel), "w", encoding="utf-8") as f:
+            f.write(page.html)
+        entries.append({"url": page.url, "final_url": page.final_url, "kind": page.kind, "file": rel})
+
+    if student.expected is not None:
+        with open(os.path.join(student_dir, "expected.json"), "w", encoding="utf-8") as f:
+            json.dump(student.expected, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+    manifest_path = os.path.join(root, "manifest.json")
+    manifest = {"name": name, "source": source, "students": []}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    manifest["students"] = [s for s in manifest["students"] if s["id"] != student.id]
+    manifest["students"].append({"id": student.id, "recorded_at": datetime.now().isoformat(timespec="seconds"), "pages": entries})
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return root
+
+
+def first_difference(expected: Any, actual: Any, path: str = "") -> Optional[Tuple[str, Any, Any]]:
+    """(json path, expected, actual) of the first mismatch, or None."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual)):
+            diff = first_difference(expected.get(key), actual.get(key), f"{path}.{key}")
+            if diff:
+                return diff
+        return None
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return f"{path}[len]", len(expected), len(actual)
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            diff = first_difference(e, a, f"{path}[{i}]")
+            if diff:
+                return diff
+        return None
+    return None if expected == actual else (path or ".", expected, actual)
@@ -0,0 +1,95 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# SQL statements per endpoint
+#
+# Calls API endpoints in-process (httpx ASGITransport, no server needed)
+# against the configured database and counts the statements each request
+# sends. Fails (exit 1) when an endpoint needs more than its budget, so a
+# relationship that starts loading a whole graph again shows up here.
+#
+#   python scripts/query_counts.py --telegram-id 123456789 [--student-year-id UUID] [--token JWT]
+#
+# Admin endpoints are only checked when --token (superuser JWT) is given.
+# Redis caches are not flushed: the first call of an endpoint is usually
+# the cold one, the second shows the cached path.
+# =========================
+import argparse
+import asyncio
+import contextvars
+from typing import List, Optional, Tuple
+
+import httpx
+from sqlalchemy import event
+
+from app.database.session import engine
+from app.main import app
+
+_counter: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("query_counter", default=None)
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    statements = _counter.get()
+    if statements is not None:
+        statements.append(statement)
+
+
+# (method, path, params, budget, needs_token)
+def endpoints(args) -> List[Tuple[str, str, dict, int, bool]]:
+    tg = {"telegram_id": args.telegram_id}
+    out = [
+        # identity miss (1) + group name (1) + classtimes with klass/subject (3)
+        ("GET", "/my-timetable", tg, 5, False),
+        # identity miss (1) + snapshot (1)
+        ("GET", "/e-class/get-my-attendance", tg, 2, False),
+        ("GET", "/user/get-user-info", tg, 1, False),
+        ("GET", "/adminpanel/student-year", {}, 2, True),
+        ("GET", "/adminpanel/majors", {}, 2, True),
+    ]
+    if args.student_year_id:
+        # superuser (1) + subjects (1) + majors (1) + classes joined with professor (1)
+        out.append(("GET", "/adminpanel/subjects-by-st-year", {"student_year_id": args.student_year_id}, 4, True))
+    return out
+
+
+async def measure(client: httpx.AsyncClient, method: str, path: str, params: dict, headers: dict) -> Tuple[int, List[str]]:
+    statements: List[str] = []
+    token = _counter.set(statements)
+    try:
+        r = await client.request(method, path, params=params, headers=headers)
+    finally:
+        _counter.reset(token)
+    return r.status_code, statements
+
+
+async def main(args) -> int:
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    failed = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        print(f"{'endpoint':<40} {'status':>6} {'cold':>5} {'warm':>5} {'budget':>6}")
+        for method, path, params, budget, needs_token in endpoints(args):
+            if needs_token and not args.token:
+                continue
+            status, cold = await measure(client, method, path, params, headers)
+            _, warm = await measure(client, method, path, params, headers)
+            over = len(cold) > budget
+            failed += over
+            print(f"{method + ' ' + path:<40} {status:>6} {len(cold):>5} {len(warm):>5} {budget:>6}{'  OVER' if over else ''}")
+            if over and args.verbose:
+                for s in cold:
+                    print("    " + " ".join(s.split())[:160])
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count SQL statements per API endpoint.")
+    parser.add_argument("--telegram-id", required=True)
+    parser.add_argument("--student-year-id")
+    parser.add_argument("--token", help="superuser JWT for the admin panel endpoints")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print the statements of endpoints over budget")
+    sys.exit(asyncio.run(main(parser.parse_args())))
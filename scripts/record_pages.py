@@ -0,0 +1,124 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# =========================
+# Record one student's eClass pages into the fixture corpus
+#
+# Logs in with real credentials, walks the same pages a scrape does (home,
+# courses, attendance, assignments, quiz index + quiz views), anonymises
+# them and writes scripts/fixtures/<name>/<student>/ plus expected.json
+# (the parser output on the anonymised pages, see scripts/page_corpus.py).
+#
+#   ECLASS_USERNAME=... ECLASS_PASSWORD=... \
+#   python scripts/record_pages.py --name 2026-spring --student s1 \
+#       [--redact "Full Name" --redact "other text"]
+#
+# Removed from every page: the username, --redact strings, inline <script>
+# bodies (sesskey, user ids), sesskey / logintoken values, e-mails and
+# user ids in profile / picture URLs. Professor names become
+# "Professor N" (same name -> same N across the corpus).
+# Look over the pages before committing them.
+# =========================
+import argparse
+import getpass
+import re
+from typing import Dict, Iterable, List
+
+from app.scraper.script import EclassClient, ParsedPage
+from scripts.page_corpus import CorpusPage, CorpusStudent, page_kind, replay_student, save_student
+
+_SCRIPT_BODY = re.compile(r"(<script\b[^>]*>)(.*?)(</script>)", re.S | re.I)
+_SESSKEY = re.compile(r"(sesskey=)[A-Za-z0-9]+")
+_HIDDEN_TOKEN = re.compile(r'(name="(?:sesskey|logintoken)"\s+value=")[^"]*(")', re.I)
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_USER_ID_URL = re.compile(r"((?:/user/(?:profile|view)\.php\?(?:[^\"'\s]*&(?:amp;)?)?id=)|(?:pluginfile\.php/))\d+")
+
+
+class Anonymiser:
+    def __init__(self, secrets: Iterable[str]) -> None:
+        # longest first, so "Kim Min Su" goes before "Kim"
+        self.secrets = sorted({s for s in secrets if s and len(s) >= 3}, key=len, reverse=True)
+        self.professors: Dict[str, str] = {}
+
+    def add_professor(self, name: str) -> None:
+        if name and name not in self.professors:
+            self.professors[name] = f"Professor {len(self.professors) + 1}"
+
+    def text(self, s: str) -> str:
+        s = _SCRIPT_BODY.sub(lambda m: m.group(1) + m.group(3), s)
+        s = _SESSKEY.sub(r"\1xxxxxxxxxx", s)
+        s = _HIDDEN_TOKEN.sub(r"\1xxxxxxxxxx\2", s)
+        s = _EMAIL.sub("student@example.com", s)
+        s = _USER_ID_URL.sub(r"\g<1>1", s)
+        for secret in self.secrets:
+            s = s.replace(secret, "REDACTED")
+        for name in sorted(self.professors, key=len, reverse=True):
+            s = s.replace(name, self.professors[name])
+        return s
+
+
+def record(client: EclassClient, username: str, password: str) -> List[CorpusPage]:
+    """Every page the scrape touches, in request order (login pages left out)."""
+    captured: List[CorpusPage] = []
+    real_request = client._request
+
+    def capturing_request(method, url, **kwargs):
+        r = real_request(method, url, **kwargs)
+        kind = page_kind(url)
+        if method == "GET" and kind not in ("login", "other"):
+            captured.append(CorpusPage(url, kind, r.text, str(r.url)))
+        return r
+
+    client._request = capturing_request
+    client.login(username, password)
+    data = client.get_all_attendance()
+    # the blocking engine does not open quizzes; the quiz parsers need them too
+    for subj in data["subjects"]:
+        course = next((p for p in captured if p.kind == "course" and p.url == subj["course_url"]), None)
+        if course is not None:
+            client.get_quizzes_for_course(course.html)
+
+    # the same url twice (quiz views, home) is kept once
+    seen, pages = set(), []
+    for p in captured:
+        if p.url not in seen:
+            seen.add(p.url)
+            pages.append(p)
+    return pages
+
+
+def main(args) -> int:
+    username = os.environ.get("ECLASS_USERNAME") or input("eClass username: ")
+    password = os.environ.get("ECLASS_PASSWORD") or getpass.getpass("eClass password: ")
+
+    client = EclassClient()
+    pages = record(client, username, password)
+
+    anon = Anonymiser([username, *args.redact])
+    for p in pages:
+        if p.kind == "course":
+            anon.add_professor(client._find_professor_name(ParsedPage(p.html).soup))
+    pages = [
+        CorpusPage(anon.text(p.url), p.kind, anon.text(p.html), anon.text(p.final_url) if p.final_url else None)
+        for p in pages
+    ]
+
+    student = CorpusStudent(args.student, pages)
+    student.expected = replay_student(student.site)
+    root = save_student(args.name, student)
+
+    kinds: Dict[str, int] = {}
+    for p in pages:
+        kinds[p.kind] = kinds.get(p.kind, 0) + 1
+    print(f"{len(pages)} pages -> {root}/{args.student}: " + ", ".join(f"{k}={v}" for k, v in sorted(kinds.items())))
+    print(f"subjects in expected.json: {len(student.expected['subjects'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record and anonymise one student's eClass pages.")
+    parser.add_argument("--name", required=True, help="corpus name (scripts/fixtures/<name>)")
+    parser.add_argument("--student", required=True, help="id for this student inside the corpus, e.g. s1")
+    parser.add_argument("--redact", action="append", default=[], help="extra text to remove (full name, ...)")
+    sys.exit(main(parser.parse_args()))
@@ -2,7 +2,7 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.infra.redis_sync import notification_cache,redis_user_info_cache
+from app.infra.redis_sync import notification_cache,redis_user_info_cache,TIMETABLE_VERSION_KEY
 from app.config import db_settings,bot_settings
 
 
@@ -10,17 +10,21 @@ from app.config import db_settings,bot_settings
 # ---- imports from your app (adjust path if needed) ----
 import os
 import json
+import heapq
+import asyncio
 import time as time_mod
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, time as dt_time
+from typing import NamedTuple
 from zoneinfo import ZoneInfo
 
-import requests
 from redis import Redis
 from sqlalchemy import create_engine, select
 from sqlalchemy.orm import Session, selectinload
 
 # ---- YOUR MODELS (adjust import path) ----
 from app.database.models import ClassTime, Class, User, Enrollment  # adjust if needed
+from app.infra.telegram import TelegramRateLimiter, TelegramSender
+from app.services.student_stats import load_student_stats_many
 
 
 
@@ -31,7 +35,9 @@ REDIS_INFO_URL = redis_user_info_cache  # redis db=3 url for payload cache
 
 BOT_TOKEN = bot_settings.BOT_TOKEN
 TELEGRAM_SEND_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-TELEGRAM_SLEEP_SEC = float(os.environ.get("TELEGRAM_SLEEP_SEC", "0.05"))
+# Bot API limits: ~30 messages/s overall, 1 message/s per chat
+TELEGRAM_GLOBAL_RPS = float(os.environ.get("TELEGRAM_GLOBAL_RPS", "30"))
+TELEGRAM_CONCURRENCY = int(os.environ.get("TELEGRAM_CONCURRENCY", "20"))
 # =========================
 # Config
 # =========================
@@ -39,9 +45,6 @@ TZ = ZoneInfo("Asia/Tashkent")
 
 
 
-
-# Small delay to be gentle with Telegram (optional)
-
 engine = create_engine(DATABASE_URL, pool_pre_ping=True)
 
 redis_info = REDIS_INFO_URL
@@ -50,15 +53,39 @@ redis_dedupe = Redis.from_url(REDIS_DEDUPE_URL,decode_responses=True)
 # =========================
 # Telegram
 # =========================
-def send_message(chat_id: str, text: str):
-    resp = requests.post(
-        TELEGRAM_SEND_URL,
-        json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"},
-        timeout=10,
-    )
-    if resp.status_code != 200:
-        # print errors so Railway logs show them
-        print("Telegram error:", resp.status_code, resp.text)
+def deliver(job: str, messages: list[tuple[str, str]]) -> dict:
+    """
+    Sends (chat_id, text) pairs concurrently over one pooled client, paced to
+    Telegram's global and per-chat limits (429 retry_after is honoured).
+    Returns and logs the job's delivery stats.
+    """
+    stats = {"job": job, "total": len(messages), "sent": 0, "failed": 0, "rate_limited": 0, "seconds": 0.0}
+    if not messages:
+        return stats
+
+    async def run():
+        limiter = TelegramRateLimiter(global_rps=TELEGRAM_GLOBAL_RPS)
+        async with TelegramSender(TELEGRAM_SEND_URL, limiter=limiter, concurrency=TELEGRAM_CONCURRENCY) as tg:
+            return await tg.send_many(messages)
+
+    t0 = time_mod.monotonic()
+    results = asyncio.run(run())
+    stats["seconds"] = round(time_mod.monotonic() - t0, 2)
+
+    errors = []
+    for (chat_id, _), r in zip(messages, results):
+        if r.ok:
+            stats["sent"] += 1
+        else:
+            stats["failed"] += 1
+            errors.append((chat_id, r.error))
+        stats["rate_limited"] += r.rate_limited
+
+    # print so Railway logs show them
+    print(f"[reminder] {job}: {stats}")
+    for chat_id, err in errors[:20]:
+        print("Telegram error:", chat_id, err)
+    return stats
 
 # =========================
 # Helpers
@@ -73,12 +100,8 @@ def combine_date_time(d: date, t) -> datetime:
 def fmt_hhmm(t) -> str:
     return t.strftime("%H:%M")
 
-def get_user_payload_map(user_id: str) -> dict:
-    """
-    Returns a dict: { "first_name":..., "subjects_by_code": { "AE4": {"attendance":2,"absence":0,"late":0}, ... } }
-    If user payload not in redis -> empty map (still send reminders without stats).
-    """
-    raw = redis_info.get(str(user_id))
+def _payload_map_from_json(raw) -> dict:
+    """Fallback for users scraped before the stats hash existed: the full payload."""
     if not raw:
         return {"first_name": None, "subjects_by_code": {}}
 
@@ -96,8 +119,6 @@ def get_user_payload_map(user_id: str) -> dict:
                 "attendance": int(att.get("attendance") or 0),
                 "absence": int(att.get("absence") or 0),
                 "late": int(att.get("late") or 0),
-                "subject_name": s.get("subject_name"),
-                "professor_name": s.get("professor_name"),
             }
 
     return {
@@ -105,15 +126,33 @@ def get_user_payload_map(user_id: str) -> dict:
         "subjects_by_code": subjects_by_code,
     }
 
+def get_user_payload_maps(user_ids) -> dict[str, dict]:
+    """
+    { user_id: { "first_name":..., "subjects_by_code": { "AE4": {"attendance":2,"absence":0,"late":0}, ... } } }
+    Compact stats hashes of all users in one pipelined round trip (written at
+    scrape time); users without one fall back to one pipelined GET of the
+    full payload. Missing everywhere -> empty map (still send reminders without stats).
+    """
+    maps = load_student_stats_many(redis_info, user_ids)
+    missing = [uid for uid, m in maps.items() if m is None]
+    if missing:
+        for uid, raw in zip(missing, redis_info.mget(missing)):
+            maps[uid] = _payload_map_from_json(raw)
+    return maps
+
 def dedupe_key(kind: str, user_id: str, class_id: str, start_dt: datetime) -> str:
     # Unique per occurrence (date+time) per user per class
     tag = start_dt.strftime("%Y%m%d_%H%M")
     return f"rem:{kind}:{user_id}:{class_id}:{tag}"
 
-def should_send_once(kind: str, user_id: str, class_id: str, start_dt: datetime, ttl_sec: int) -> bool:
-    key = dedupe_key(kind, user_id, class_id, start_dt)
-    # SET NX = only first time returns True
-    return bool(redis_dedupe.set(key, "1", nx=True, ex=ttl_sec))
+def claim_once(keys: list[str], ttl_sec: int) -> list[bool]:
+    # SET NX = only first time returns True; all keys in one pipelined round trip
+    if not keys:
+        return []
+    pipe = redis_dedupe.pipeline(transaction=False)
+    for key in keys:
+        pipe.set(key, "1", nx=True, ex=ttl_sec)
+    return [bool(r) for r in pipe.execute()]
 
 # =========================
 # Message builders
@@ -162,143 +201,251 @@ def build_8am_message(user_first_name: str, today_name: str, classes_lines: list
     )
 
 # =========================
-# Jobs
+# Day index (one query per day / timetable change)
+# =========================
+class DayClass(NamedTuple):
+    start_dt: datetime
+    start_time: object
+    end_time: object
+    room: str | None
+    class_id: str
+    subj_code: str
+    subj_name: str
+    prof_name: str
+    # (user_id, telegram_id, first_name) of enrolled users with a chat
+    users: tuple
+
+
+def load_day_classes(session: Session, day: date) -> list[DayClass]:
+    """Every class occurrence of `day` with its recipients, sorted by start."""
+    wd = day.strftime("%A").lower()
+    stmt = (
+        select(ClassTime)
+        .where(ClassTime.week_day == wd)
+        .options(
+            selectinload(ClassTime.klass).selectinload(Class.users),
+            selectinload(ClassTime.klass).selectinload(Class.subject),
+            selectinload(ClassTime.klass).selectinload(Class.professor),
+        )
+    )
+    out: list[DayClass] = []
+    for ct in session.execute(stmt).scalars().all():
+        klass = ct.klass
+        if not klass or not klass.subject or not klass.professor or not ct.start_time:
+            continue
+        out.append(DayClass(
+            start_dt=combine_date_time(day, ct.start_time),
+            start_time=ct.start_time,
+            end_time=ct.end_time,
+            room=ct.room,
+            class_id=str(klass.id),
+            subj_code=klass.subject.short_name,
+            subj_name=klass.subject.name,
+            prof_name=klass.professor.name,
+            users=tuple(
+                (str(u.id), u.telegram_id, u.first_name)
+                for u in (klass.users or []) if u.telegram_id
+            ),
+        ))
+    out.sort(key=lambda dc: dc.start_dt)
+    return out
+
+
+def build_30m_messages(classes: list[DayClass]) -> list[tuple[str, str]]:
+    candidates = [(dc, u) for dc in classes for u in dc.users]
+    # Dedupe (keep it for 3 hours)
+    won = claim_once(
+        [dedupe_key("30m", user_id, dc.class_id, dc.start_dt) for dc, (user_id, _, _) in candidates],
+        ttl_sec=60 * 60 * 3,
+    )
+    candidates = [c for c, ok in zip(candidates, won) if ok]
+    payload_maps = get_user_payload_maps({user_id for _, (user_id, _, _) in candidates})
+
+    messages = []
+    for dc, (user_id, telegram_id, first_name) in candidates:
+        payload_map = payload_maps[user_id]
+        stats = payload_map["subjects_by_code"].get(dc.subj_code)
+
+        msg = build_30m_message(
+            user_first_name=payload_map["first_name"] or first_name,
+            subject_code=dc.subj_code,
+            subject_name=dc.subj_name,
+            professor=dc.prof_name,
+            room=dc.room,
+            start_time=dc.start_time,
+            end_time=dc.end_time,
+            week_day=dc.start_dt.strftime("%A").lower(),
+            stats=stats,
+        )
+        messages.append((telegram_id, msg))
+    return messages
+
+
+def build_daily_digest_messages(day_classes: list[DayClass], now: datetime) -> list[tuple[str, str]]:
+    wd = today_weekday_name(now)
+    messages = []
+
+    # Build per-user list
+    per_user: dict[str, list[tuple]] = {}  # user_id -> [(DayClass, telegram_id, first_name)]
+    for dc in day_classes:
+        for user_id, telegram_id, first_name in dc.users:
+            per_user.setdefault(user_id, []).append((dc, telegram_id, first_name))
+
+    # Dedupe daily (per user per day)
+    day_tag = now.strftime('%Y%m%d')
+    user_ids = list(per_user)
+    won = claim_once([f"rem:8am:{user_id}:{day_tag}" for user_id in user_ids], ttl_sec=60 * 60 * 18)
+    per_user = {user_id: per_user[user_id] for user_id, ok in zip(user_ids, won) if ok}
+    payload_maps = get_user_payload_maps(per_user)
+
+    # Send per user
+    for user_id, items in per_user.items():
+        # If no classes -> do nothing (your requirement)
+        if not items:
+            continue
+
+        payload_map = payload_maps[user_id]
+        first_name = payload_map["first_name"] or "there"
+        subjects_by_code = payload_map["subjects_by_code"]
+
+        items.sort(key=lambda x: x[0].start_time)  # sort by start_time
+        lines = []
+        chat_id = items[0][1]
+
+        for dc, _, _ in items:
+            stats = subjects_by_code.get(dc.subj_code, {})
+            # morning: only absence + late (your requirement)
+            abs_v = stats.get("absence", 0)
+            late_v = stats.get("late", 0)
+
+            start = fmt_hhmm(dc.start_time)
+            end = fmt_hhmm(dc.end_time) if dc.end_time else "??:??"
+            room_part = f" | 🏫 {dc.room}" if dc.room else ""
+
+            lines.append(
+                f"🕒 <b>{start}–{end}</b> | 📘 <b>{dc.subj_code}</b>{room_part}\n"
+                f"   👨‍🏫 {dc.prof_name}\n"
+                f"   ❌ Absence: <b>{abs_v}</b>   ⏳ Late: <b>{late_v}</b>\n"
+            )
+
+        msg = build_8am_message(first_name, wd, lines)
+        messages.append((chat_id, msg))
+    return messages
+
+# =========================
+# Jobs (cron mode)
 # =========================
 def run_30min_reminders():
     now = datetime.now(TZ)
-    wd = today_weekday_name(now)
 
     with Session(engine) as session:
-        # Load all classes for today's weekday (small list usually)
-        stmt = (
-            select(ClassTime)
-            .where(ClassTime.week_day == wd)
-            .options(
-                selectinload(ClassTime.klass)
-                .selectinload(Class.users),
-                selectinload(ClassTime.klass)
-                .selectinload(Class.subject),
-                selectinload(ClassTime.klass)
-                .selectinload(Class.professor),
-            )
-        )
-        classtimes = session.execute(stmt).scalars().all()
-
-        for ct in classtimes:
-            if not ct.start_time:
-                continue
-
-            start_dt = combine_date_time(now.date(), ct.start_time)
-            # Condition: now is between start-30m and start (strictly before start)
-            if not (start_dt - timedelta(minutes=30) <= now < start_dt):
-                continue
-
-            klass = ct.klass
-            if not klass or not klass.subject or not klass.professor:
-                continue
-
-            subj_code = klass.subject.short_name
-            subj_name = klass.subject.name
-            prof_name = klass.professor.name
-
-            for u in (klass.users or []):
-                if not u.telegram_id:
-                    continue
-
-                # Dedupe (keep it for 3 hours)
-                if not should_send_once("30m", str(u.id), str(klass.id), start_dt, ttl_sec=60 * 60 * 3):
-                    continue
-
-                payload_map = get_user_payload_map(str(u.id))
-                stats = payload_map["subjects_by_code"].get(subj_code)
-
-                msg = build_30m_message(
-                    user_first_name=payload_map["first_name"] or u.first_name,
-                    subject_code=subj_code,
-                    subject_name=subj_name,
-                    professor=prof_name,
-                    room=ct.room,
-                    start_time=ct.start_time,
-                    end_time=ct.end_time,
-                    week_day=wd,
-                    stats=stats,
-                )
-                send_message(u.telegram_id, msg)
-                time_mod.sleep(TELEGRAM_SLEEP_SEC)
+        day_classes = load_day_classes(session, now.date())
+
+    # Condition: now is between start-30m and start (strictly before start)
+    due = [dc for dc in day_classes if dc.start_dt - timedelta(minutes=30) <= now < dc.start_dt]
+    return deliver("30m", build_30m_messages(due))
 
 def run_daily_8am():
     now = datetime.now(TZ)
-    wd = today_weekday_name(now)
 
     with Session(engine) as session:
-        # Fetch today's class times with users in one go
-        stmt = (
-            select(ClassTime)
-            .where(ClassTime.week_day == wd)
-            .options(
-                selectinload(ClassTime.klass).selectinload(Class.users),
-                selectinload(ClassTime.klass).selectinload(Class.subject),
-                selectinload(ClassTime.klass).selectinload(Class.professor),
-            )
-        )
-        classtimes = session.execute(stmt).scalars().all()
-
-        # Build per-user list
-        per_user: dict[str, list[tuple]] = {}  # user_id -> [(start_time, end_time, room, subj_code, subj_name, prof_name, class_id)]
-        for ct in classtimes:
-            klass = ct.klass
-            if not klass or not klass.subject or not klass.professor or not ct.start_time:
-                continue
-
-            subj_code = klass.subject.short_name
-            subj_name = klass.subject.name
-            prof_name = klass.professor.name
-
-            for u in (klass.users or []):
-                if not u.telegram_id:
-                    continue
-                per_user.setdefault(str(u.id), []).append(
-                    (ct.start_time, ct.end_time, ct.room, subj_code, subj_name, prof_name, str(klass.id), u.telegram_id, u.first_name)
-                )
-
-        # Send per user
-        for user_id, items in per_user.items():
-            # If no classes -> do nothing (your requirement)
-            if not items:
-                continue
-
-            # Dedupe daily (per user per day)
-            daily_key = f"rem:8am:{user_id}:{now.strftime('%Y%m%d')}"
-            if not redis_dedupe.set(daily_key, "1", nx=True, ex=60 * 60 * 18):
-                continue
-
-            payload_map = get_user_payload_map(user_id)
-            first_name = payload_map["first_name"] or "there"
-            subjects_by_code = payload_map["subjects_by_code"]
-
-            items.sort(key=lambda x: x[0])  # sort by start_time
-            lines = []
-            chat_id = items[0][8]
-
-            for start_t, end_t, room, subj_code, subj_name, prof_name, class_id, _, _ in items:
-                stats = subjects_by_code.get(subj_code, {})
-                # morning: only absence + late (your requirement)
-                abs_v = stats.get("absence", 0)
-                late_v = stats.get("late", 0)
-
-                start = fmt_hhmm(start_t)
-                end = fmt_hhmm(end_t) if end_t else "??:??"
-                room_part = f" | 🏫 {room}" if room else ""
-
-                lines.append(
-                    f"🕒 <b>{start}–{end}</b> | 📘 <b>{subj_code}</b>{room_part}\n"
-                    f"   👨‍🏫 {prof_name}\n"
-                    f"   ❌ Absence: <b>{abs_v}</b>   ⏳ Late: <b>{late_v}</b>\n"
-                )
-
-            msg = build_8am_message(first_name, wd, lines)
-            send_message(chat_id, msg)
-            time_mod.sleep(TELEGRAM_SLEEP_SEC)
+        day_classes = load_day_classes(session, now.date())
+
+    return deliver("8am", build_daily_digest_messages(day_classes, now))
+
+# =========================
+# Scheduler (serve mode)
+# =========================
+REMINDER_LEAD = timedelta(minutes=30)
+DIGEST_AT = dt_time(8, 0)
+# how often the timetable version key is polled / the index is rebuilt anyway
+# (the latter picks up enrollment changes made by the scraper)
+VERSION_CHECK_SEC = float(os.environ.get("REMINDER_VERSION_CHECK_SEC", "30"))
+FULL_REFRESH_SEC = float(os.environ.get("REMINDER_FULL_REFRESH_SEC", "900"))
+
+
+class ReminderScheduler:
+    """
+    Long-running replacement for the cron jobs above.
+
+    Loads the day's class starts once into a heap of (fire_at, seq, kind,
+    DayClass) and sleeps until the next one is due, so firing a reminder
+    needs no DB query. The index is rebuilt at midnight, when
+    TIMETABLE_VERSION_KEY changes (ClassService CSV uploads) and every
+    FULL_REFRESH_SEC. Redis dedupe keys keep a rebuild from re-sending.
+    """
+
+    def __init__(self) -> None:
+        self.heap: list[tuple] = []
+        self.day: date | None = None
+        self.day_classes: list[DayClass] = []
+        self.version: str | None = None
+        self.loaded_at = 0.0
+        self.next_check = 0.0
+
+    def _current_version(self) -> str | None:
+        try:
+            return redis_dedupe.get(TIMETABLE_VERSION_KEY)
+        except Exception:
+            return self.version
+
+    def needs_refresh(self, now: datetime) -> bool:
+        if self.day != now.date():
+            return True
+        if time_mod.monotonic() - self.loaded_at >= FULL_REFRESH_SEC:
+            return True
+        return self._current_version() != self.version
+
+    def refresh(self, now: datetime) -> None:
+        self.version = self._current_version()
+        with Session(engine) as session:
+            self.day_classes = load_day_classes(session, now.date())
+        self.day = now.date()
+        self.loaded_at = time_mod.monotonic()
+
+        heap: list[tuple] = []
+        seq = 0
+        digest_dt = combine_date_time(now.date(), DIGEST_AT)
+        if now < digest_dt + timedelta(hours=2):
+            heap.append((digest_dt, seq, "8am", None))
+        for dc in self.day_classes:
+            # still fire if we (re)started inside the 30 min window
+            if dc.start_dt > now:
+                seq += 1
+                heap.append((dc.start_dt - REMINDER_LEAD, seq, "30m", dc))
+        heapq.heapify(heap)
+        self.heap = heap
+        print(f"[reminder] index {self.day}: {len(self.day_classes)} classes, {len(heap)} events, version={self.version}")
+
+    def fire_due(self, now: datetime) -> None:
+        # everything due now goes out as one delivery batch per kind
+        due = []
+        digest = False
+        while self.heap and self.heap[0][0] <= now:
+            _, _, kind, dc = heapq.heappop(self.heap)
+            if kind == "8am":
+                digest = True
+            elif now < dc.start_dt:
+                due.append(dc)
+        if digest:
+            deliver("8am", build_daily_digest_messages(self.day_classes, now))
+        if due:
+            deliver("30m", build_30m_messages(due))
+
+    def run_forever(self) -> None:
+        while True:
+            now = datetime.now(TZ)
+            if time_mod.monotonic() >= self.next_check:
+                self.next_check = time_mod.monotonic() + VERSION_CHECK_SEC
+                if self.needs_refresh(now):
+                    self.refresh(now)
+
+            self.fire_due(now)
+
+            sleep_for = max(0.0, self.next_check - time_mod.monotonic())
+            if self.heap:
+                sleep_for = min(sleep_for, (self.heap[0][0] - datetime.now(TZ)).total_seconds())
+            time_mod.sleep(max(0.05, sleep_for))
 
 # =========================
 # Entry
@@ -311,5 +458,7 @@ if __name__ == "__main__":
         run_30min_reminders()
     elif mode == "8am":
         run_daily_8am()
+    elif mode == "serve":
+        ReminderScheduler().run_forever()
     else:
-        raise SystemExit("Usage: python scripts/reminder.py [30m|8am]")
+        raise SystemExit("Usage: python scripts/reminder.py [30m|8am|serve]")